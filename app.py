@@ -1,40 +1,54 @@
-from PyQt6.QtWidgets import (QMainWindow, QFileDialog, QDockWidget, QVBoxLayout, QWidget, QToolBar, QStatusBar, QGraphicsDropShadowEffect, QLabel, QFrame, QHBoxLayout, QPushButton)
-from PyQt6.QtGui import QAction, QIcon, QKeySequence, QPainter, QColor, QFontDatabase, QFont
-from PyQt6.QtCore import Qt, QSize, QEvent, QPoint, QPropertyAnimation, QEasingCurve
-import os
-import sys
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QFileDialog, QDockWidget, QVBoxLayout, QWidget, QToolBar, QStatusBar, QLabel, QFrame, QHBoxLayout, QPushButton)
+from PyQt6.QtGui import QAction, QKeySequence, QFontDatabase, QFont
+from PyQt6.QtCore import Qt, QSize, QEvent, QPoint, QPropertyAnimation, QEasingCurve, QAbstractAnimation
 
 from canvas import Canvas
 from layer_panel import LayerPanel
 from left_toolbar import LeftToolbar
-from style_utils import COLORS, STYLE_SHEETS, FadeAnimation, apply_glass_effect
+from resources import app_icon
+from style_utils import APP_STYLE_SHEET
 
-def resource_path(relative_path):
-    """Get absolute path to resource, works for dev and for PyInstaller"""
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    
-    return os.path.join(base_path, relative_path)
+# Header and normal fonts, built once on first use (needs a QApplication)
+_FONTS = None
+
+# Menu shortcuts; standard keys are pre-parsed by Qt and follow the platform
+_KS_IMPORT = QKeySequence("Ctrl+I")
+_KS_SAVE = QKeySequence.StandardKey.Save
+_KS_LOAD = QKeySequence.StandardKey.Open
+_KS_EXIT = QKeySequence("Alt+F4")
+_KS_UNDO = QKeySequence.StandardKey.Undo
+_KS_REDO = QKeySequence.StandardKey.Redo
+
+def _fonts():
+    """Return the shared (header, normal) fonts"""
+    global _FONTS
+    if _FONTS is None:
+        # Using system fonts that are likely to exist
+        header_font = QFont("Segoe UI", 16)
+        header_font.setBold(True)
+        _FONTS = (header_font, QFont("Segoe UI", 9))
+    return _FONTS
 
 class ImageReferenceApp(QMainWindow):
     def __init__(self):
         super().__init__()
+        
+        # Freeze painting while the window is assembled; every dock, toolbar
+        # and central widget added below would otherwise trigger a relayout
+        self.setUpdatesEnabled(False)
+        
         self.setWindowTitle("Meeza Reference Studio")
         self.setGeometry(100, 100, 1200, 800)
         
         # Set application icon - this is the in-app icon shown in the title bar
-        icon_path = resource_path("icon.png")
-        if os.path.exists(icon_path):
-            self.setWindowIcon(QIcon(icon_path))
+        self.setWindowIcon(app_icon())
         
         # Setup fonts
         self._setup_fonts()
         
-        # Apply modern theme
-        self.setStyleSheet(STYLE_SHEETS["main_window"])
+        # Apply modern theme once for the whole application
+        self.setObjectName("MainRoot")
+        QApplication.instance().setStyleSheet(APP_STYLE_SHEET)
         
         # Create canvas (central widget)
         self.central_container = QWidget()
@@ -45,13 +59,6 @@ class ImageReferenceApp(QMainWindow):
         # Canvas with decorative frame
         self.canvas_frame = QFrame()
         self.canvas_frame.setObjectName("canvasFrame")
-        self.canvas_frame.setStyleSheet(f"""
-            #canvasFrame {{
-                background-color: {COLORS["primary"]};
-                border: 1px solid {COLORS["border"]};
-                border-radius: 10px;
-            }}
-        """)
         canvas_layout = QVBoxLayout(self.canvas_frame)
         canvas_layout.setContentsMargins(1, 1, 1, 1)
         canvas_layout.setSpacing(0)
@@ -67,16 +74,9 @@ class ImageReferenceApp(QMainWindow):
         self.layer_panel = LayerPanel(self.canvas)
         self.layers_dock = QDockWidget("Layers")
         self.layers_dock.setWidget(self.layer_panel)
-        self.layers_dock.setStyleSheet(STYLE_SHEETS["dock_widget"])
+        self.layers_dock.setObjectName("layersDock")
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.layers_dock)
         
-        # Apply glass effect to dock widget
-        apply_glass_effect(self.layers_dock, QColor(COLORS["primary"]), 0.95)
-        
-        # Apply fade-in animation
-        self.fade_animation = FadeAnimation(self.central_container)
-        self.fade_animation.fade_in(0.0, 1.0, 400)  # Smoother, slower fade-in
-        
         # Create left toolbar with GPU tools and standard actions
         self.create_left_toolbar()
         
@@ -88,48 +88,50 @@ class ImageReferenceApp(QMainWindow):
         self.setStatusBar(self.statusBar)
         self.statusBar.showMessage("Ready")
         
-        # Enable the paintEvent for glass border effect
+        # Let the style sheet paint the window background and border
         self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, True)
         
         # Create collapsible dock buttons
         self._create_collapsible_dock_buttons()
         
+        # Imported files are decoded on the canvas worker pool; count them back in
+        self._pending_imports = 0
+        self._imported_count = 0
+        self.canvas.layerLoaded.connect(self._on_layer_loaded)
+        
+        # All children exist now, lay them out and paint once
+        self.setUpdatesEnabled(True)
+        
+        # Fade in the whole window; the window manager composites the opacity
+        fade_animation = QPropertyAnimation(self, b"windowOpacity", self)
+        fade_animation.setStartValue(0.0)
+        fade_animation.setEndValue(1.0)
+        fade_animation.setDuration(400)  # Smoother, slower fade-in
+        fade_animation.setEasingCurve(QEasingCurve.Type.OutCubic)
+        fade_animation.start(QAbstractAnimation.DeletionPolicy.DeleteWhenStopped)
+        
     def _setup_fonts(self):
         """Set up custom fonts for the application"""
-        # Using system fonts that are likely to exist
-        self.header_font = QFont("Segoe UI", 16)
-        self.header_font.setBold(True)
-        self.normal_font = QFont("Segoe UI", 9)
+        self.header_font, self.normal_font = _fonts()
         
     def _create_status_bar(self):
         """Create a modern status bar"""
         status_bar = QStatusBar()
-        status_bar.setStyleSheet(f"""
-            QStatusBar {{
-                background-color: {COLORS["primary"]};
-                color: {COLORS["text_dark"]};
-                border-top: 1px solid {COLORS["border"]};
-                padding: 4px;
-            }}
-        """)
-        # Apply glass effect
-        apply_glass_effect(status_bar, QColor(COLORS["primary"]), 0.95)
+        status_bar.setObjectName("glassBar")
         return status_bar
         
     def create_left_toolbar(self):
         """Create the left toolbar with GPU-accelerated tools"""
         self.left_toolbar = LeftToolbar(self.canvas)
-        self.left_toolbar.setStyleSheet(STYLE_SHEETS["toolbar"])
+        self.left_toolbar.setObjectName("leftBar")
         self.left_toolbar.setMovable(False)  # Lock toolbar position
         self.left_toolbar.setIconSize(QSize(28, 28))  # Larger icons
         
-        # Add glass effect to toolbar
-        apply_glass_effect(self.left_toolbar, QColor(COLORS["primary"]), 0.95)
-        
         self.addToolBar(Qt.ToolBarArea.LeftToolBarArea, self.left_toolbar)
         
         # Store a direct reference to the window in the canvas
         self.canvas.main_window = self
+        self.left_toolbar.activeToolChanged.connect(self.canvas.set_active_tool)
 
     def create_menus(self):
         menu_bar = self.menuBar()
@@ -139,19 +141,19 @@ class ImageReferenceApp(QMainWindow):
         
         # Import image action
         import_action = QAction("Import Image", self)
-        import_action.setShortcut(QKeySequence("Ctrl+I"))
+        import_action.setShortcut(_KS_IMPORT)
         import_action.triggered.connect(self.import_image)
         file_menu.addAction(import_action)
         
         # Save canvas action
         save_action = QAction("Save Canvas", self)
-        save_action.setShortcut(QKeySequence("Ctrl+S"))
+        save_action.setShortcut(_KS_SAVE)
         save_action.triggered.connect(self.save_canvas)
         file_menu.addAction(save_action)
         
         # Load canvas action
         load_action = QAction("Load Canvas", self)
-        load_action.setShortcut(QKeySequence("Ctrl+O"))
+        load_action.setShortcut(_KS_LOAD)
         load_action.triggered.connect(self.load_canvas)
         file_menu.addAction(load_action)
         
@@ -159,7 +161,7 @@ class ImageReferenceApp(QMainWindow):
         
         # Exit action
         exit_action = QAction("Exit", self)
-        exit_action.setShortcut(QKeySequence("Alt+F4"))
+        exit_action.setShortcut(_KS_EXIT)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
@@ -168,13 +170,13 @@ class ImageReferenceApp(QMainWindow):
         
         # Undo action
         undo_action = QAction("Undo", self)
-        undo_action.setShortcut(QKeySequence("Ctrl+Z"))
+        undo_action.setShortcut(_KS_UNDO)
         undo_action.triggered.connect(self.canvas.undo)
         edit_menu.addAction(undo_action)
         
         # Redo action
         redo_action = QAction("Redo", self)
-        redo_action.setShortcut(QKeySequence("Ctrl+Y"))
+        redo_action.setShortcut(_KS_REDO)
         redo_action.triggered.connect(self.canvas.redo)
         edit_menu.addAction(redo_action)
         
@@ -184,22 +186,11 @@ class ImageReferenceApp(QMainWindow):
         if hasattr(self, 'layers_dock'):
             # Add a collapse button to the dock title bar
             collapse_btn = QPushButton("<<")
-            collapse_btn.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {COLORS["primary_light"]};
-                    color: {COLORS["text"]};
-                    border: 1px solid {COLORS["border"]};
-                    border-radius: 3px;
-                    max-width: 24px;
-                    max-height: 18px;
-                }}
-                QPushButton:hover {{
-                    background-color: {COLORS["accent"]}40;
-                }}
-            """)
+            collapse_btn.setObjectName("dockCollapseBtn")
             
-            # Store original width
+            # Store original width and start expanded
             self.layers_dock_width = self.layers_dock.width()
+            self._layers_collapsed = False
             
             # Connect to toggle function
             collapse_btn.clicked.connect(self._toggle_layer_dock)
@@ -209,17 +200,24 @@ class ImageReferenceApp(QMainWindow):
             
     def _toggle_layer_dock(self):
         """Toggle the layers dock visibility"""
-        if self.layers_dock.width() > 50:  # If expanded
-            # Save width before collapsing
-            self.layers_dock_width = self.layers_dock.width()
-            # Collapse
-            self.layers_dock.setMaximumWidth(24)
-            self.layers_dock.titleBarWidget().setText(">>")
-        else:  # If collapsed
-            # Expand
-            self.layers_dock.setMaximumWidth(16777215)  # Default maximum
-            self.layers_dock.resize(self.layers_dock_width, self.layers_dock.height())
-            self.layers_dock.titleBarWidget().setText("<<")
+        # Hold repaints so the resize and relabel land in a single paint
+        self.setUpdatesEnabled(False)
+        try:
+            if not self._layers_collapsed:
+                # Save width before collapsing
+                self.layers_dock_width = self.layers_dock.width()
+                # Collapse
+                self.layers_dock.setMaximumWidth(24)
+                self.layers_dock.titleBarWidget().setText(">>")
+            else:
+                # Expand
+                self.layers_dock.setMaximumWidth(16777215)  # Default maximum
+                self.layers_dock.resize(self.layers_dock_width, self.layers_dock.height())
+                self.layers_dock.titleBarWidget().setText("<<")
+            self._layers_collapsed = not self._layers_collapsed
+        finally:
+            self.setUpdatesEnabled(True)
+        self.update()
             
     def import_image(self):
         file_paths, _ = QFileDialog.getOpenFileNames(
@@ -230,10 +228,26 @@ class ImageReferenceApp(QMainWindow):
         )
         
         if file_paths:
-            for path in file_paths:
-                self.canvas.add_image_layer(path)
-                self.layer_panel.update_layers()
-            self.statusBar.showMessage(f"Imported {len(file_paths)} image(s)")
+            # Every file gets a placeholder layer right away, in the order picked,
+            # and is filled in as the canvas finishes decoding it
+            self._pending_imports += len(file_paths)
+            self.layer_panel.setUpdatesEnabled(False)
+            try:
+                for path in file_paths:
+                    self.canvas.add_image_layer(path)
+            finally:
+                self.layer_panel.setUpdatesEnabled(True)
+            self.statusBar.showMessage(f"Importing {self._pending_imports} image(s)...")
+                
+    def _on_layer_loaded(self, layer):
+        """Report the import once every pending file has decoded"""
+        if self._pending_imports == 0:
+            return
+        self._pending_imports -= 1
+        self._imported_count += 1
+        if self._pending_imports == 0:
+            self.statusBar.showMessage(f"Imported {self._imported_count} image(s)")
+            self._imported_count = 0
             
     def save_canvas(self):
         """Save the current canvas state to a file"""
@@ -282,12 +296,3 @@ class ImageReferenceApp(QMainWindow):
             
         # Call parent closeEvent
         super().closeEvent(event)
-    
-    def paintEvent(self, event):
-        """Custom paint event to draw glass-effect borders"""
-        super().paintEvent(event)
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Let the original painting happen
-        painter.end()
@@ -2,43 +2,68 @@ import os
 import sys
 import subprocess
 import shutil
+import hashlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+DIGEST_FILE = Path("dist/.build_digest")
+EXE_PATH = Path("dist/MeezaRefStudio/MeezaRefStudio.exe")
+
+def _sources_digest():
+    """Hash every input of the build so unchanged sources can skip it"""
+    digest = hashlib.blake2b()
+    sources = (sorted(Path(".").glob("*.py")) + sorted(Path(".").glob("*.spec"))
+               + sorted(Path("icons").glob("*.svg")))
+    for path in sources + [Path("icon.ico"), Path("icon.png")]:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def _remove_folder(folder):
+    """Delete a build output folder if it exists"""
+    if os.path.exists(folder):
+        print(f"🧹 Cleaning {folder} directory...")
+        shutil.rmtree(folder, ignore_errors=True)
+
 def build_executable():
     """Build the Meeza Reference Studio executable using PyInstaller"""
     print("🔧 Building Meeza Reference Studio executable...")
     
-    # Check for icon files
-    if not os.path.exists("icon.ico"):
-        print("❌ Error: icon.ico not found! Please create or provide this file.")
-        return False
-    
-    if not os.path.exists("icon.png"):
-        print("❌ Error: icon.png not found! Please create or provide this file.")
+    # Check for icon files, reporting everything that is missing at once
+    checks = {name: Path(name).is_file() for name in ("icon.ico", "icon.png")}
+    missing = [name for name, present in checks.items() if not present]
+    for name in missing:
+        print(f"❌ Error: {name} not found! Please create or provide this file.")
+    if missing:
         return False
     
     # Verify UPX installation
     upx_path = "C:\\upx-4.2.4-win64"
-    if not os.path.exists(upx_path) or not os.path.exists(os.path.join(upx_path, "upx.exe")):
+    have_upx = (Path(upx_path) / "upx.exe").is_file()
+    if not have_upx:
         print(f"⚠️ Warning: UPX not found at {upx_path}. Compression will not be applied.")
         upx_arg = "--noupx"
     else:
         print(f"✅ Using UPX from {upx_path} for compression")
         upx_arg = f"--upx-dir={upx_path}"
     
-    # Install PyInstaller if not already installed
-    try:
-        import PyInstaller
-        print(f"✅ Using PyInstaller {PyInstaller.__version__}")
-    except ImportError:
+    # Skip the whole build when nothing has changed since the last one
+    digest = _sources_digest()
+    if EXE_PATH.exists() and DIGEST_FILE.exists() and DIGEST_FILE.read_text() == digest:
+        print(f"✅ Sources unchanged, keeping existing build at {EXE_PATH.absolute()}")
+        return True
+    
+    # Install PyInstaller if not already installed; find_spec avoids importing it here
+    if importlib.util.find_spec("PyInstaller") is None:
         print("📦 Installing PyInstaller...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
+    version = subprocess.check_output([sys.executable, "-m", "PyInstaller", "--version"], text=True).strip()
+    print(f"✅ Using PyInstaller {version}")
     
-    # Ensure clean build directory
-    for folder in ["build", "dist"]:
-        if os.path.exists(folder):
-            print(f"🧹 Cleaning {folder} directory...")
-            shutil.rmtree(folder)
+    # Ensure clean build directory; both folders are removed concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(_remove_folder, ["build", "dist"]))
     
     # Run PyInstaller with the spec file
     print("🚀 Starting build process...")
@@ -48,18 +73,26 @@ def build_executable():
         "PyInstaller",
         "meezaref_studio.spec",
         "--clean",
+        "--noconfirm",
         upx_arg,
         "--log-level=INFO"
     ]
     
     try:
-        subprocess.check_call(cmd)
-        exe_path = Path("dist/MeezaRefStudio/MeezaRefStudio.exe")
-        if exe_path.exists():
-            size_mb = exe_path.stat().st_size / (1024 * 1024)
+        # Stream PyInstaller output as it arrives so long builds show progress
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   bufsize=1, text=True)
+        for line in process.stdout:
+            print(line, end="")
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+            
+        if EXE_PATH.exists():
+            DIGEST_FILE.write_text(digest)
+            size_mb = EXE_PATH.stat().st_size / (1024 * 1024)
             print(f"✅ Build completed successfully!")
             print(f"📦 Executable size: {size_mb:.2f} MB")
-            print(f"📂 Location: {exe_path.absolute()}")
+            print(f"📂 Location: {EXE_PATH.absolute()}")
             return True
         else:
             print("❌ Build failed: Executable not found")
@@ -1,44 +1,106 @@
 from PyQt6.QtWidgets import QWidget, QGraphicsView, QGraphicsScene, QMenu, QInputDialog, QFileDialog
-from PyQt6.QtGui import QPainter, QImage, QPixmap, QTransform, QCursor, QColor
-from PyQt6.QtCore import Qt, QPoint, QRectF, pyqtSignal, QPointF, QByteArray, QBuffer, QIODevice, QTimer
+from PyQt6.QtGui import QPainter, QImage, QPixmap, QTransform, QCursor, QColor, QSurfaceFormat, QPen
+from PyQt6.QtCore import Qt, QPoint, QRectF, pyqtSignal, QPointF, QByteArray, QBuffer, QIODevice, QTimer, QDeadlineTimer
 import json
+import math
 import os
-import base64
 
 import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
-from layer import Layer
-from history import History
-from style_utils import COLORS, STYLE_SHEETS
+from layer import Layer, LayerIndex, LayerStack
+from tools import ToolOverlayItem
+from history import History, Action
+from style_utils import COLORS
+from debug_util import debug_log
 
 try:
-    from gpu_ops import GPUImageProcessor
+    from gpu_ops import get_shared_processor
     gpu_available = True
 except ImportError:
     gpu_available = False
 
+try:
+    import msgpack
+    msgpack_available = True
+except ImportError:
+    msgpack_available = False
+
+try:
+    from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+    opengl_available = True
+except ImportError:
+    opengl_available = False
+
+def _to_native(image):
+    """Convert an image to premultiplied ARGB32, the format Qt blits without conversion"""
+    if image is None or image.format() == QImage.Format.Format_ARGB32_Premultiplied:
+        return image
+    return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+def _load_native(image_path):
+    """Decode an image file straight into the native blitting format"""
+    return _to_native(QImage(image_path))
+
+def _decode_native(layer_data, sidecar_dir=None):
+    """Decode a serialized layer image straight into the native blitting format"""
+    # JSON canvases keep the compressed pixels in a sidecar directory; older
+    # ones stored PNG files there
+    if "image_ref" in layer_data and sidecar_dir:
+        return _load_native(os.path.join(sidecar_dir, layer_data["image_ref"]))
+    pixels = layer_data.get("pixels")
+    if pixels is not None and "data_ref" in pixels and sidecar_dir:
+        with open(os.path.join(sidecar_dir, pixels["data_ref"]), 'rb') as data_file:
+            layer_data = {"pixels": dict(pixels, data=data_file.read())}
+    return _to_native(Layer.decode_image_data(layer_data))
+
 class Canvas(QGraphicsView):
     layerChanged = pyqtSignal()
+    # A layer added from a file path got its decoded image
+    layerLoaded = pyqtSignal(object)
+    # Emitted from worker threads; queued back onto the GUI thread
+    _imageLoaded = pyqtSignal(object, QImage)
     
     def __init__(self):
         self.scene = QGraphicsScene()
+        # The huge scene rect makes Qt's BSP tree expensive to maintain;
+        # layers keep their own R-tree in scene.layer_index instead
+        self.scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.NoIndex)
+        self.scene.layer_index = LayerIndex()
         super().__init__(self.scene)
         
+        # Tools draw their overlays through this item, so only its area repaints
+        self.overlay_item = ToolOverlayItem()
+        self.overlay_item.setZValue(1e9)
+        self.scene.addItem(self.overlay_item)
+        
+        # Composite through OpenGL so pan/zoom blits run on the GPU; the GL
+        # paint engine uploads layer pixmaps as textures and caches them
+        if opengl_available:
+            gl_format = QSurfaceFormat()
+            gl_format.setSamples(4)
+            gl_viewport = QOpenGLWidget()
+            gl_viewport.setFormat(gl_format)
+            self.setViewport(gl_viewport)
+        
         # Set scene rect to be very large for "infinite" canvas feel
         self.scene.setSceneRect(-100000, -100000, 200000, 200000)
         
         # Apply modern styling
-        self.setStyleSheet(STYLE_SHEETS["canvas"])
+        self.setObjectName("canvasView")  # Styled by APP_STYLE_SHEET
         
-        # Set a gradient background
-        self.setBackgroundBrush(QColor(COLORS["primary"]))
+        # Background tile, rendered once and blitted by drawBackground
+        self._bg_tile = QPixmap(64, 64)
+        self._bg_tile.fill(QColor(COLORS["primary"]))
         
         # Canvas settings
         self.setRenderHint(QPainter.RenderHint.Antialiasing)
         self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
         self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
-        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        # wheelEvent anchors zoom on the mouse itself; letting Qt re-anchor
+        # from the last mouse move would fight the composed transform
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.NoAnchor)
         self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
@@ -52,43 +114,125 @@ class Canvas(QGraphicsView):
         self.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing, True)
         self.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontSavePainterState, True)
         
-        # Add caching for better performance
-        self.setCacheMode(QGraphicsView.CacheModeFlag.CacheBackground)
-        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
-        
-        # Timer for throttling updates during movements
-        self.update_timer = QTimer()
-        self.update_timer.setSingleShot(True)
-        self.update_timer.setInterval(50)  # 50ms delay for smooth rendering
-        self.update_timer.timeout.connect(self.delayed_update)
-        
         # Flag to track if we're currently moving layers
         self.is_moving_layers = False
         
         # Layers and active layer
-        self.layers = []
+        self.layers = LayerStack()
         self.active_layer = None
         
         # History for undo/redo
         self.history = History()
         
+        # Layer panel state at the last layerChanged; every emission, including
+        # those from other modules, refreshes it
+        self._last_ui_state = None
+        self.layerChanged.connect(self._remember_ui_state)
+        
         # Store the current mouse position
         self.last_mouse_pos = QPoint()
         self.is_panning = False
         
+        # Active tool from the left toolbar, kept current by set_active_tool
+        self._active_tool = None
+        
+        # Pan cursors, built once and reused for every pan start and stop
+        self._cursor_pan = QCursor(Qt.CursorShape.ClosedHandCursor)
+        self._cursor_arrow = QCursor(Qt.CursorShape.ArrowCursor)
+        
+        # Drag moves are coalesced to one per display frame; moves arriving
+        # sooner, or within a couple of pixels, are held and replayed later
+        self._frame_ms = int(1000 / max(60, self.screen().refreshRate()))
+        self._move_deadline = QDeadlineTimer(0)
+        self._last_dirty_pos = QPoint()
+        self._pending_move = None
+        self._move_timer = QTimer(self)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.setInterval(self._frame_ms)
+        self._move_timer.timeout.connect(self._flush_pending_move)
+        
+        # Worker threads for decoding image files passed to add_image_layer,
+        # and for encoding and decoding layer images on save and load
+        self._decode_pool = ThreadPoolExecutor(max_workers=4)
+        self._imageLoaded.connect(self._finish_load)
+        
         # Disable multiprocessing to prevent freezing
         # self.pool = mp.Pool(processes=mp.cpu_count())
         
         # Initialize GPU processor
         self.use_gpu = gpu_available
         if self.use_gpu:
-            self.gpu_processor = GPUImageProcessor()
+            self.gpu_processor = get_shared_processor()
             self.use_gpu = self.gpu_processor.is_available()
             print(f"GPU acceleration: {'Enabled' if self.use_gpu else 'Disabled'}")
         
-    def add_image_layer(self, image_path):
-        """Add a new image layer to the canvas"""
-        layer = Layer(image_path)
+    def drawBackground(self, painter, rect):
+        """Tile the pre-rendered background pixmap, then paint the layers over it"""
+        painter.drawTiledPixmap(rect, self._bg_tile, QPointF(rect.x() % 64, rect.y() % 64))
+        # Layers go in the background pass so scene items such as the tool
+        # overlay still draw above them
+        self._draw_layers(painter, rect)
+        
+    def _draw_layers(self, painter, rect):
+        """Paint all visible layers in z-order, batching runs that share a pixmap"""
+        batch, source = [], None
+        view_scale = painter.worldTransform().m11()
+        visible_layers = self.scene.layer_index.intersecting(rect)
+        for layer in sorted(visible_layers, key=lambda item: item.zValue()):
+            if not layer.isVisible():
+                continue
+            pixmap = layer.pixmap()
+            if pixmap.isNull():
+                continue
+                
+            # Fragments are positioned by their centre; the item transform only
+            # ever holds the layer's scale
+            transform = layer.transform()
+            scale_x, scale_y = transform.m11(), transform.m22()
+            center = layer.pos() + QPointF(pixmap.width() * scale_x / 2, pixmap.height() * scale_y / 2)
+            
+            # When zoomed out, sample the mipmap level closest to the screen
+            # density instead of squeezing the full-size pixmap every paint
+            level = max(0, int(-math.log2(max(view_scale * min(scale_x, scale_y), 1e-6))))
+            if level:
+                mip = layer.mip_level(level)
+                scale_x *= pixmap.width() / mip.width()
+                scale_y *= pixmap.height() / mip.height()
+                pixmap = mip
+                
+            # Flush the batch when the source pixmap changes
+            if source is not None and pixmap.cacheKey() != source.cacheKey():
+                painter.drawPixmapFragments(batch, source)
+                batch = []
+            source = pixmap
+            
+            batch.append(QPainter.PixmapFragment.create(center, QRectF(pixmap.rect()),
+                                                        scale_x, scale_y, 0, layer.opacity))
+        if batch:
+            painter.drawPixmapFragments(batch, source)
+            
+        # Outline the selected layers, as QGraphicsPixmapItem would
+        pen = QPen(QColor(COLORS["accent"]), 0, Qt.PenStyle.DashLine)
+        painter.setPen(pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for layer in self.scene.selectedItems():
+            if layer.isVisible():
+                painter.drawRect(layer.sceneBoundingRect())
+        
+    def add_image_layer(self, image_path, image=None):
+        """Add a new image layer to the canvas
+        
+        Pass an already decoded QImage as image to skip reading the file here.
+        Otherwise an empty placeholder layer is added right away and the file
+        is decoded on a worker thread, filling the layer in when done.
+        """
+        layer = Layer()
+        layer.name = os.path.basename(image_path)
+        if image is None:
+            future = self._decode_pool.submit(_load_native, image_path)
+            future.add_done_callback(partial(self._emit_loaded, layer))
+        else:
+            layer.set_image(_to_native(image))
         self.layers.append(layer)
         self.scene.addItem(layer)
         
@@ -97,11 +241,28 @@ class Canvas(QGraphicsView):
             self.set_active_layer(0)
             
         # Add to history
-        self.history.add_command("add_layer", layer)
-        self.layerChanged.emit()
+        self.history.add_command(Action.ADD_LAYER, layer)
+        self._maybe_emit_layer_changed()
         
         return layer
         
+    def _emit_loaded(self, layer, future):
+        """Hand a finished decode over to the GUI thread (runs on the worker)"""
+        try:
+            image = future.result()
+        except Exception as e:
+            # The executor would swallow the error; log it and leave the layer empty
+            debug_log(f"Failed to decode {layer.name}: {e}", "ERROR")
+            image = QImage()
+        self._imageLoaded.emit(layer, image)
+        
+    def _finish_load(self, layer, image):
+        """Swap a decoded image into its placeholder layer"""
+        layer.set_image(image)
+        # The panel state is unchanged but the layer now has pixels to show
+        self.layerChanged.emit()
+        self.layerLoaded.emit(layer)
+        
     def remove_layer(self, index):
         """Remove a layer at the specified index"""
         if 0 <= index < len(self.layers):
@@ -116,8 +277,8 @@ class Canvas(QGraphicsView):
                     self.active_layer = None
                     
             # Add to history
-            self.history.add_command("remove_layer", layer, index)
-            self.layerChanged.emit()
+            self.history.add_command(Action.REMOVE_LAYER, layer, index)
+            self._maybe_emit_layer_changed()
             
     def set_active_layer(self, index):
         """Set the active layer by index"""
@@ -132,21 +293,18 @@ class Canvas(QGraphicsView):
             # Don't change the Z-order when selecting - this breaks visibility state
             # Just use setSelected() to show selection state
             
-            self.layerChanged.emit()
+            self._maybe_emit_layer_changed()
     
     def move_layer(self, from_index, to_index):
         """Move a layer from one position to another"""
         if 0 <= from_index < len(self.layers) and 0 <= to_index < len(self.layers):
+            # Reinserting gives only the moved layer a new z-value
             layer = self.layers.pop(from_index)
             self.layers.insert(to_index, layer)
-            
-            # Update z-order
-            for i, layer in enumerate(self.layers):
-                layer.setZValue(i)
                 
             # Add to history
-            self.history.add_command("move_layer", from_index, to_index)
-            self.layerChanged.emit()
+            self.history.add_command(Action.MOVE_LAYER, None, from_index, to_index)
+            self._maybe_emit_layer_changed()
     
     def scale_layer(self, layer, scale_x, scale_y):
         """Scale a layer by the given factors"""
@@ -155,12 +313,12 @@ class Canvas(QGraphicsView):
             
         old_scale = (layer.scale_x, layer.scale_y)
         
-        # Use CPU scaling instead of GPU to prevent freezing
+        # Only the item transform changes; the pixmap is scaled while painting
         layer.scale_image(scale_x, scale_y)
         
         # Add to history
-        self.history.add_command("scale_layer", layer, old_scale, (scale_x, scale_y))
-        self.layerChanged.emit()
+        self.history.add_command(Action.SCALE_LAYER, layer, old_scale, (scale_x, scale_y))
+        self._maybe_emit_layer_changed()
     
     def show_context_menu(self, position):
         """Show context menu for layer operations"""
@@ -214,15 +372,39 @@ class Canvas(QGraphicsView):
             "layers": []
         }
         
-        # Save each layer's data
-        for layer in self.layers:
-            layer_data = layer.serialize()
+        # Save each layer's data, compressing the images in parallel; zlib
+        # releases the GIL, so the worker threads run concurrently
+        images = [layer.original_image for layer in self.layers]
+        encoded = self._decode_pool.map(Layer.encode_image_data, images)
+        for layer, pixels in zip(self.layers, encoded):
+            layer_data = layer.serialize(include_image=False)
+            if pixels is not None:
+                layer_data["pixels"] = pixels
             canvas_data["layers"].append(layer_data)
             
-        # Save the JSON to file
+        # Save as MessagePack so image bytes are stored raw, falling back
+        # to a JSON manifest with sidecar files when msgpack is not installed
         try:
-            with open(filename, 'w') as f:
-                json.dump(canvas_data, f, indent=2)
+            if msgpack_available:
+                with open(filename, 'wb') as f:
+                    f.write(msgpack.packb(canvas_data, use_bin_type=True))
+            else:
+                # Write the compressed pixels next to the JSON manifest instead
+                # of base64 encoding them into it
+                sidecar_dir = filename + ".d"
+                os.makedirs(sidecar_dir, exist_ok=True)
+                for name in os.listdir(sidecar_dir):
+                    if name.startswith("layer_") and name.endswith((".png", ".z")):
+                        os.remove(os.path.join(sidecar_dir, name))
+                for i, layer_data in enumerate(canvas_data["layers"]):
+                    pixels = layer_data.get("pixels")
+                    if pixels is not None:
+                        data_ref = f"layer_{i}.z"
+                        with open(os.path.join(sidecar_dir, data_ref), 'wb') as data_file:
+                            data_file.write(pixels.pop("data"))
+                        pixels["data_ref"] = data_ref
+                with open(filename, 'w') as f:
+                    json.dump(canvas_data, f, indent=2)
             return True
         except Exception as e:
             print(f"Error saving canvas: {e}")
@@ -231,8 +413,17 @@ class Canvas(QGraphicsView):
     def load_canvas(self, filename):
         """Load a canvas state from a file"""
         try:
-            with open(filename, 'r') as f:
-                canvas_data = json.load(f)
+            with open(filename, 'rb') as f:
+                raw_data = f.read()
+                
+            # Older canvas files are JSON objects; anything else is MessagePack
+            if raw_data.lstrip()[:1] == b'{':
+                canvas_data = json.loads(raw_data)
+            elif msgpack_available:
+                canvas_data = msgpack.unpackb(raw_data, raw=False)
+            else:
+                print("Loading this canvas file requires msgpack")
+                return False
                 
             # Check version
             if "version" not in canvas_data or canvas_data["version"] != "1.0":
@@ -245,10 +436,16 @@ class Canvas(QGraphicsView):
             self.layers.clear()
             self.active_layer = None
             
-            # Load each layer
-            for layer_data in canvas_data["layers"]:
+            # Decode all layer images in parallel; Qt releases the GIL while
+            # decoding PNGs, so the worker threads run concurrently
+            layers_data = canvas_data["layers"]
+            decode = partial(_decode_native, sidecar_dir=filename + ".d")
+            images = list(self._decode_pool.map(decode, layers_data))
+            
+            # Build the layers on the GUI thread
+            for layer_data, image in zip(layers_data, images):
                 layer = Layer()
-                if layer.deserialize(layer_data):
+                if layer.deserialize(layer_data, image):
                     self.layers.append(layer)
                     self.scene.addItem(layer)
             
@@ -256,7 +453,7 @@ class Canvas(QGraphicsView):
             if self.layers:
                 self.set_active_layer(0)
                 
-            self.layerChanged.emit()
+            self._maybe_emit_layer_changed()
             return True
             
         except Exception as e:
@@ -265,55 +462,60 @@ class Canvas(QGraphicsView):
     
     def wheelEvent(self, event):
         """Handle mouse wheel for zooming"""
-        # Store current scene position under mouse before zoom
-        old_pos = self.mapToScene(event.position().toPoint())
-        
-        # Apply zooming
-        zoom_factor = 1.1
-        
-        if event.angleDelta().y() > 0:
-            # Zoom in
-            self.scale(zoom_factor, zoom_factor)
-        else:
-            # Zoom out
-            self.scale(1.0 / zoom_factor, 1.0 / zoom_factor)
-        
-        # Update the view center explicitly to ensure it's centered on the mouse
-        # By calculating the delta from the scene point under the mouse before and after zooming
-        new_pos = self.mapToScene(event.position().toPoint())
-        delta = new_pos - old_pos
-        
-        # Adjust the view by the delta to maintain the position under the mouse
-        self.translate(delta.x(), delta.y())
+        # Zoom in or out by a fixed step
+        zoom_factor = 1.1 if event.angleDelta().y() > 0 else 1.0 / 1.1
+        
+        # Scale about the scene point under the mouse so it stays put, composing
+        # the whole change into one matrix and applying it once
+        anchor = self.mapToScene(event.position().toPoint())
+        transform = self.transform()
+        transform.translate(anchor.x(), anchor.y())
+        transform.scale(zoom_factor, zoom_factor)
+        transform.translate(-anchor.x(), -anchor.y())
+        self.setTransform(transform)
         
         # Mark as handled
         event.accept()
             
+    def set_active_tool(self, tool):
+        """Route mouse events to tool, or to the canvas itself when None"""
+        self._active_tool = tool
+        
+    def _set_interactive(self, active):
+        """Switch between fast rendering for drags/pans and full quality when idle"""
+        # Layers are painted in drawBackground, so the view's pixmap hint picks
+        # between fast and smooth sampling for every layer at once
+        self.setRenderHint(QPainter.RenderHint.Antialiasing, not active)
+        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, not active)
+        # Repaint the whole viewport while dragging; cheaper than
+        # diffing dirty regions of overlapping layers on every move
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate if active
+                                   else QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate)
+            
     def mousePressEvent(self, event):
         """Handle mouse press events"""
+        # Pass event to active tool if available
+        tool = self._active_tool
+        if tool is not None:
+            tool.mouse_press(event)
+            # If the tool handled the event, don't propagate it; tool overlays
+            # keep minimal updates so only their dirty rects repaint
+            if event.isAccepted():
+                return
+        
         # Check if we might be starting a drag operation on a layer
         if event.button() == Qt.MouseButton.LeftButton:
             item = self.itemAt(event.pos())
             if isinstance(item, Layer) and not item.is_locked:
-                # Temporarily reduce rendering quality for smoother dragging
-                # Fix: Use .setRenderHint() instead of .setRenderHints() with proper format
-                self.setRenderHint(QPainter.RenderHint.Antialiasing, False)
-                self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
-                self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate)
-        
-        # Pass event to active tool if available
-        if hasattr(self, 'main_window') and hasattr(self.main_window, 'left_toolbar') and self.main_window.left_toolbar.active_tool:
-            self.main_window.left_toolbar.active_tool.mouse_press(event)
-            # If the tool handled the event, don't propagate it
-            if event.isAccepted():
-                return
+                self._set_interactive(True)
         
         # Handle middle mouse button for panning
         if event.button() == Qt.MouseButton.MiddleButton:
             # Start panning with middle mouse button
             self.is_panning = True
             self.last_mouse_pos = event.pos()
-            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+            self._set_interactive(True)
+            self.setCursor(self._cursor_pan)
             event.accept()
         else:
             # Check if we're clicking on a locked layer
@@ -327,12 +529,38 @@ class Canvas(QGraphicsView):
     def mouseMoveEvent(self, event):
         """Handle mouse move events with optimized rendering"""
         # Pass event to active tool if available
-        if hasattr(self, 'main_window') and hasattr(self.main_window, 'left_toolbar') and self.main_window.left_toolbar.active_tool:
-            self.main_window.left_toolbar.active_tool.mouse_move(event)
+        tool = self._active_tool
+        if tool is not None:
+            tool.mouse_move(event)
             # If the tool handled the event, don't propagate it
             if event.isAccepted():
                 return
         
+        if event.buttons() != Qt.MouseButton.NoButton and (self.is_panning or self.is_moving_layers):
+            # Hold the move until the next frame if one was handled this frame
+            # or the pointer has barely moved
+            if (not self._move_deadline.hasExpired() or
+                    (event.pos() - self._last_dirty_pos).manhattanLength() <= 2):
+                self._pending_move = event.clone()
+                if not self._move_timer.isActive():
+                    self._move_timer.start()
+                event.accept()
+                return
+                
+        self._handle_move(event)
+        
+    def _flush_pending_move(self):
+        """Replay the latest held drag move once it is past the jitter threshold"""
+        if self._pending_move is not None:
+            if (self._pending_move.pos() - self._last_dirty_pos).manhattanLength() > 2:
+                self._handle_move(self._pending_move)
+                
+    def _handle_move(self, event):
+        """Pan the view or drag layers for a mouse move"""
+        self._last_dirty_pos = event.pos()
+        self._move_deadline.setRemainingTime(self._frame_ms)
+        self._pending_move = None
+        
         if self.is_panning:
             # Calculate the distance moved since last position
             delta = event.pos() - self.last_mouse_pos
@@ -343,28 +571,26 @@ class Canvas(QGraphicsView):
             self.verticalScrollBar().setValue(self.verticalScrollBar().value() - delta.y())
             event.accept()
         else:
-            # If we're moving a layer, optimize updates
+            # Remember that a layer is being dragged so release can refresh
             if not self.is_panning and self.active_layer and self.active_layer.isSelected():
                 self.is_moving_layers = True
-                
-                # Use more aggressive throttling by checking if timer is active
-                if not self.update_timer.isActive():
-                    # Use more conservative updates during continuous movement
-                    self.update_timer.start(75)  # Slightly longer interval for smoother dragging
             
             super().mouseMoveEvent(event)
             
     def mouseReleaseEvent(self, event):
         """Handle mouse release events"""
+        # Apply any held drag move so the layer or view ends where the pointer did
+        self._move_timer.stop()
+        if self._pending_move is not None:
+            self._handle_move(self._pending_move)
+            
         # Restore high-quality rendering when drag ends
-        # Fix: Use .setRenderHint() instead of .setRenderHints() with proper format
-        self.setRenderHint(QPainter.RenderHint.Antialiasing, True)
-        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
-        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        self._set_interactive(False)
         
         # Pass event to active tool if available
-        if hasattr(self, 'main_window') and hasattr(self.main_window, 'left_toolbar') and self.main_window.left_toolbar.active_tool:
-            self.main_window.left_toolbar.active_tool.mouse_release(event)
+        tool = self._active_tool
+        if tool is not None:
+            tool.mouse_release(event)
             # If the tool handled the event, don't propagate it
             if event.isAccepted():
                 return
@@ -372,119 +598,112 @@ class Canvas(QGraphicsView):
         if event.button() == Qt.MouseButton.MiddleButton:
             # Stop panning
             self.is_panning = False
-            self.setCursor(Qt.CursorShape.ArrowCursor)
+            self.setCursor(self._cursor_arrow)
             event.accept()
         else:
             # If we were moving layers, ensure we do a final update
             if self.is_moving_layers:
                 self.is_moving_layers = False
-                self.update_timer.stop()
                 self.delayed_update()
             super().mouseReleaseEvent(event)
     
     def undo(self):
         """Undo the last action"""
-        command = self.history.undo()
-        if command:
-            action = command[0]
+        history = self.history
+        index = history.pop_last()
+        if index is not None:
+            op_code = history.op_codes[index]
+            self._UNDO_HANDLERS[op_code](self, history.layer_refs[index],
+                                         history.arg_a[index], history.arg_b[index])
             
-            if action == "add_layer":
-                layer = command[1]
-                self.scene.removeItem(layer)
-                self.layers.remove(layer)
-                if self.active_layer == layer:
-                    self.active_layer = None if not self.layers else self.layers[0]
-                    
-            elif action == "remove_layer":
-                layer = command[1]
-                index = command[2]
-                if index < len(self.layers):
-                    self.layers.insert(index, layer)
-                else:
-                    self.layers.append(layer)
-                self.scene.addItem(layer)
-                
-            elif action == "move_layer":
-                from_index = command[1]
-                to_index = command[2]
-                # Swap the indices for undo
-                self.move_layer(to_index, from_index)
-                return  # move_layer already emits layerChanged
-                
-            elif action == "scale_layer":
-                layer = command[1]
-                old_scale = command[2]
-                
-                # Use CPU scaling instead of GPU
-                layer.scale_image(old_scale[0], old_scale[1])
-                
-            elif action == "visibility":
-                layer = command[1]
-                old_visibility = command[2]
-                # Ensure we're using set_visible to properly update the model
-                layer.set_visible(old_visibility)
-                # Force UI refresh for visibility changes
-                self.scene.update()
-                
-            elif action == "filter":
-                # Restore the previous image state for filter operations
-                layer = command[1]
-                previous_image = command[2]
-                if layer in self.layers and previous_image:
-                    layer.set_image(previous_image)
-                
-            self.layerChanged.emit()
+            # move_layer already emits layerChanged
+            if op_code != Action.MOVE_LAYER:
+                self._maybe_emit_layer_changed()
     
     def redo(self):
         """Redo the last undone action"""
-        command = self.history.redo()
-        if command:
-            action = command[0]
-            
-            if action == "add_layer":
-                layer = command[1]
-                self.layers.append(layer)
-                self.scene.addItem(layer)
-                
-            elif action == "remove_layer":
-                layer = command[1]
-                index = command[2]
-                if layer in self.layers:
-                    self.layers.remove(layer)
-                    self.scene.removeItem(layer)
-                    if self.active_layer == layer:
-                        self.active_layer = None if not self.layers else self.layers[0]
-                
-            elif action == "move_layer":
-                from_index = command[1]
-                to_index = command[2]
-                if from_index < len(self.layers) and to_index < len(self.layers):
-                    self.move_layer(from_index, to_index)
-                return  # move_layer already emits layerChanged
-                
-            elif action == "scale_layer":
-                layer = command[1]
-                new_scale = command[3]
-                
-                # Use CPU scaling instead of GPU
-                layer.scale_image(new_scale[0], new_scale[1])
-                
-            elif action == "visibility":
-                layer = command[1]
-                new_visibility = command[3]
-                # Ensure we're using set_visible to properly update the model
-                layer.set_visible(new_visibility)
-                # Force UI refresh for visibility changes
-                self.scene.update()
-                
-            elif action == "filter":
-                # Apply the filter again for redo
-                layer = command[1]
-                new_image = command[3]
-                if layer in self.layers and new_image:
-                    layer.set_image(new_image)
+        history = self.history
+        index = history.pop_next()
+        if index is not None:
+            op_code = history.op_codes[index]
+            self._REDO_HANDLERS[op_code](self, history.layer_refs[index],
+                                         history.arg_a[index], history.arg_b[index])
+            
+            # move_layer already emits layerChanged
+            if op_code != Action.MOVE_LAYER:
+                self._maybe_emit_layer_changed()
+    
+    def _undo_add_layer(self, layer, arg_a, arg_b):
+        self.scene.removeItem(layer)
+        self.layers.remove(layer)
+        if self.active_layer == layer:
+            self.active_layer = None if not self.layers else self.layers[0]
+            
+    def _undo_remove_layer(self, layer, index, arg_b):
+        if index < len(self.layers):
+            self.layers.insert(index, layer)
+        else:
+            self.layers.append(layer)
+        self.scene.addItem(layer)
+        
+    def _undo_move_layer(self, layer, from_index, to_index):
+        # Swap the indices for undo
+        self.move_layer(to_index, from_index)
+        
+    def _undo_scale_layer(self, layer, old_scale, new_scale):
+        # Use CPU scaling instead of GPU
+        layer.scale_image(old_scale[0], old_scale[1])
+        
+    def _undo_visibility(self, layer, old_visibility, new_visibility):
+        # Ensure we're using set_visible to properly update the model
+        layer.set_visible(old_visibility)
+        # Force UI refresh for visibility changes, limited to the layer's area
+        self.scene.update(layer.sceneBoundingRect())
+        
+    def _undo_filter(self, layer, patch, arg_b):
+        # Restore the previous image state for filter operations
+        if layer in self.layers and patch is not None:
+            image = patch.apply(layer.original_image, forward=False)
+            if image is not None:
+                layer.set_image(image)
+            
+    def _redo_add_layer(self, layer, arg_a, arg_b):
+        self.layers.append(layer)
+        self.scene.addItem(layer)
+        
+    def _redo_remove_layer(self, layer, index, arg_b):
+        if layer in self.layers:
+            self.layers.remove(layer)
+            self.scene.removeItem(layer)
+            if self.active_layer == layer:
+                self.active_layer = None if not self.layers else self.layers[0]
                 
-            self.layerChanged.emit()
+    def _redo_move_layer(self, layer, from_index, to_index):
+        if from_index < len(self.layers) and to_index < len(self.layers):
+            self.move_layer(from_index, to_index)
+            
+    def _redo_scale_layer(self, layer, old_scale, new_scale):
+        # Use CPU scaling instead of GPU
+        layer.scale_image(new_scale[0], new_scale[1])
+        
+    def _redo_visibility(self, layer, old_visibility, new_visibility):
+        # Ensure we're using set_visible to properly update the model
+        layer.set_visible(new_visibility)
+        # Force UI refresh for visibility changes, limited to the layer's area
+        self.scene.update(layer.sceneBoundingRect())
+        
+    def _redo_filter(self, layer, patch, arg_b):
+        # Apply the filter again for redo
+        if layer in self.layers and patch is not None:
+            image = patch.apply(layer.original_image, forward=True)
+            if image is not None:
+                layer.set_image(image)
+            
+    # Dispatch tables indexed by Action op code
+    _UNDO_HANDLERS = (_undo_add_layer, _undo_remove_layer, _undo_move_layer,
+                      _undo_scale_layer, _undo_visibility, _undo_filter)
+    _REDO_HANDLERS = (_redo_add_layer, _redo_remove_layer, _redo_move_layer,
+                      _redo_scale_layer, _redo_visibility, _redo_filter)
             
     def process_image_task(self, func, layer, *args):
         """Process an image operation in a separate process"""
@@ -500,13 +719,14 @@ class Canvas(QGraphicsView):
     def update_layer_image(self, layer, new_image):
         """Update a layer's image after processing"""
         layer.set_image(new_image)
-        self.layerChanged.emit()
+        self._maybe_emit_layer_changed()
         
     def closeEvent(self, event):
         """Clean up resources when closing"""
         # Don't try to close the pool since we disabled it
         # self.pool.close()
         # self.pool.join()
+        self._decode_pool.shutdown(wait=False)
         super().closeEvent(event)
     
     def toggle_layer_visibility(self, layer, is_visible):
@@ -521,37 +741,36 @@ class Canvas(QGraphicsView):
                 
                 # Force refresh the layer to ensure visibility state is applied
                 if layer.isVisible() != is_visible:
-                    layer.update()
+                    self.scene.update(layer.sceneBoundingRect())
                 
                 # Then add to history
-                self.history.add_command("visibility", layer, old_visibility, is_visible)
+                self.history.add_command(Action.VISIBILITY, layer, old_visibility, is_visible)
                 
                 # Notify UI to update
-                self.layerChanged.emit()
+                self._maybe_emit_layer_changed()
+    
+    def _ui_state(self):
+        """Snapshot of everything the layer panel shows"""
+        active = self.active_layer
+        return (id(active),
+                (active.scale_x, active.scale_y) if active else None,
+                tuple((id(layer), layer.name, layer.is_visible, layer.is_locked,
+                       # The image key makes pixel edits refresh the row thumbnail
+                       layer.original_image.cacheKey() if layer.original_image is not None else None)
+                      for layer in self.layers))
+                
+    def _remember_ui_state(self):
+        self._last_ui_state = self._ui_state()
+        
+    def _maybe_emit_layer_changed(self):
+        """Emit layerChanged only if the layer panel would show something new"""
+        if self._ui_state() != self._last_ui_state:
+            self.layerChanged.emit()
     
     def delayed_update(self):
-        """Perform delayed update for smoother rendering"""
-        # Ensure full rendering quality is restored before final update
-        # Fix: Use .setRenderHint() instead of .setRenderHints() with proper format
-        self.setRenderHint(QPainter.RenderHint.Antialiasing, True)
-        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
-        
-        # Complete update with full quality
-        self.scene.update()
-        self.layerChanged.emit()
+        """Restore full-quality rendering after a layer drag"""
+        # Changing the render hints already repaints the viewport. A drag only
+        # moves layers, so the layer panel needs no refresh here; structural
+        # changes notify it where they happen
+        self._set_interactive(False)
     
-    def paintEvent(self, event):
-        """Custom paint event to support tool overlays"""
-        # Call the parent class paintEvent first
-        super().paintEvent(event)
-        
-        # Let active tools draw overlays if they need to
-        if hasattr(self, 'main_window') and hasattr(self.main_window, 'left_toolbar'):
-            active_tool = self.main_window.left_toolbar.active_tool
-            if active_tool and hasattr(active_tool, 'paintEvent'):
-                # Create painter for the viewport
-                painter = QPainter(self.viewport())
-                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-                # Let tool draw its overlay
-                active_tool.paintEvent(painter, event.rect())
-                painter.end()
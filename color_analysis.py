@@ -0,0 +1,45 @@
+import numpy as np
+
+try:
+    from numba import njit, prange, get_num_threads
+    numba_available = True
+except ImportError:
+    numba_available = False
+
+# Colors are bucketed at 5 bits per channel: 32 * 32 * 32 bins
+_BINS = 1 << 15
+
+def _bin_color(index):
+    """Return the (r, g, b) at the middle of a palette bin"""
+    return (((index >> 10) & 31) << 3 | 4, ((index >> 5) & 31) << 3 | 4, (index & 31) << 3 | 4)
+
+if numba_available:
+    @njit(parallel=True, cache=True, boundscheck=False)
+    def _histogram(patch, chunks):
+        """Count opaque-enough BGRA pixels per palette bin, one partial histogram per chunk"""
+        height, width = patch.shape[0], patch.shape[1]
+        partial = np.zeros((chunks, _BINS), dtype=np.int64)
+        rows_per_chunk = (height + chunks - 1) // chunks
+        for chunk in prange(chunks):
+            for y in range(chunk * rows_per_chunk, min(height, (chunk + 1) * rows_per_chunk)):
+                for x in range(width):
+                    if patch[y, x, 3] == 0:
+                        continue
+                    b, g, r = int(patch[y, x, 0]), int(patch[y, x, 1]), int(patch[y, x, 2])
+                    code = ((r >> 3) << 10) | ((g >> 3) << 5) | (b >> 3)
+                    partial[chunk, code] += 1
+        return partial.sum(axis=0)
+
+def dominant_color(patch):
+    """Most common color of a (h, w, 4) BGRA uint8 array, or None if it is fully transparent"""
+    if numba_available:
+        hist = _histogram(np.ascontiguousarray(patch), get_num_threads())
+    else:
+        # Vectorized fallback with the same bucketing
+        pixels = patch.reshape(-1, 4)
+        pixels = pixels[pixels[:, 3] != 0].astype(np.int32)
+        codes = ((pixels[:, 2] >> 3) << 10) | ((pixels[:, 1] >> 3) << 5) | (pixels[:, 0] >> 3)
+        hist = np.bincount(codes, minlength=_BINS)
+    if hist.max() == 0:
+        return None
+    return _bin_color(int(hist.argmax()))
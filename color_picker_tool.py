@@ -1,72 +1,80 @@
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QPointF, QPoint, QRectF
+from PyQt6.QtCore import Qt, QPointF, QPoint, QRectF, QSizeF, QTimer
 from PyQt6.QtGui import QCursor, QPixmap, QImage, QColor, QPainter, QPen
 from PyQt6.QtWidgets import QApplication
 
 import numpy as np
-import threading
 from functools import lru_cache
 
 from tools import Tool
 from color_popup import ColorPopup
+from color_analysis import dominant_color
 
-try:
-    from gpu_ops import GPUImageProcessor
-    gpu_available = True
-except ImportError:
-    gpu_available = False
+def _bgra_to_color(image_format, b, g, r, a):
+    """Turn raw BGRA channel values of the given format into a straight-alpha QColor"""
+    if image_format == QImage.Format.Format_RGB32:
+        a = 255
+    elif image_format == QImage.Format.Format_ARGB32_Premultiplied and 0 < a < 255:
+        # Undo the premultiplication, rounding like qUnpremultiply
+        r, g, b = ((c * 255 + a // 2) // a for c in (r, g, b))
+    return QColor.fromRgb(r, g, b, a)
 
-class ColorAnalysisThread(QThread):
-    """Thread for analyzing color data around cursor position"""
+def _sample_pixel(view, x, y):
+    """Read one pixel of an (image, array) view as a straight-alpha QColor"""
+    image, arr = view
+    return _bgra_to_color(image.format(), *(int(v) for v in arr[y, x]))
+
+def _sample_patch(view, x, y, radius=3):
+    """Average the (2*radius+1)^2 window around a pixel; None if it is a single pixel"""
+    image, arr = view
+    patch = arr[max(0, y - radius):y + radius + 1, max(0, x - radius):min(x + radius + 1, image.width())]
+    if patch.size == 4:
+        return None, patch.shape[:2]
+    avg = patch.reshape(-1, 4).mean(axis=0).round().astype(np.uint8)
+    return _bgra_to_color(image.format(), *(int(v) for v in avg)), patch.shape[:2]
+
+# Built on first use, since a QCursor needs the QApplication to exist
+_eyedropper_cursor = None
+
+def _get_eyedropper_cursor():
+    """Return the eyedropper cursor, drawing it the first time"""
+    global _eyedropper_cursor
+    if _eyedropper_cursor is None:
+        _eyedropper_cursor = _build_eyedropper_cursor()
+    return _eyedropper_cursor
+
+def _build_eyedropper_cursor():
+    """Create a custom eyedropper cursor"""
+    # Create an eyedropper cursor
+    cursor_pixmap = QPixmap(32, 32)
+    cursor_pixmap.fill(Qt.GlobalColor.transparent)
     
-    # Signal for when analysis is complete
-    analysisComplete = pyqtSignal(object)
+    # Draw eyedropper icon
+    painter = QPainter(cursor_pixmap)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
     
-    def __init__(self, image, pos, use_gpu=False, gpu_processor=None):
-        super().__init__()
-        self.image = image
-        self.pos = pos
-        self.use_gpu = use_gpu
-        self.gpu_processor = gpu_processor
-        
-        # Only create a new processor if one wasn't passed in and GPU is enabled
-        if use_gpu and not self.gpu_processor:
-            try:
-                from gpu_ops import GPUImageProcessor
-                self.gpu_processor = GPUImageProcessor()
-            except:
-                self.use_gpu = False
-        
-    def run(self):
-        """Run color analysis"""
-        try:
-            if self.use_gpu:
-                result = self._analyze_with_gpu()
-            else:
-                result = self._analyze_with_cpu()
-                
-            self.analysisComplete.emit(result)
-        except Exception as e:
-            print(f"Error in color analysis: {e}")
-            self.analysisComplete.emit(None)
-            
-    def _analyze_with_cpu(self):
-        """Analyze colors using CPU"""
-        # Extract the color at the cursor position with exact coordinates
-        x = max(0, min(int(self.pos.x()), self.image.width() - 1))
-        y = max(0, min(int(self.pos.y()), self.image.height() - 1))
-        color = self.image.pixelColor(x, y)
-        
-        # Simple result: just return the color and exact position
-        return {
-            'center_color': color,
-            'pos': QPoint(x, y),
-            'timestamp': QApplication.instance().processEvents()  # Add timestamp to prevent stale data
-        }
-        
-    def _analyze_with_gpu(self):
-        """Analyze colors using GPU acceleration if available"""
-        # For now, just return the same as CPU version for exact pixel analysis
-        return self._analyze_with_cpu()
+    # Draw eyedropper shape with more contrast for better visibility
+    painter.setPen(QPen(QColor(0, 0, 0), 2))
+    painter.drawLine(8, 24, 16, 16)
+    painter.drawLine(16, 16, 24, 8)
+    
+    # Draw white fill with black outline for better visibility
+    painter.setBrush(QColor(255, 255, 255))
+    painter.drawEllipse(22, 6, 6, 6)
+    
+    # Draw crosshair at the tip for precise picking - make it more visible
+    painter.setPen(QPen(QColor(255, 0, 0), 2))
+    painter.drawLine(22, 8, 26, 8)  # Horizontal line
+    painter.drawLine(24, 6, 24, 10) # Vertical line
+    
+    painter.end()
+    
+    # FIXED: Define hotspot precisely at the tip of the eyedropper (24,8)
+    return QCursor(cursor_pixmap, 24, 8)
+
+# Popup states: hover samples only update a visible popup, clicks request a show
+_POPUP_HIDDEN = 0
+_POPUP_VISIBLE = 1
+_POPUP_PENDING = 2
 
 class ColorPickerTool(Tool):
     """Tool for picking colors from the canvas with enhanced UI and features"""
@@ -74,68 +82,45 @@ class ColorPickerTool(Tool):
     def __init__(self, canvas):
         super().__init__(canvas)
         
-        # Create eyedropper cursor
-        self._create_eyedropper_cursor()
+        # Shared eyedropper cursor
+        self.cursor = _get_eyedropper_cursor()
         
         # Color popup window
         self.color_popup = ColorPopup()
         self.color_popup.hide()
+        self.color_popup.hidden.connect(self._on_popup_hidden)
         
         # Last analyzed position
         self.last_pos = QPoint(0, 0)
         
-        # Track if we're currently analyzing
-        self.analysis_in_progress = False
-        self.analysis_thread = None
-        
-        # Use GPU if available
-        self.use_gpu = gpu_available and hasattr(self.canvas, 'use_gpu') and self.canvas.use_gpu
-        self.gpu_processor = None
-        if self.use_gpu and hasattr(self.canvas, 'gpu_processor'):
-            # Reuse the existing GPU processor instead of creating a new one
-            self.gpu_processor = self.canvas.gpu_processor
-        
-        # Cache for color lookups (to avoid redundant processing)
-        self._color_cache = {}
-        self._cache_size = 100
+        # Bounded LRU cache for color lookups, keyed on plain ints; the pixel
+        # view being sampled is passed beside the key so no layer is held by it
+        self._cached_sample = lru_cache(maxsize=128)(self._sample)
+        self._sample_view = None
         
         # Store original cursor to restore later
         self.original_cursor = None
         
-        # Flag to track if popup should be shown (only when clicking)
-        self.show_popup = False
-        
-        # Track last picked color for comparison
-        self.last_picked_color = None
-        
-    def _create_eyedropper_cursor(self):
-        """Create a custom eyedropper cursor"""
-        # Create an eyedropper cursor
-        cursor_pixmap = QPixmap(32, 32)
-        cursor_pixmap.fill(Qt.GlobalColor.transparent)
-        
-        # Draw eyedropper icon
-        painter = QPainter(cursor_pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # Popup state (only shown when clicking) and the last color sent to it
+        self._popup_state = _POPUP_HIDDEN
+        self._last_rgb = None
         
-        # Draw eyedropper shape with more contrast for better visibility
-        painter.setPen(QPen(QColor(0, 0, 0), 2))
-        painter.drawLine(8, 24, 16, 16)
-        painter.drawLine(16, 16, 24, 8)
+        # Layer hit by the last pick, tried before any scene lookup
+        self._cached_item = None
         
-        # Draw white fill with black outline for better visibility
-        painter.setBrush(QColor(255, 255, 255))
-        painter.drawEllipse(22, 6, 6, 6)
+        # Hover samples are coalesced to at most one per frame
+        self._pending_pos = None
+        self._sample_timer = QTimer(self)
+        self._sample_timer.setSingleShot(True)
+        self._sample_timer.timeout.connect(self._flush_pending)
         
-        # Draw crosshair at the tip for precise picking - make it more visible
-        painter.setPen(QPen(QColor(255, 0, 0), 2))
-        painter.drawLine(22, 8, 26, 8)  # Horizontal line
-        painter.drawLine(24, 6, 24, 10) # Vertical line
+        # Screen the popup was last placed on, re-queried only when the cursor leaves it
+        self._last_screen = None
+        self._last_geom = None
         
-        painter.end()
-        
-        # FIXED: Define hotspot precisely at the tip of the eyedropper (24,8)
-        self.cursor = QCursor(cursor_pixmap, 24, 8)
+        # Region pick also finds the dominant color around each click
+        self.region_pick = False
+        self.region_radius = 16
         
     def activate(self):
         """Activate the color picker tool"""
@@ -157,10 +142,12 @@ class ColorPickerTool(Tool):
         
         # Hide popup when tool is activated
         self.color_popup.hide()
-        self.show_popup = False
         
         # Clear the cache when activating to ensure fresh data
-        self._color_cache.clear()
+        self._cached_sample.cache_clear()
+        
+        # Screens may have been added or removed since the last use
+        self._last_screen = None
         
         self.statusChanged.emit("Color Picker: Click to sample color")
         
@@ -168,7 +155,6 @@ class ColorPickerTool(Tool):
         """Deactivate the color picker tool"""
         # Hide color popup
         self.color_popup.hide()
-        self.show_popup = False
         
         # Restore original cursor
         if self.original_cursor:
@@ -177,12 +163,12 @@ class ColorPickerTool(Tool):
         # Also restore override cursor if set
         QApplication.restoreOverrideCursor()
         
-        # Stop any running thread before deactivating
-        if self.analysis_thread and self.analysis_thread.isRunning():
-            self.analysis_thread.quit()
-            self.analysis_thread.wait(300)  # Wait with timeout
-            
         self.active = False
+        self._cached_item = None
+        self._sample_view = None
+        self._cached_sample.cache_clear()
+        self._sample_timer.stop()
+        self._pending_pos = None
         
     def mouse_press(self, event):
         """Handle mouse press event - pick color at cursor position"""
@@ -192,11 +178,8 @@ class ColorPickerTool(Tool):
         # Fixed: Convert QPointF to QPoint for proper handling
         view_pos = event.position().toPoint()
         
-        # Set flag to show popup when picking completes
-        self.show_popup = True
-        
-        # Reset the last picked color to force update
-        self.last_picked_color = None
+        # Show the popup when picking completes, even for an unchanged color
+        self._popup_state = _POPUP_PENDING
         
         # Pick color at the exact position
         self._pick_color_at(view_pos)
@@ -211,157 +194,137 @@ class ColorPickerTool(Tool):
         
         # We'll only update colors in the popup if it's already visible (from a click)
         # but we won't show the popup just by moving the mouse
-        if self.color_popup.isVisible() and not self.analysis_in_progress:
+        if self._popup_state == _POPUP_VISIBLE:
             # Fixed: Convert QPointF to QPoint for proper handling
-            view_pos = event.position().toPoint()
-            self._pick_color_at(view_pos)
+            self._pending_pos = event.position().toPoint()
+            if not self._sample_timer.isActive():
+                self._sample_timer.start(16)
             event.accept()
+            
+    def _flush_pending(self):
+        """Sample the latest hover position once the frame interval has passed"""
+        if self._popup_state == _POPUP_VISIBLE and self._pending_pos is not None:
+            self._pick_color_at(self._pending_pos)
+        self._pending_pos = None
         
     def _get_exact_image_pos(self, view_pos):
         """Get the exact image coordinates from view position, accounting for all transformations"""
         # Convert view position to scene coordinates
         scene_pos = self.canvas.mapToScene(view_pos)
         
-        # Find item at scene position
-        item = self.canvas.scene.itemAt(scene_pos, self.canvas.transform())
-        if not item or not hasattr(item, 'original_image') or item.original_image is None:
-            return None, None, None
-            
-        # Get item-local coordinates
-        item_pos = item.mapFromScene(scene_pos)
-        
-        # Account for item scaling by dividing by scale factors
-        if hasattr(item, 'scale_x') and hasattr(item, 'scale_y') and item.scale_x > 0 and item.scale_y > 0:
-            # Dividing by scale factor converts from scaled coordinate space to original image space
-            x = round(item_pos.x() / item.scale_x)
-            y = round(item_pos.y() / item.scale_y)
+        # Try the last hit and the active layer before hit-testing the whole scene
+        layers_here = None
+        for item in (self._cached_item, self.canvas.active_layer):
+            if (item is None or item.scene() is not self.canvas.scene or not item.isVisible()
+                    or item.original_image is None):
+                continue
+            # The layer caches its scene-to-image transform, scale included
+            image_pos = item.image_transform().map(scene_pos)
+            if QRectF(item.original_image.rect()).contains(image_pos):
+                # Only take the shortcut when no visible layer is stacked above it here
+                if layers_here is None:
+                    layers_here = self.canvas.scene.layer_index.intersecting(QRectF(scene_pos, QSizeF(1, 1)))
+                z = item.zValue()
+                if not any(other.zValue() > z and other.isVisible() for other in layers_here):
+                    break
         else:
-            # Fallback to direct conversion if scale attributes aren't available
-            x = round(item_pos.x())
-            y = round(item_pos.y())
+            # Find item at scene position
+            item = self.canvas.scene.itemAt(scene_pos, self.canvas.transform())
+            if not hasattr(item, 'image_transform') or item.original_image is None:
+                return None, None, None
+            image_pos = item.image_transform().map(scene_pos)
+        self._cached_item = item
         
-        # Clamp to valid image dimensions
-        x = max(0, min(x, item.original_image.width() - 1))
-        y = max(0, min(y, item.original_image.height() - 1))
+        x = round(image_pos.x())
+        y = round(image_pos.y())
         
-        # Additional debugging to help identify issues
-        if not (0 <= x < item.original_image.width() and 0 <= y < item.original_image.height()):
-            print(f"Warning: Coordinates out of bounds - x:{x}, y:{y}, width:{item.original_image.width()}, height:{item.original_image.height()}")
-            return None, None, None
-            
+        # Clamp to valid image dimensions
+        w1 = item.original_image.width() - 1
+        h1 = item.original_image.height() - 1
+        x = 0 if x < 0 else (w1 if x > w1 else x)
+        y = 0 if y < 0 else (h1 if y > h1 else y)
         return item, x, y
     
     def _pick_color_at(self, pos):
         """Pick color at given view position with improved precision"""
-        if self.analysis_in_progress:
-            return
-            
         # Get exact image position with all transformations accounted for
         item, x, y = self._get_exact_image_pos(pos)
         if item is None or x is None or y is None:
             return
             
-        # Build a more comprehensive cache key that accounts for transformations
-        item_transform = item.transform()
-        cache_key = f"{x}_{y}_{item.pos().x()}_{item.pos().y()}_{item_transform.m11()}_{item_transform.m22()}"
-        
-        if cache_key in self._color_cache:
-            self._update_popup_with_color(self._color_cache[cache_key])
-            return
-        
-        # Mark analysis as in progress
-        self.analysis_in_progress = True
-        
-        # Create and start a new thread for color analysis
-        if self.analysis_thread and self.analysis_thread.isRunning():
-            self.analysis_thread.quit()
-            self.analysis_thread.wait(100)  # Quick wait with timeout
-        
-        # Create a new thread for color analysis with precise coordinates
-        self.analysis_thread = ColorAnalysisThread(
-            item.original_image, 
-            QPoint(x, y),  # Use exact pixel coordinates
-            self.use_gpu,
-            self.gpu_processor
-        )
-        
-        # Connect the signal from the thread to our handler
-        self.analysis_thread.analysisComplete.connect(self._on_analysis_complete)
-        
-        # Start the thread
-        self.analysis_thread.start()
-        
-        # Store the view position and item for the result callback
+        # x/y are already image coordinates, so the image's cache key is the only other input
+        view = self._sample_view = item.pixel_view()
+        color = self._cached_sample(item.original_image.cacheKey(), x, y)
+        result = {
+            'center_color': QColor(color),
+            'pos': QPoint(x, y),
+            'view_pos': pos
+        }
         self.last_pos = pos
-        self.last_item = item
-        
-    def _on_analysis_complete(self, result):
-        """Handle completion of color analysis"""
-        self.analysis_in_progress = False
         
-        if not result:
-            return
-            
-        # Store view position information
-        result['view_pos'] = self.last_pos
-        
-        # Add item transform information for a more precise cache key
-        if hasattr(self, 'last_item') and self.last_item:
-            item_transform = self.last_item.transform()
-            item_pos = self.last_item.pos()
-            cache_key = (f"{int(result['pos'].x())}_{int(result['pos'].y())}_"
-                        f"{item_pos.x()}_{item_pos.y()}_"
-                        f"{item_transform.m11()}_{item_transform.m22()}")
-            
-            # Update cache with comprehensive key
-            self._color_cache[cache_key] = result
-            
-            # Trim cache if needed
-            if len(self._color_cache) > self._cache_size:
-                # Remove oldest entries
-                for key in list(self._color_cache.keys())[:10]:
-                    self._color_cache.pop(key, None)
+        # On clicks, also average the surrounding window for the popup
+        if self._popup_state == _POPUP_PENDING:
+            result['avg_color'], result['patch_shape'] = _sample_patch(view, x, y)
+            if self.region_pick:
+                result['dominant_color'] = self._dominant_color_at(view, x, y)
         
         # Update UI
         self._update_popup_with_color(result)
             
+    def _dominant_color_at(self, view, x, y):
+        """Find the most common color in the region around a pixel"""
+        image, arr = view
+        r = self.region_radius
+        rgb = dominant_color(arr[max(0, y - r):y + r + 1, max(0, x - r):min(x + r + 1, image.width())])
+        return QColor(*rgb) if rgb is not None else None
+        
+    def _sample(self, image_key, x, y):
+        """Read a pixel from the current pixel view; image_key identifies its image"""
+        return _sample_pixel(self._sample_view, x, y)
+        
     def _update_popup_with_color(self, result):
         """Update the color popup with the analyzed result"""
         # Get the color
         color = result['center_color']
         
-        # Only update if the color has changed (to avoid unnecessary UI updates)
-        if self.last_picked_color and self.last_picked_color.rgb() == color.rgb() and not self.show_popup:
+        # Hover samples of an unchanged color need no UI update; clicks always show
+        state = self._popup_state
+        if state == _POPUP_VISIBLE and color.rgb() == self._last_rgb:
+            return
+        if state == _POPUP_HIDDEN:
             return
             
         # Update the popup data
         self.color_popup.update_color(color)
-        self.last_picked_color = color
-        
-        # Only show popup if explicitly requested (on click)
-        if not self.show_popup and not self.color_popup.isVisible():
-            return
+        self._last_rgb = color.rgb()
             
         # Position popup using screen-aware positioning
         self._position_popup_safely()
+        self._popup_state = _POPUP_VISIBLE
         
-        # Reset flag after showing
-        self.show_popup = False
+    def _on_popup_hidden(self):
+        """Stop hover sampling once the popup is hidden or closed"""
+        self._popup_state = _POPUP_HIDDEN
+        self._sample_timer.stop()
+        self._pending_pos = None
         
     def _position_popup_safely(self):
         """Position the popup with enhanced edge detection to handle all screen edges"""
         # Get current cursor position and screen info
         cursor_pos = QCursor.pos()
-        screen = QApplication.screenAt(cursor_pos)
-        if not screen:
-            screen = QApplication.primaryScreen()
+        if self._last_screen is None or not self._last_geom.contains(cursor_pos):
+            screen = QApplication.screenAt(cursor_pos)
+            if not screen:
+                screen = QApplication.primaryScreen()
+            self._last_screen = screen
+            self._last_geom = screen.geometry()
         
         # Get popup dimensions
         popup_width = self.color_popup.width()
         popup_height = self.color_popup.height()
         
         # Get available screen geometry (accounts for taskbar and other system UI)
-        available_geometry = screen.availableGeometry()
+        available_geometry = self._last_screen.availableGeometry()
         
         # Default position: to the right and below cursor
         x = cursor_pos.x() + 20
@@ -406,13 +369,6 @@ class ColorPickerTool(Tool):
     def __del__(self):
         """Clean up resources when the tool is destroyed"""
         try:
-            # Clean up analysis thread if it exists
-            if hasattr(self, 'analysis_thread') and self.analysis_thread:
-                if self.analysis_thread.isRunning():
-                    self.analysis_thread.quit()
-                    self.analysis_thread.wait(100)
-                self.analysis_thread = None
-                
             # Close the color popup
             if hasattr(self, 'color_popup') and self.color_popup:
                 self.color_popup.hide()
@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QPushButton, QApplication, QFrame)
-from PyQt6.QtGui import QColor, QPainter, QPen, QBrush, QFont
+from PyQt6.QtGui import QColor, QPainter, QPen, QBrush, QFont, QPixmap
 from PyQt6.QtCore import Qt, QRect, pyqtSignal, QPoint, QSize
 
 from style_utils import COLORS, apply_glass_effect
@@ -15,6 +15,14 @@ class ColorDisplay(QFrame):
         self.setFrameShape(QFrame.Shape.Box)
         self.setFrameShadow(QFrame.Shadow.Sunken)
         
+        # One 2x2 checker tile, blitted repeatedly behind transparent colors
+        self._checker = QPixmap(20, 20)
+        self._checker.fill(Qt.GlobalColor.white)
+        tile_painter = QPainter(self._checker)
+        tile_painter.fillRect(0, 0, 10, 10, Qt.GlobalColor.lightGray)
+        tile_painter.fillRect(10, 10, 10, 10, Qt.GlobalColor.lightGray)
+        tile_painter.end()
+        
     def setColor(self, color):
         """Set color to display"""
         self.color = color
@@ -27,13 +35,7 @@ class ColorDisplay(QFrame):
         
         # Draw checkerboard for transparent colors
         if self.color.alpha() < 255:
-            square_size = 10
-            for x in range(0, self.width(), square_size):
-                for y in range(0, self.height(), square_size):
-                    if (x // square_size + y // square_size) % 2 == 0:
-                        painter.fillRect(x, y, square_size, square_size, Qt.GlobalColor.lightGray)
-                    else:
-                        painter.fillRect(x, y, square_size, square_size, Qt.GlobalColor.white)
+            painter.drawTiledPixmap(self.rect(), self._checker)
         
         # Draw the actual color
         painter.setBrush(QBrush(self.color))
@@ -57,6 +59,10 @@ class MagnifierView(QFrame):
         self.center_pos = QPoint(0, 0)
         self.zoom_factor = 8  # How much to magnify
         
+        # Grid and center marker, rendered once per size/zoom
+        self._overlay = None
+        self._overlay_key = None
+        
     def setPixmap(self, pixmap, center_pos):
         """Set pixmap to display and center position"""
         self.pixmap = pixmap
@@ -92,6 +98,19 @@ class MagnifierView(QFrame):
         # Draw the magnified area
         painter.drawPixmap(self.rect(), self.pixmap, src_rect)
         
+        # Draw grid and center marker from the cached overlay
+        key = (self.width(), self.height(), self.zoom_factor)
+        if key != self._overlay_key:
+            self._overlay = self._build_overlay(src_size)
+            self._overlay_key = key
+        painter.drawPixmap(0, 0, self._overlay)
+        
+    def _build_overlay(self, src_size):
+        """Render the pixel grid and center marker into a transparent pixmap"""
+        overlay = QPixmap(self.size())
+        overlay.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(overlay)
+        
         # Draw grid
         painter.setPen(QPen(QColor(0, 0, 0, 100)))
         
@@ -117,17 +136,23 @@ class MagnifierView(QFrame):
         painter.setPen(QPen(Qt.GlobalColor.red, 2))
         painter.setBrush(Qt.BrushStyle.NoBrush)
         painter.drawRect(center_rect)
+        painter.end()
+        return overlay
 
 class ColorPopup(QWidget):
     """Popup window to display color information"""
     
     colorPicked = pyqtSignal(QColor)
+    hidden = pyqtSignal()
     
     def __init__(self, parent=None):
         super().__init__(parent, Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
         self.setWindowTitle("Color Picker")
         self.setWindowFlags(self.windowFlags() | Qt.WindowType.FramelessWindowHint)
         
+        # Last color shown, so repeated samples don't touch the labels
+        self._last_rgba = None
+        
         # Set up UI
         self.setup_ui()
         
@@ -257,6 +282,11 @@ class ColorPopup(QWidget):
         if not isinstance(color, QColor):
             color = QColor(color)
             
+        # Nothing to do if the same color is sampled again
+        if color.rgba() == self._last_rgba:
+            return
+        self._last_rgba = color.rgba()
+            
         # Update color display
         self.color_display.setColor(color)
         
@@ -265,14 +295,16 @@ class ColorPopup(QWidget):
         self.rgb_label.setText(f"{color.red()}, {color.green()}, {color.blue()}")
         
         # Calculate HSV
-        hue = color.hue()
-        saturation = int(color.saturationF() * 100)
-        value = int(color.valueF() * 100)
-        self.hsv_label.setText(f"{hue if hue >= 0 else 0}°, {saturation}%, {value}%")
+        self.hsv_label.setText(f"{max(color.hue(), 0)}°, {int(color.saturationF() * 100)}%, {int(color.valueF() * 100)}%")
         
         # Emit signal
         self.colorPicked.emit(color)
         
+    def hideEvent(self, event):
+        """Let the owner know the popup went away, including via its Close button"""
+        super().hideEvent(event)
+        self.hidden.emit()
+        
     def copy_hex_to_clipboard(self):
         """Copy hex color value to clipboard"""
         clipboard = QApplication.clipboard()
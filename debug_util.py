@@ -1,37 +1,59 @@
-import inspect
-import datetime
+import sys
+import atexit
+import time
 import os
 
 # Global debug flag
 DEBUG_ENABLED = True
 LOG_FILE = "c:\\Users\\Administrator\\Desktop\\testing\\debug.log"
 CONSOLE_OUTPUT = False  # Set to False to disable console output
+FLUSH_INTERVAL = 1.0  # Seconds between flushes of buffered INFO lines
 
-def debug_log(message, level="INFO"):
-    """Log a debug message to console and file"""
-    if not DEBUG_ENABLED:
-        return
-        
-    # Get caller info
-    caller_frame = inspect.currentframe().f_back
-    caller_info = inspect.getframeinfo(caller_frame)
-    
-    # Format message with timestamp and caller info
-    # Fixed timestamp format with proper microsecond precision
-    timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
-    file_name = os.path.basename(caller_info.filename)
-    line_num = caller_info.lineno
-    
-    log_message = f"[{timestamp}] [{level}] {file_name}:{line_num} - {message}"
-    
-    # Print to console if enabled
-    if CONSOLE_OUTPUT:
-        print(log_message)
-    
-    # Write to file
+# Keep one buffered handle open instead of reopening the file for every line
+_log_fh = None
+_last_flush = 0.0
+if DEBUG_ENABLED:
     try:
-        with open(LOG_FILE, "a") as f:
-            f.write(log_message + "\n")
-    except Exception as e:
+        _log_fh = open(LOG_FILE, "a", buffering=1 << 16)
+        atexit.register(_log_fh.close)
+    except OSError as e:
+        if CONSOLE_OUTPUT:
+            print(f"Error opening log file: {e}")
+
+if DEBUG_ENABLED:
+    def debug_log(message, level="INFO"):
+        """Log a debug message to console and file"""
+        global _last_flush
+        
+        # Get caller info straight from the frame; no source lookup needed
+        caller_frame = sys._getframe(1)
+        
+        # Format message with timestamp and caller info
+        # Millisecond timestamp without building a datetime object
+        now = time.time()
+        timestamp = f"{time.strftime('%H:%M:%S', time.localtime(now))}.{int(now % 1 * 1000):03d}"
+        file_name = os.path.basename(caller_frame.f_code.co_filename)
+        line_num = caller_frame.f_lineno
+        
+        log_message = f"[{timestamp}] [{level}] {file_name}:{line_num} - {message}"
+        
+        # Print to console if enabled
         if CONSOLE_OUTPUT:
-            print(f"Error writing to log file: {e}")
+            print(log_message)
+        
+        # Write to file
+        if _log_fh is not None:
+            try:
+                _log_fh.write(log_message + "\n")
+                # Flush warnings and errors at once and the rest periodically,
+                # so a crash loses at most the last moment of the log
+                if level != "INFO" or now - _last_flush >= FLUSH_INTERVAL:
+                    _log_fh.flush()
+                    _last_flush = now
+            except Exception as e:
+                if CONSOLE_OUTPUT:
+                    print(f"Error writing to log file: {e}")
+else:
+    # Callers pay only for an empty call when logging is off
+    def debug_log(message, level="INFO"):
+        """Debug logging is disabled"""
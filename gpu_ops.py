@@ -6,24 +6,97 @@ except ImportError:
     OPENCL_AVAILABLE = False
     
 from PyQt6.QtGui import QImage
-from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
-from PIL import Image
-import io
 import os
-import tempfile
+import hashlib
+import threading
+
+def rgba_view(image):
+    """Wrap a QImage's pixels in an (height, width, 4) RGBA8888 NumPy view, without copying"""
+    if image.format() != QImage.Format.Format_RGBA8888:
+        image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    arr = np.frombuffer(ptr, dtype=np.uint8).reshape(image.height(), image.bytesPerLine() // 4, 4)
+    # Return the image too, so the memory behind the view stays alive
+    return image, arr[:, :image.width()]
+
+_KERNEL_SOURCE = """
+__kernel void scale_image(__global const uchar4* input,
+                          __global uchar4* output)
+{
+    int dst_x = get_global_id(0);
+    int dst_y = get_global_id(1);
+
+    if (dst_x >= DST_W || dst_y >= DST_H)
+        return;
+
+    int src_x = min((int)(dst_x * SCALE_X), SRC_W - 1);
+    int src_y = min((int)(dst_y * SCALE_Y), SRC_H - 1);
+
+    output[dst_y * DST_W + dst_x] = input[src_y * SRC_W + src_x];
+}
+"""
+
+_KERNEL_SOURCE = """
+__kernel void sharpen(__global const uchar4* input,
+                      __global uchar4* output,
+                      const int width,
+                      const int height,
+                      const float amount)
+{
+    int x = get_global_id(0);
+    int y = get_global_id(1);
+
+    if (x >= width || y >= height)
+        return;
+
+    // 3x3 neighborhood sum with reflect-101 borders, like cv2.filter2D
+    float4 sum = (float4)(0.0f);
+    for (int dy = -1; dy <= 1; dy++) {
+        int yy = y + dy;
+        yy = yy < 0 ? 1 : (yy >= height ? height - 2 : yy);
+        for (int dx = -1; dx <= 1; dx++) {
+            int xx = x + dx;
+            xx = xx < 0 ? 1 : (xx >= width ? width - 2 : xx);
+            sum += convert_float4(input[yy * width + xx]);
+        }
+    }
+
+    uchar4 pixel = input[y * width + x];
+    float4 center = convert_float4(pixel);
+    uchar4 result = convert_uchar4_sat_rte((1.0f + 8.0f * amount) * center - amount * (sum - center));
+    result.w = pixel.w;  // Keep alpha
+    output[y * width + x] = result;
+}
+"""
+_KERNEL_KEY = hashlib.sha1(_KERNEL_SOURCE.encode()).hexdigest()
+
+# Built programs keyed by (context pointer, source hash)
+_program_cache = {}
+
+def _next_pow2(n):
+    """Smallest power of two that is at least n"""
+    return 1 << (n - 1).bit_length()
 
 class GPUImageProcessor:
     def __init__(self):
         self.initialized = False
         
+        # Pinned (ALLOC_HOST_PTR) buffers reused across calls, grown to the next power of two
+        self._src_buf = None
+        self._src_cap = 0
+        self._dst_buf = None
+        self._dst_cap = 0
+        # Filter threads share one processor and its buffers
+        self._lock = threading.Lock()
+        
         if not OPENCL_AVAILABLE:
             print("PyOpenCL not available. Using CPU processing.")
             return
             
         try:
-            # Disable/Log compiler warnings
+            # Silence compiler warnings
             os.environ['PYOPENCL_COMPILER_OUTPUT'] = '0'
-            os.environ['PYOPENCL_NO_CACHE'] = '1'
             
             platforms = cl.get_platforms()
             if not platforms:
@@ -40,7 +113,9 @@ class GPUImageProcessor:
                     return
             
             self.context = cl.Context(devices)
+            # Transfers get their own queue; kernels wait on their upload events instead of a full sync
             self.queue = cl.CommandQueue(self.context)
+            self.upload_queue = cl.CommandQueue(self.context)
             self.build_programs()
             
             self.initialized = True
@@ -50,107 +125,82 @@ class GPUImageProcessor:
             self.initialized = False
     
     def build_programs(self):
-        self.program = cl.Program(self.context, """
-            __kernel void scale_image(__global const uchar4* input, 
-                                    __global uchar4* output,
-                                    const int src_width, 
-                                    const int src_height,
-                                    const int dst_width, 
-                                    const int dst_height)
-            {
-                int dst_x = get_global_id(0);
-                int dst_y = get_global_id(1);
-                
-                if (dst_x >= dst_width || dst_y >= dst_height)
-                    return;
-                
-                float scale_x = (float)src_width / dst_width;
-                float scale_y = (float)src_height / dst_height;
-                
-                int src_x = (int)(dst_x * scale_x);
-                int src_y = (int)(dst_y * scale_y);
-                
-                src_x = min(src_x, src_width - 1);
-                src_y = min(src_y, src_height - 1);
-                
-                int src_idx = src_y * src_width + src_x;
-                int dst_idx = dst_y * dst_width + dst_x;
-                
-                output[dst_idx] = input[src_idx];
-            }
-        """).build()
-
-    def scale_image(self, img, scale_x, scale_y):
-        if not self.initialized:
+        # Programs are shared per context; pyopencl also caches the compiled binary on disk
+        key = (self.context.int_ptr, _KERNEL_KEY)
+        self.program = _program_cache.get(key)
+        if self.program is None:
+            self.program = cl.Program(self.context, _KERNEL_SOURCE).build()
+            _program_cache[key] = self.program
+        
+    def _upload(self, src, dst_bytes):
+        """Make an (h, w, 4) uint8 source available to the device; returns the input buffer and events to wait for"""
+        if dst_bytes > self._dst_cap:
+            self._dst_cap = _next_pow2(dst_bytes)
+            self._dst_buf = cl.Buffer(self.context, cl.mem_flags.WRITE_ONLY | cl.mem_flags.ALLOC_HOST_PTR,
+                                      size=self._dst_cap)
+        
+        height, width = src.shape[:2]
+        row_bytes = width * 4
+        # Views with padded rows (e.g. sub-images) are uploaded row by row without repacking
+        strided_rows = src.dtype == np.uint8 and not src.flags.c_contiguous and src.strides[1:] == (4, 1)
+        if not strided_rows:
+            src = np.ascontiguousarray(src, dtype=np.uint8)
+            # Page-aligned host arrays can be shared with the device as-is (zero copy)
+            if src.ctypes.data % 4096 == 0:
+                return cl.Buffer(self.context, cl.mem_flags.READ_ONLY | cl.mem_flags.USE_HOST_PTR, hostbuf=src), []
+        
+        # Otherwise stage through the reused page-locked buffer, so the transfer can DMA directly
+        nbytes = row_bytes * height
+        if nbytes > self._src_cap:
+            self._src_cap = _next_pow2(nbytes)
+            self._src_buf = cl.Buffer(self.context, cl.mem_flags.READ_ONLY | cl.mem_flags.ALLOC_HOST_PTR,
+                                      size=self._src_cap)
+        
+        if strided_rows:
+            # Rectangular copy from the byte span the rows occupy
+            span = np.lib.stride_tricks.as_strided(src, shape=((height - 1) * src.strides[0] + row_bytes,),
+                                                   strides=(1,), writeable=False)
+            upload_event = cl.enqueue_copy(self.upload_queue, self._src_buf, span, buffer_origin=(0, 0),
+                                           host_origin=(0, 0), region=(row_bytes, height),
+                                           buffer_pitches=(row_bytes,), host_pitches=(src.strides[0],),
+                                           is_blocking=False)
+        else:
+            # Write the source straight into the mapped pinned input buffer
+            mapped_src, _ = cl.enqueue_map_buffer(self.upload_queue, self._src_buf,
+                                                  cl.map_flags.WRITE_INVALIDATE_REGION, 0, (nbytes,), np.uint8)
+            mapped_src[:] = src.reshape(-1)
+            upload_event = mapped_src.base.release(self.upload_queue)
+        return self._src_buf, [upload_event]
+        
+    def sharpen(self, arr, amount):
+        """Sharpen an (h, w, 4) RGBA array on the device; None if unavailable or it fails"""
+        height, width = arr.shape[:2]
+        if not self.initialized or height < 3 or width < 3:
             return None
             
         try:
-            # Convert QImage to numpy array without using temporary files
-            if isinstance(img, QImage):
-                # Create in-memory buffer
-                byte_array = QByteArray()
-                buffer = QBuffer(byte_array)
-                buffer.open(QIODevice.OpenModeFlag.WriteOnly)
-                img.save(buffer, "PNG")
-                buffer.close()
-                
-                # Convert buffer data to numpy array using PIL
-                from PIL import Image
-                import io
-                pil_img = Image.open(io.BytesIO(byte_array.data()))
-                src_array = np.array(pil_img)
-            else:
-                src_array = img
-                
-            if len(src_array.shape) == 3:
-                src_height, src_width, channels = src_array.shape
-            else:
-                src_height, src_width = src_array.shape
-                channels = 1
-                
-            dst_width = max(1, int(src_width * scale_x))
-            dst_height = max(1, int(src_height * scale_y))
-            
-            # Convert to RGBA if needed
-            if channels != 4:
-                if channels == 3:
-                    rgba_array = np.zeros((src_height, src_width, 4), dtype=np.uint8)
-                    rgba_array[:, :, :3] = src_array
-                    rgba_array[:, :, 3] = 255
-                    src_array = rgba_array
-                elif channels == 1:
-                    rgba_array = np.zeros((src_height, src_width, 4), dtype=np.uint8)
-                    rgba_array[:, :, :3] = np.repeat(src_array[:, :, np.newaxis], 3, axis=2)
-                    rgba_array[:, :, 3] = 255
-                    src_array = rgba_array
-            
-            flat_src = src_array.reshape(-1).astype(np.uint8)
-            
-            src_buf = cl.Buffer(self.context, cl.mem_flags.READ_ONLY | cl.mem_flags.COPY_HOST_PTR, 
-                               hostbuf=flat_src)
-            dst_buf = cl.Buffer(self.context, cl.mem_flags.WRITE_ONLY, 
-                               size=dst_width * dst_height * 4)
-            
-            self.program.scale_image(self.queue, (dst_width, dst_height), None,
-                                   src_buf, dst_buf,
-                                   np.int32(src_width), np.int32(src_height),
-                                   np.int32(dst_width), np.int32(dst_height))
-            
-            result = np.empty(dst_width * dst_height * 4, dtype=np.uint8)
-            cl.enqueue_copy(self.queue, result, dst_buf)
-            
-            result_img = result.reshape(dst_height, dst_width, 4)
-            
-            # Convert numpy array directly to QImage without temporary files
-            height, width = result_img.shape[:2]
-            bytes_per_line = width * 4
-            qt_image = QImage(result_img.data, width, height, bytes_per_line, QImage.Format.Format_RGBA8888).copy()
-            
-            return qt_image
-            
+            with self._lock:
+                src_buf, upload_events = self._upload(arr, height * width * 4)
+                self.program.sharpen(self.queue, (width, height), None,
+                                     src_buf, self._dst_buf,
+                                     np.int32(width), np.int32(height), np.float32(amount),
+                                     wait_for=upload_events)
+                result = np.empty_like(arr)
+                cl.enqueue_copy(self.queue, result, self._dst_buf)
+            return result
         except Exception as e:
-            print(f"GPU scaling failed: {e}")
+            print(f"GPU sharpen failed: {e}")
             return None
-            
+
     def is_available(self):
         return self.initialized
+
+# One OpenCL context per process; building it is slow and each one holds device memory
+_shared_processor = None
+
+def get_shared_processor():
+    """Return the process-wide GPUImageProcessor, creating it on first use"""
+    global _shared_processor
+    if _shared_processor is None:
+        _shared_processor = GPUImageProcessor()
+    return _shared_processor
@@ -1,10 +1,11 @@
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QBuffer, QIODevice
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt6.QtGui import QCursor, QImage, QIcon, QPainter, QPixmap
 from PyQt6.QtWidgets import QMessageBox
 
 import numpy as np
 import cv2
 from tools import Tool
+from gpu_ops import rgba_view
 
 try:
     from gpu_ops import GPUImageProcessor
@@ -12,27 +13,72 @@ try:
 except ImportError:
     gpu_available = False
 
+try:
+    from numba import njit, prange
+    numba_available = True
+except ImportError:
+    numba_available = False
+
+if numba_available:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _sharpen_rgba(arr, amount):
+        """Closed-form 3x3 sharpen, (1+8a)*center - a*neighbors, with reflect-101 borders like filter2D"""
+        height, width = arr.shape[0], arr.shape[1]
+        out = np.empty_like(arr)
+        center_gain = 1.0 + 8.0 * amount
+        for y in prange(height):
+            ys = (1 if y == 0 else y - 1, y, height - 2 if y == height - 1 else y + 1)
+            for x in range(width):
+                xs = (1 if x == 0 else x - 1, x, width - 2 if x == width - 1 else x + 1)
+                for c in range(3):
+                    total = 0.0
+                    for yy in ys:
+                        for xx in xs:
+                            total += arr[yy, xx, c]
+                    center = float(arr[y, x, c])
+                    v = center_gain * center - amount * (total - center)
+                    out[y, x, c] = min(255, max(0, int(np.rint(v))))
+                out[y, x, 3] = arr[y, x, 3]
+        return out
+
 class GPUBasedTool(Tool):
     """Base class for GPU-accelerated tools"""
     
     def __init__(self, canvas):
         super().__init__(canvas)
         self.original_image = None
+        self._original_rgba = None
+        self._original_ndarray = None
         self.parameters = {}
         self.work_thread = None
         
+        # Requests arriving within one frame are coalesced into a single processing pass
+        self._pending_timer = QTimer(self)
+        self._pending_timer.setSingleShot(True)
+        self._pending_timer.setInterval(16)
+        self._pending_timer.timeout.connect(self.process_image)
+        
+        # Parameter types come from the declared controls, so updates need no trial casts
+        controls = self.get_controls()
+        self._param_types = {"apply": bool}
+        self._param_types.update((param["name"], float) for param in controls.get("params", []))
+        self._param_types.update((combo["name"], str) for combo in controls.get("combos", []))
+        
     def activate(self):
         """Store original image when tool is activated"""
         super().activate()
         # Make sure we get the active layer and its original image
         if self.canvas.active_layer and self.canvas.active_layer.original_image:
             self.original_image = self.canvas.active_layer.original_image.copy()
+            # Decode once per activation; every slider update reuses this read-only view
+            self._original_rgba, self._original_ndarray = rgba_view(self.original_image)
             # Process the image right away 
             self.process_image()
             
     def deactivate(self):
         """Reset to original image when tool is deactivated"""
-        # Cancel any ongoing processing thread with proper timeout
+        # Drop any queued request, then cancel ongoing processing with proper timeout
+        self._pending_timer.stop()
         if self.work_thread and self.work_thread.isRunning():
             self.work_thread.requestInterruption()
             if not self.work_thread.wait(1000):  # Wait up to 1 second
@@ -41,32 +87,24 @@ class GPUBasedTool(Tool):
         # Reset image and call parent deactivate
         if self.canvas.active_layer and self.original_image:
             self.canvas.active_layer.set_image(self.original_image)
+        self._original_rgba = None
+        self._original_ndarray = None
         super().deactivate()
         
     def update_parameter(self, name, value):
         """Update a parameter and reprocess the image"""
-        # Update parameter value
-        if isinstance(value, str) and name in self.parameters:
-            self.parameters[name] = value
-        else:
-            try:
-                self.parameters[name] = float(value)
-            except (ValueError, TypeError):
-                self.parameters[name] = value
+        # Update parameter value using its declared type
+        self.parameters[name] = self._param_types.get(name, float)(value)
                 
         # Only process image when "apply" is triggered
         if name == "apply":
-            self.process_image()
+            self._pending_timer.start()
         
     def process_image(self, delay=False):
         """Process the image with current parameters"""
-        if not self.canvas.active_layer or not self.original_image:
+        if not self.canvas.active_layer or self._original_ndarray is None:
             return
             
-        # Store original image when first used
-        if not self.original_image and self.canvas.active_layer.original_image:
-            self.original_image = self.canvas.active_layer.original_image
-            
         # Cancel any ongoing processing
         if self.work_thread and self.work_thread.isRunning():
             self.work_thread.requestInterruption()
@@ -74,7 +112,8 @@ class GPUBasedTool(Tool):
             
         # Start new processing thread
         self.work_thread = ImageProcessingThread(
-            self.original_image, 
+            self._original_rgba,
+            self._original_ndarray, 
             self.parameters,
             self.process_array
         )
@@ -90,20 +129,18 @@ class GPUBasedTool(Tool):
         if result is None or not self.canvas.active_layer:
             return
             
-        # Store the previous image state for undo/redo
-        previous_image = None
-        if self.canvas.active_layer.original_image:
-            previous_image = self.canvas.active_layer.original_image.copy()
+        # Keep the previous image for undo/redo; set_image replaces it rather than editing it
+        previous_image = self.canvas.active_layer.original_image
         
         # Update the image
         self.canvas.active_layer.set_image(result)
         
-        # Add to history stack for undo/redo support
+        # Add to history stack for undo/redo support, as a compressed patch
         if previous_image and hasattr(self.canvas, 'history'):
-            self.canvas.history.add_command("filter", 
-                                          self.canvas.active_layer,
-                                          previous_image,  # Previous image
-                                          result.copy())   # New image
+            self.canvas.history.add_image_change(self.canvas.active_layer, previous_image, result)
+            
+        # Let the layer panel pick up the new thumbnail
+        self.canvas._maybe_emit_layer_changed()
         
     def get_name(self):
         """Return display name of the tool"""
@@ -138,9 +175,12 @@ class ImageProcessingThread(QThread):
     
     resultReady = pyqtSignal(object)
     
-    def __init__(self, image, parameters, processing_func):
+    def __init__(self, image, arr, parameters, processing_func):
         super().__init__()
+        # arr only views image's pixels; holding image keeps them alive even if
+        # the tool lets go of it before this thread finishes
         self.image = image
+        self.arr = arr
         self.parameters = parameters.copy()  # Make a copy to prevent race conditions
         self.processing_func = processing_func
 
@@ -151,49 +191,8 @@ class ImageProcessingThread(QThread):
                 self.resultReady.emit(None)
                 return
                 
-            # Convert QImage to numpy array for processing
-            if isinstance(self.image, QImage):
-                # Fix for voidptr issues - create a copy and save to temp file
-                temp_image = self.image.copy()
-                
-                # Get dimensions
-                width = temp_image.width()
-                height = temp_image.height()
-                
-                # Check for interruption before heavy processing
-                if self.isInterruptionRequested():
-                    self.resultReady.emit(None)
-                    return
-                
-                # Create numpy array via safer method
-                if hasattr(np, 'asarray'):
-                    # Convert to RGBA format
-                    if temp_image.format() != QImage.Format.Format_RGBA8888:
-                        temp_image = temp_image.convertToFormat(QImage.Format.Format_RGBA8888)
-                    
-                    # Save to buffer and load with numpy
-                    buffer = QBuffer()
-                    buffer.open(QIODevice.OpenModeFlag.ReadWrite)
-                    temp_image.save(buffer, "PNG")
-                    
-                    from PIL import Image
-                    import io
-                    pil_img = Image.open(io.BytesIO(buffer.data().data()))
-                    arr = np.array(pil_img)
-                else:
-                    # Fallback to simple shape creation
-                    arr = np.zeros((height, width, 4), dtype=np.uint8)
-            else:
-                # Already a numpy array
-                arr = self.image
-                
-            # Check for interruption before processing
-            if self.isInterruptionRequested():
-                self.resultReady.emit(None)
-                return
-                
             # Process the image
-            result = self.processing_func(arr, self.parameters)
+            result = self.processing_func(self.arr, self.parameters)
             
             if self.isInterruptionRequested():
                 self.resultReady.emit(None)
@@ -224,9 +223,12 @@ class BrightnessContrastTool(GPUBasedTool):
         brightness = params.get("brightness", 0) * 50  # Scale effect for visibility
         contrast = params.get("contrast", 1.0)
         
-        # Enhanced brightness/contrast algorithm for better visual effect
-        result = np.clip(arr * contrast + brightness, 0, 255).astype(np.uint8)
-        return result
+        # The mapping is per intensity, so apply it as a 256-entry table; alpha maps to itself
+        levels = np.arange(256, dtype=np.float64)
+        lut = np.empty((1, 256, 4), dtype=np.uint8)
+        lut[0, :, :3] = np.clip(np.rint(levels * contrast + brightness), 0, 255)[:, None]
+        lut[0, :, 3] = levels
+        return cv2.LUT(arr, lut)
         
     def get_name(self):
         return "Brightness/Contrast"
@@ -267,17 +269,17 @@ class SharpenBlurTool(GPUBasedTool):
                 [0, -0.5, 0],
                 [-0.5, 3, -0.5],
                 [0, -0.5, 0]
-            ]),
+            ], dtype=np.float32),
             "sharpen_medium": np.array([
                 [-0.5, -1, -0.5],
                 [-1, 7, -1],
                 [-0.5, -1, -0.5]
-            ]),
+            ], dtype=np.float32),
             "sharpen_strong": np.array([
                 [-1, -1, -1],
                 [-1, 9, -1],
                 [-1, -1, -1]
-            ])
+            ], dtype=np.float32)
         }
         
     def process_array(self, arr, params):
@@ -287,6 +289,16 @@ class SharpenBlurTool(GPUBasedTool):
         if abs(amount) < 0.05:
             return arr
         
+        # Prefer the canvas's OpenCL device for sharpening when it is enabled
+        if amount > 0 and getattr(self.canvas, 'use_gpu', False):
+            result = self.canvas.gpu_processor.sharpen(arr, float(amount))
+            if result is not None:
+                return result
+        
+        if amount > 0 and numba_available and arr.shape[0] >= 3 and arr.shape[1] >= 3:
+            # Sharpen in one compiled pass; alpha is carried over by the kernel
+            return _sharpen_rgba(arr, float(amount))
+        
         # Make a copy to avoid modifying original
         result = arr.copy()
         
@@ -294,14 +306,13 @@ class SharpenBlurTool(GPUBasedTool):
         rgb = result[:, :, :3]
         
         if amount > 0:  # Sharpen (enhanced)
-            # Use stronger kernel for better visibility
+            # Use stronger kernel for better visibility; float32 taps, saturated straight back to uint8
             kernel = np.array([
                 [-amount, -amount, -amount],
                 [-amount, 1 + 8 * amount, -amount],
                 [-amount, -amount, -amount]
-            ])
-            rgb_filtered = cv2.filter2D(rgb, -1, kernel)
-            result[:, :, :3] = np.clip(rgb_filtered, 0, 255)
+            ], dtype=np.float32)
+            result[:, :, :3] = cv2.filter2D(rgb, -1, kernel)
         else:  # Blur (enhanced)
             blur_size = max(3, int(abs(amount * 20))) * 2 + 1  # Larger blur kernel
             result[:, :, :3] = cv2.GaussianBlur(rgb, (blur_size, blur_size), 0)
@@ -344,24 +355,19 @@ class ColorBalanceTool(GPUBasedTool):
         blue = params.get("blue", 1.0)
         temperature = params.get("temperature", 0) * 2  # Double the effect
         
-        # Make a copy to avoid modifying original
-        result = arr.copy()
+        # Fold the temperature adjustment into the per-channel gains
+        if temperature > 0:  # Warmer
+            red *= 1 + temperature * 0.4
+            blue *= 1 - temperature * 0.2
+        elif temperature < 0:  # Cooler
+            blue *= 1 - temperature * 0.4
+            red *= 1 + temperature * 0.2
         
-        # Apply RGB adjustments with enhanced effect
-        result[:, :, 0] = np.clip(result[:, :, 0] * blue, 0, 255)
-        result[:, :, 1] = np.clip(result[:, :, 1] * green, 0, 255)
-        result[:, :, 2] = np.clip(result[:, :, 2] * red, 0, 255)
-        
-        # Apply temperature adjustment with enhanced effect
-        if temperature != 0:
-            if temperature > 0:  # Warmer
-                result[:, :, 2] = np.clip(result[:, :, 2] * (1 + temperature * 0.4), 0, 255)
-                result[:, :, 0] = np.clip(result[:, :, 0] * (1 - temperature * 0.2), 0, 255)
-            else:  # Cooler
-                result[:, :, 0] = np.clip(result[:, :, 0] * (1 - temperature * 0.4), 0, 255)
-                result[:, :, 2] = np.clip(result[:, :, 2] * (1 + temperature * 0.2), 0, 255)
-                
-        return result
+        # Each channel gets its own 256-entry table; alpha maps to itself
+        levels = np.arange(256, dtype=np.float32)
+        gains = np.array([blue, green, red, 1.0], dtype=np.float32)
+        lut = np.clip(np.rint(levels[:, None] * gains), 0, 255).astype(np.uint8)
+        return cv2.LUT(arr, lut[None])
         
     def get_name(self):
         return "Color Balance"
@@ -419,29 +425,31 @@ class NoiseReductionTool(GPUBasedTool):
         if strength < 0.05:  # Very small strength, just return original
             return arr
             
-        # Make a copy to avoid modifying original
-        result = arr.copy()
-        
-        # Extract RGB channels (skip alpha)
-        rgb = result[:, :, :3]
+        # Pack the RGB channels once; cv2 would make this copy internally anyway
+        rgb = cv2.cvtColor(arr, cv2.COLOR_RGBA2RGB)
         
         if method == "nlm":
             # Non-local means denoising (best quality but slow)
             h_value = int(strength * 10) + 5  # Convert strength to h-parameter
-            result[:, :, :3] = cv2.fastNlMeansDenoisingColored(
-                rgb, None, h_value, h_value, 7, 21
-            )
+            filtered = cv2.fastNlMeansDenoisingColored(rgb, None, h_value, h_value, 7, 21)
         elif method == "bilateral":
             # Bilateral filtering (good edge preservation)
             d = int(strength * 10) + 3  # Filter size
             sigma_color = strength * 75 + 10
             sigma_space = strength * 75 + 10
-            result[:, :, :3] = cv2.bilateralFilter(rgb, d, sigma_color, sigma_space)
+            filtered = cv2.bilateralFilter(rgb, d, sigma_color, sigma_space)
         elif method == "median":
             # Median filtering (good for salt & pepper noise)
             k_size = int(strength * 10) * 2 + 1  # Must be odd
-            result[:, :, :3] = cv2.medianBlur(rgb, k_size)
+            cv2.medianBlur(rgb, k_size, dst=rgb)
+            filtered = rgb
+        else:
+            return arr
             
+        # Only alpha is carried over; the filtered channels fill the rest
+        result = np.empty_like(arr)
+        result[:, :, :3] = filtered
+        result[:, :, 3] = arr[:, :, 3]
         return result
         
     def get_name(self):
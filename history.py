@@ -1,38 +1,124 @@
+from collections import deque
+from enum import IntEnum
+import zlib
+
+import numpy as np
+from PyQt6.QtGui import QImage
+
+from layer import image_bytes
+
+
+class Action(IntEnum):
+    """Undoable canvas actions, stored as op codes in the history log"""
+    ADD_LAYER = 0
+    REMOVE_LAYER = 1
+    MOVE_LAYER = 2
+    SCALE_LAYER = 3
+    VISIBILITY = 4
+    FILTER = 5
+
+
+class ImagePatch:
+    """Compressed before/after pixels of the region an image edit changed"""
+    
+    __slots__ = ('old_shape', 'new_shape', 'old_colors', 'new_colors', 'box', 'old_data', 'new_data')
+    
+    def __init__(self, old_image, new_image):
+        self.old_shape = (old_image.width(), old_image.height(), old_image.format())
+        self.new_shape = (new_image.width(), new_image.height(), new_image.format())
+        self.old_colors = old_image.colorTable()
+        self.new_colors = new_image.colorTable()
+        old_bytes = image_bytes(old_image)
+        new_bytes = image_bytes(new_image)
+        
+        # Same size and format: keep only the bounding box of changed pixels
+        self.box = None
+        if (self.old_shape == self.new_shape and old_image.depth() % 8 == 0
+                and self.old_colors == self.new_colors):
+            width, height = old_image.width(), old_image.height()
+            bpp = old_image.depth() // 8
+            changed = (old_bytes[:, :width * bpp] != new_bytes[:, :width * bpp]).reshape(height, width, bpp).any(axis=2)
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            if rows.size:
+                self.box = (int(rows[0]), int(rows[-1]) + 1, int(cols[0]) * bpp, (int(cols[-1]) + 1) * bpp)
+            else:
+                self.box = (0, 0, 0, 0)
+            y0, y1, x0, x1 = self.box
+            old_bytes = old_bytes[y0:y1, x0:x1]
+            new_bytes = new_bytes[y0:y1, x0:x1]
+            
+        # Otherwise both full images are kept, still compressed
+        self.old_data = zlib.compress(old_bytes.tobytes(), 1)
+        self.new_data = zlib.compress(new_bytes.tobytes(), 1)
+        
+    def apply(self, image, forward):
+        """Return the image after (forward) or before the edit; None if image no longer matches"""
+        width, height, image_format = self.new_shape if forward else self.old_shape
+        data = np.frombuffer(zlib.decompress(self.new_data if forward else self.old_data), dtype=np.uint8)
+        
+        if self.box is None:
+            result = QImage(width, height, image_format)
+            result.setColorTable(self.new_colors if forward else self.old_colors)
+            image_bytes(result, writable=True)[:] = data.reshape(height, -1)
+            return result
+            
+        if image is None or (image.width(), image.height(), image.format()) != self.new_shape:
+            return None
+        result = image.copy()
+        y0, y1, x0, x1 = self.box
+        image_bytes(result, writable=True)[y0:y1, x0:x1] = data.reshape(y1 - y0, x1 - x0)
+        return result
+
+
 class History:
     def __init__(self, max_history=50):
-        self.undo_stack = []
-        self.redo_stack = []
+        # Command log stored as parallel bounded deques; entries before the cursor
+        # can be undone, entries from the cursor onwards can be redone
+        self.op_codes = deque(maxlen=max_history)
+        self.layer_refs = deque(maxlen=max_history)
+        self.arg_a = deque(maxlen=max_history)
+        self.arg_b = deque(maxlen=max_history)
+        self.cursor = 0
         self.max_history = max_history
         
-    def add_command(self, action, *args):
-        """Add a command to the history stack"""
-        command = (action, *args)
-        self.undo_stack.append(command)
-        
-        # Clear the redo stack when a new command is added
-        self.redo_stack.clear()
+    def add_command(self, action, layer=None, arg_a=None, arg_b=None):
+        """Add a command to the history log"""
+        # Clear the redo entries when a new command is added
+        self._truncate(self.cursor)
         
-        # Limit history size
-        if len(self.undo_stack) > self.max_history:
-            self.undo_stack.pop(0)
+        # At max_history the deques drop their oldest entry on append
+        self.op_codes.append(action)
+        self.layer_refs.append(layer)
+        self.arg_a.append(arg_a)
+        self.arg_b.append(arg_b)
+        self.cursor = len(self.op_codes)
             
-    def undo(self):
-        """Undo the last command and return it"""
-        if self.undo_stack:
-            command = self.undo_stack.pop()
-            self.redo_stack.append(command)
-            return command
+    def add_image_change(self, layer, old_image, new_image):
+        """Record a pixel edit as a compressed patch instead of two full image copies"""
+        self.add_command(Action.FILTER, layer, ImagePatch(old_image, new_image))
+            
+    def pop_last(self):
+        """Step back over the last command and return its index"""
+        if self.cursor > 0:
+            self.cursor -= 1
+            return self.cursor
         return None
         
-    def redo(self):
-        """Redo the last undone command and return it"""
-        if self.redo_stack:
-            command = self.redo_stack.pop()
-            self.undo_stack.append(command)
-            return command
+    def pop_next(self):
+        """Step forward over the next undone command and return its index"""
+        if self.cursor < len(self.op_codes):
+            self.cursor += 1
+            return self.cursor - 1
         return None
         
     def clear(self):
         """Clear all history"""
-        self.undo_stack.clear()
-        self.redo_stack.clear()
+        self._truncate(0)
+        self.cursor = 0
+        
+    def _truncate(self, length):
+        """Drop every entry from the given index onwards"""
+        for column in (self.op_codes, self.layer_refs, self.arg_a, self.arg_b):
+            while len(column) > length:
+                column.pop()
@@ -1,11 +1,135 @@
 from PyQt6.QtWidgets import QGraphicsPixmapItem, QGraphicsItem
 from PyQt6.QtGui import QImage, QPixmap, QPainter, QColor, QTransform
-from PyQt6.QtCore import Qt, QPointF, QRectF, QBuffer, QByteArray, QIODevice
+from PyQt6.QtCore import Qt, QPointF, QRectF
 import os
 import base64
 import io
+import zlib
+import numpy as np
 from debug_util import debug_log
 
+try:
+    from rtree import index as rtree_index
+    rtree_available = True
+except ImportError:
+    rtree_available = False
+
+# Item changes that alter what Canvas.drawBackground paints for a layer
+_REPAINT_CHANGES = {
+    QGraphicsItem.GraphicsItemChange.ItemPositionChange,
+    QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged,
+    QGraphicsItem.GraphicsItemChange.ItemTransformChange,
+    QGraphicsItem.GraphicsItemChange.ItemTransformHasChanged,
+    QGraphicsItem.GraphicsItemChange.ItemVisibleHasChanged,
+    QGraphicsItem.GraphicsItemChange.ItemOpacityHasChanged,
+    QGraphicsItem.GraphicsItemChange.ItemSelectedHasChanged,
+    QGraphicsItem.GraphicsItemChange.ItemZValueHasChanged,
+    QGraphicsItem.GraphicsItemChange.ItemSceneChange,
+    QGraphicsItem.GraphicsItemChange.ItemSceneHasChanged,
+}
+
+# Item changes that move a layer's bounds in the scene's LayerIndex
+_REINDEX_CHANGES = {
+    QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged,
+    QGraphicsItem.GraphicsItemChange.ItemTransformHasChanged,
+}
+
+# Byte order of serialized layer pixels; premultiplied like the canvas's native
+# ARGB32_Premultiplied, so saving it is a lossless channel shuffle
+_PIXEL_FORMAT = "RGBA8888_Premultiplied"
+
+# 32-bit formats whose raw bytes are B, G, R, A on little-endian machines
+_BGRA_FORMATS = (QImage.Format.Format_ARGB32, QImage.Format.Format_ARGB32_Premultiplied,
+                 QImage.Format.Format_RGB32)
+
+def image_bytes(image, writable=False):
+    """View an image's pixel memory as a (height, bytesPerLine) uint8 array"""
+    # bits() detaches a shared image first; constBits() never copies
+    ptr = image.bits() if writable else image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    return np.frombuffer(ptr, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+
+def bgra_view(image, writable=False):
+    """Wrap an image's pixel bytes in a (height, width, 4) BGRA NumPy view"""
+    if image.format() not in _BGRA_FORMATS:
+        image = image.convertToFormat(QImage.Format.Format_ARGB32)
+    arr = image_bytes(image, writable).reshape(image.height(), image.bytesPerLine() // 4, 4)
+    # Return the image too, so the memory behind the view stays alive
+    return image, arr
+
+class LayerIndex:
+    """Spatial index of layer scene rects, so painting only visits layers in view"""
+    
+    def __init__(self):
+        # id(layer) -> (layer, indexed bounds)
+        self.entries = {}
+        self.tree = rtree_index.Index() if rtree_available else None
+        
+    def update(self, layer):
+        """Insert a layer or move it to its current bounds"""
+        self.remove(layer)
+        rect = layer.sceneBoundingRect()
+        bounds = (rect.left(), rect.top(), rect.right(), rect.bottom())
+        self.entries[id(layer)] = (layer, bounds)
+        if self.tree is not None:
+            self.tree.insert(id(layer), bounds)
+            
+    def remove(self, layer):
+        """Drop a layer from the index"""
+        entry = self.entries.pop(id(layer), None)
+        if entry is not None and self.tree is not None:
+            self.tree.delete(id(layer), entry[1])
+            
+    def intersecting(self, rect):
+        """Return the indexed layers overlapping a scene rect"""
+        if self.tree is not None:
+            bounds = (rect.left(), rect.top(), rect.right(), rect.bottom())
+            return [self.entries[key][0] for key in self.tree.intersection(bounds)]
+        # Without rtree fall back to a linear scan of the stored bounds
+        return [layer for layer, (left, top, right, bottom) in self.entries.values()
+                if left <= rect.right() and right >= rect.left()
+                and top <= rect.bottom() and bottom >= rect.top()]
+
+class LayerStack(list):
+    """Canvas layer list that keeps layer z-values in list order
+    
+    Only an inserted layer gets a new z-value, midway between its neighbours;
+    the whole stack is renumbered only once the floats run out of room.
+    """
+    
+    def append(self, layer):
+        super().append(layer)
+        self._place(len(self) - 1)
+        
+    def insert(self, index, layer):
+        if index < 0:
+            index = max(0, len(self) + index)
+        index = min(index, len(self))
+        super().insert(index, layer)
+        self._place(index)
+        
+    def _place(self, index):
+        """Give the layer at index a z-value between its neighbours"""
+        below = self[index - 1].zValue() if index > 0 else None
+        above = self[index + 1].zValue() if index + 1 < len(self) else None
+        if below is None and above is None:
+            z = 0.0
+        elif above is None:
+            z = below + 1
+        elif below is None:
+            z = above - 1
+        else:
+            z = (below + above) / 2
+            if not below < z < above:
+                self.renumber()
+                return
+        self[index].setZValue(z)
+        
+    def renumber(self):
+        """Reset every z-value to the layer's list position"""
+        for i, layer in enumerate(self):
+            layer.setZValue(i)
+
 class Layer(QGraphicsPixmapItem):
     """Represents a layer in the image editor"""
     
@@ -20,17 +144,80 @@ class Layer(QGraphicsPixmapItem):
         self.scale_x = 1.0
         self.scale_y = 1.0
         self.original_image = None
+        self._mip = None  # Downsampled copies of the pixmap, built on demand
+        self._image_xform = None  # Scene-to-image mapping, rebuilt after moves and rescales
+        self._pixels = None  # (cacheKey, image, array) view of original_image, built on demand
+        self._pixmap_key = None  # cacheKey of the image the current pixmap was built from
         
         # Configure the item
         self.setFlags(QGraphicsPixmapItem.GraphicsItemFlag.ItemIsMovable |
                      QGraphicsPixmapItem.GraphicsItemFlag.ItemIsSelectable)
         self.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
+        # Canvas.drawBackground paints all layers in one batched pass
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemHasNoContents, True)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemSendsGeometryChanges, True)
         
         # Load image if path is provided
         if image_path and os.path.exists(image_path):
             self.load_image(image_path)
             self.name = os.path.basename(image_path)
             
+    def itemChange(self, change, value):
+        """Repaint the layer's area, since Qt skips items without contents"""
+        scene = self.scene()
+        if change in _REINDEX_CHANGES:
+            self._image_xform = None
+        if change in _REPAINT_CHANGES and scene is not None:
+            scene.update(self.sceneBoundingRect())
+            
+        # Keep the scene's spatial index in step with the layer
+        if change == QGraphicsItem.GraphicsItemChange.ItemSceneChange:
+            if scene is not None and hasattr(scene, 'layer_index'):
+                scene.layer_index.remove(self)
+        elif change == QGraphicsItem.GraphicsItemChange.ItemSceneHasChanged or change in _REINDEX_CHANGES:
+            if scene is not None and hasattr(scene, 'layer_index'):
+                scene.layer_index.update(self)
+        return super().itemChange(change, value)
+        
+    def setPixmap(self, pixmap):
+        """Set the pixmap and repaint both the old and the new area"""
+        old_rect = self.sceneBoundingRect()
+        super().setPixmap(pixmap)
+        self._mip = None
+        scene = self.scene()
+        if scene is not None:
+            scene.update(old_rect.united(self.sceneBoundingRect()))
+            if hasattr(scene, 'layer_index'):
+                scene.layer_index.update(self)
+            
+    def image_transform(self):
+        """Map scene coordinates to original image pixels"""
+        # The pixmap is the image at full resolution, so item coordinates are image pixels
+        if self._image_xform is None:
+            self._image_xform, _ = self.sceneTransform().inverted()
+        return self._image_xform
+        
+    def pixel_view(self):
+        """Return a cached (image, BGRA array) view of original_image"""
+        key = self.original_image.cacheKey()
+        if self._pixels is None or self._pixels[0] != key:
+            self._pixels = (key,) + bgra_view(self.original_image)
+        return self._pixels[1:]
+        
+    def mip_level(self, level):
+        """Return the pixmap halved level times, building pyramid levels on demand"""
+        if self._mip is None:
+            self._mip = [self.pixmap()]
+        while len(self._mip) <= level:
+            previous = self._mip[-1]
+            # Stop once a level gets small; sampling it further costs nothing
+            if previous.width() < 32 or previous.height() < 32:
+                break
+            self._mip.append(previous.scaled(previous.width() // 2, previous.height() // 2,
+                                             Qt.AspectRatioMode.IgnoreAspectRatio,
+                                             Qt.TransformationMode.SmoothTransformation))
+        return self._mip[min(level, len(self._mip) - 1)]
+        
     def load_image(self, image_path):
         """Load an image from file"""
         self.original_image = QImage(image_path)
@@ -40,31 +227,38 @@ class Layer(QGraphicsPixmapItem):
         return False
     
     def set_image(self, image):
-        """Set layer image from a QImage or numpy array"""
+        """Set layer image from a QImage or numpy array
+        
+        A QImage is shared with the caller rather than copied; Qt detaches
+        whichever side writes to it first.
+        """
         if isinstance(image, QImage):
-            self.original_image = image.copy()
-        else:
-            # Handle other types like numpy array
-            if hasattr(image, 'shape'):
-                # Assuming it's a numpy array
-                # Convert to QImage using external function or library
-                pass
+            self.original_image = QImage(image)
+        elif hasattr(image, 'shape'):
+            # uint8 array of (h, w), (h, w, 3) RGB or (h, w, 4) RGBA; wrap the rows
+            # directly and copy once, so the image no longer depends on the array
+            arr = np.ascontiguousarray(image, dtype=np.uint8)
+            if arr.ndim == 2:
+                image_format = QImage.Format.Format_Grayscale8
+            elif arr.shape[2] == 4:
+                image_format = QImage.Format.Format_RGBA8888
+            else:
+                image_format = QImage.Format.Format_RGB888
+            self.original_image = QImage(arr.data, arr.shape[1], arr.shape[0], arr.strides[0], image_format).copy()
                 
         self.update_pixmap()
         
     def update_pixmap(self):
         """Update the pixmap from the original image with current transforms"""
         if self.original_image and not self.original_image.isNull():
-            # Apply transformations to the pixmap
-            pixmap = QPixmap.fromImage(self.original_image)
-            
-            # Create transform for scaling
-            if self.scale_x != 1.0 or self.scale_y != 1.0:
-                transform = QTransform().scale(self.scale_x, self.scale_y)
-                pixmap = pixmap.transformed(transform, Qt.TransformationMode.SmoothTransformation)
+            # Only rebuild when the image changed since the last build
+            key = self.original_image.cacheKey()
+            if key != self._pixmap_key:
+                self.setPixmap(QPixmap.fromImage(self.original_image))
+                self._pixmap_key = key
                 
-            # Set the pixmap
-            self.setPixmap(pixmap)
+            # Scale at draw time through the item transform instead of resampling the pixmap
+            self.setTransform(QTransform.fromScale(self.scale_x, self.scale_y))
             
             # Apply opacity
             self.setOpacity(self.opacity)
@@ -79,8 +273,6 @@ class Layer(QGraphicsPixmapItem):
         self.is_visible = visible
         # Ensure the Qt visibility state matches our internal state
         self.setVisible(visible)
-        # Force a redraw to ensure visibility change is applied
-        self.update()
         
     def set_locked(self, locked):
         """Set layer locked state"""
@@ -103,7 +295,8 @@ class Layer(QGraphicsPixmapItem):
         new_layer.name = self.name + " (Copy)"
         
         if self.original_image:
-            new_layer.original_image = self.original_image.copy()
+            # Shares the pixels until either layer gets a new image
+            new_layer.original_image = QImage(self.original_image)
         
         new_layer.is_visible = self.is_visible
         new_layer.opacity = self.opacity
@@ -118,8 +311,12 @@ class Layer(QGraphicsPixmapItem):
         
         return new_layer
     
-    def serialize(self):
-        """Serialize the layer to a dict for saving"""
+    def serialize(self, include_image=True):
+        """Serialize the layer to a dict for saving
+        
+        Pass include_image=False to leave the pixels out, e.g. when they are
+        encoded separately with encode_image_data.
+        """
         layer_data = {
             "name": self.name,
             "visible": self.is_visible,
@@ -132,19 +329,62 @@ class Layer(QGraphicsPixmapItem):
         }
         
         # Serialize image data if available
-        if self.original_image and not self.original_image.isNull():
-            # Convert image to base64
-            byte_array = QByteArray()
-            buffer = QBuffer(byte_array)
-            buffer.open(QIODevice.OpenModeFlag.WriteOnly)
-            self.original_image.save(buffer, "PNG")
-            image_data = bytes(byte_array.data())
-            layer_data["image"] = base64.b64encode(image_data).decode('ascii')
+        if include_image:
+            pixels = self.encode_image_data(self.original_image)
+            if pixels is not None:
+                layer_data["pixels"] = pixels
             
         return layer_data
     
-    def deserialize(self, layer_data):
-        """Load the layer from serialized data"""
+    @staticmethod
+    def encode_image_data(image):
+        """Encode a layer image for saving; safe to call from worker threads"""
+        if not image or image.isNull():
+            return None
+            
+        # Store the raw pixels through fast zlib instead of a PNG encode;
+        # the canvas file format decides where the bytes go
+        image = image.convertToFormat(getattr(QImage.Format, "Format_" + _PIXEL_FORMAT))
+        ptr = image.constBits()
+        ptr.setsize(image.sizeInBytes())
+        return {
+            "width": image.width(),
+            "height": image.height(),
+            "stride": image.bytesPerLine(),
+            "format": _PIXEL_FORMAT,
+            "data": zlib.compress(ptr, 1),
+        }
+    
+    @staticmethod
+    def decode_image_data(layer_data):
+        """Decode a serialized layer's image; safe to call from worker threads"""
+        pixels = layer_data.get("pixels")
+        if pixels is not None:
+            data = zlib.decompress(pixels["data"])
+            image_format = getattr(QImage.Format, "Format_" + pixels["format"])
+            # QImage does not own the decompressed bytes, so detach a copy
+            return QImage(data, pixels["width"], pixels["height"], pixels["stride"], image_format).copy()
+            
+        # Canvases saved before raw pixels held PNG data
+        image_data = layer_data.get("image")
+        if image_data is None:
+            return None
+            
+        # Raw PNG bytes, or base64 text from JSON canvas files
+        if isinstance(image_data, str):
+            image_data = base64.b64decode(image_data)
+            
+        image = QImage()
+        if image.loadFromData(image_data, "PNG"):
+            return image
+        return None
+    
+    def deserialize(self, layer_data, image=None):
+        """Load the layer from serialized data
+        
+        image may hold the result of decode_image_data when the decode has
+        already been done elsewhere.
+        """
         self.name = layer_data.get("name", "Layer")
         self.is_visible = layer_data.get("visible", True)
         self.is_locked = layer_data.get("locked", False)
@@ -159,14 +399,12 @@ class Layer(QGraphicsPixmapItem):
         self.set_locked(self.is_locked)
         
         # Load image data if available
-        if "image" in layer_data:
+        if image is not None or "pixels" in layer_data or "image" in layer_data:
             try:
-                # Decode base64 image data
-                image_data = base64.b64decode(layer_data["image"])
-                
-                # Create QImage from raw data
-                self.original_image = QImage()
-                if self.original_image.loadFromData(image_data, "PNG"):
+                if image is None:
+                    image = self.decode_image_data(layer_data)
+                if image is not None:
+                    self.original_image = image
                     # Update pixmap with loaded image
                     self.update_pixmap()
                     return True
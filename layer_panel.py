@@ -1,11 +1,116 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QListWidget, QListWidgetItem,
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QListWidget, QListWidgetItem, QListView,
                            QPushButton, QHBoxLayout, QSlider, QCheckBox, 
                            QLabel, QMenu, QAbstractItemView, QDoubleSpinBox,
                            QFrame, QScrollArea)
-from PyQt6.QtGui import QIcon, QAction, QColor, QPainter, QPixmap, QLinearGradient, QFont
-from PyQt6.QtCore import Qt, pyqtSlot, QSize
+from PyQt6.QtGui import QIcon, QAction, QColor, QPainter, QPixmap, QPixmapCache, QLinearGradient, QFont
+from PyQt6.QtCore import Qt, pyqtSlot, QSize, QTimer, QSignalBlocker
+from contextlib import contextmanager, ExitStack
 
-from style_utils import COLORS, STYLE_SHEETS, apply_glass_effect
+from style_utils import COLORS, apply_glass_effect
+
+# Layer row stylesheets, formatted once for every row
+_ITEM_STYLE = f"""
+    #layerItem {{
+        background-color: {COLORS["primary_light"]};
+        border: 1px solid {COLORS["border"]};
+        border-radius: 6px;
+        margin: 2px;
+        padding: 4px;
+    }}
+"""
+
+_VISIBILITY_BTN_STYLE = f"""
+    QPushButton {{
+        background-color: transparent;
+        border: none;
+        border-radius: 12px;
+    }}
+    QPushButton:checked {{
+        background-color: {COLORS["accent"]}40;
+        border: 1px solid {COLORS["accent"]};
+    }}
+"""
+
+_LOCK_BTN_STYLE = f"""
+    QPushButton {{
+        background-color: transparent;
+        border: none;
+        border-radius: 12px;
+    }}
+    QPushButton:checked {{
+        background-color: {COLORS["accent_secondary"]}40;
+        border: 1px solid {COLORS["accent_secondary"]};
+    }}
+"""
+
+_NAME_LABEL_STYLE = f"color: {COLORS['text']}; font-weight: bold;"
+
+# Panel action buttons and property headers, shared by every instance
+_BUTTON_STYLE = f"""
+    QPushButton {{
+        background-color: {COLORS["primary_light"]};
+        border: 1px solid {COLORS["border"]};
+        border-radius: 6px;
+        padding: 4px 8px;
+        color: {COLORS["text"]};
+    }}
+    QPushButton:hover {{
+        background-color: {COLORS["primary_dark"]};
+    }}
+"""
+
+_PROPERTY_HEADER_STYLE = f"""
+    font-size: 12px;
+    font-weight: bold;
+    color: {COLORS["text"]};
+    padding-bottom: 4px;
+"""
+
+_layer_icons = None
+
+def _get_layer_icons():
+    """Return the (eye, lock) icons shared by all layer rows, drawing them the first time"""
+    global _layer_icons
+    if _layer_icons is None:
+        _layer_icons = _build_layer_icons()
+    return _layer_icons
+
+def _build_layer_icons():
+    """Draw the visibility and lock icons"""
+    # Create eye icon
+    eye_icon = QPixmap(24, 24)
+    eye_icon.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(eye_icon)
+    painter.setPen(QColor(COLORS["text"]))
+    painter.setBrush(QColor(COLORS["text"]))
+    painter.drawEllipse(8, 10, 8, 8)
+    painter.setBrush(QColor(COLORS["primary_light"]))
+    painter.drawEllipse(10, 12, 4, 4)
+    painter.end()
+    
+    # Create lock icon
+    lock_icon = QPixmap(24, 24)
+    lock_icon.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(lock_icon)
+    painter.setPen(QColor(COLORS["text"]))
+    painter.drawRoundedRect(7, 12, 10, 8, 2, 2)
+    painter.drawRect(9, 8, 6, 4)
+    painter.end()
+    return QIcon(eye_icon), QIcon(lock_icon)
+
+_THUMBNAIL_SIZE = 32
+
+def _get_thumbnail(image):
+    """Return a list-sized thumbnail of an image, scaling it only the first time"""
+    # Keyed by cacheKey, so an edited image gets a fresh thumbnail
+    key = f"layer_thumb_{image.cacheKey()}"
+    pixmap = QPixmapCache.find(key)
+    if pixmap is None:
+        pixmap = QPixmap.fromImage(image.scaled(_THUMBNAIL_SIZE, _THUMBNAIL_SIZE,
+                                                Qt.AspectRatioMode.KeepAspectRatio,
+                                                Qt.TransformationMode.SmoothTransformation))
+        QPixmapCache.insert(key, pixmap)
+    return pixmap
 
 class LayerItemWidget(QFrame):
     """Custom widget for layer items with modern design"""
@@ -13,15 +118,8 @@ class LayerItemWidget(QFrame):
         super().__init__(parent)
         self.layer = layer
         self.setObjectName("layerItem")
-        self.setStyleSheet(f"""
-            #layerItem {{
-                background-color: {COLORS["primary_light"]};
-                border: 1px solid {COLORS["border"]};
-                border-radius: 6px;
-                margin: 2px;
-                padding: 4px;
-            }}
-        """)
+        self.setStyleSheet(_ITEM_STYLE)
+        eye_icon, lock_icon = _get_layer_icons()
         
         self.setFixedHeight(40)
         
@@ -35,33 +133,13 @@ class LayerItemWidget(QFrame):
         self.visibility_btn.setFixedSize(24, 24)
         self.visibility_btn.setCheckable(True)
         self.visibility_btn.setChecked(layer.is_visible)
-        self.visibility_btn.setStyleSheet(f"""
-            QPushButton {{
-                background-color: transparent;
-                border: none;
-                border-radius: 12px;
-            }}
-            QPushButton:checked {{
-                background-color: {COLORS["accent"]}40;
-                border: 1px solid {COLORS["accent"]};
-            }}
-        """)
-        # Create eye icon
-        eye_icon = QPixmap(24, 24)
-        eye_icon.fill(Qt.GlobalColor.transparent)
-        painter = QPainter(eye_icon)
-        painter.setPen(QColor(COLORS["text"]))
-        painter.setBrush(QColor(COLORS["text"]))
-        painter.drawEllipse(8, 10, 8, 8)
-        painter.setBrush(QColor(COLORS["primary_light"]))
-        painter.drawEllipse(10, 12, 4, 4)
-        painter.end()
-        self.visibility_btn.setIcon(QIcon(eye_icon))
+        self.visibility_btn.setStyleSheet(_VISIBILITY_BTN_STYLE)
+        self.visibility_btn.setIcon(eye_icon)
         layout.addWidget(self.visibility_btn)
         
         # Layer name
         self.name_label = QLabel(layer.name)
-        self.name_label.setStyleSheet(f"color: {COLORS['text']}; font-weight: bold;")
+        self.name_label.setStyleSheet(_NAME_LABEL_STYLE)
         layout.addWidget(self.name_label, 1)  # 1 = stretch factor
         
         # Lock toggle
@@ -69,26 +147,8 @@ class LayerItemWidget(QFrame):
         self.lock_btn.setFixedSize(24, 24)
         self.lock_btn.setCheckable(True)
         self.lock_btn.setChecked(layer.is_locked)
-        self.lock_btn.setStyleSheet(f"""
-            QPushButton {{
-                background-color: transparent;
-                border: none;
-                border-radius: 12px;
-            }}
-            QPushButton:checked {{
-                background-color: {COLORS["accent_secondary"]}40;
-                border: 1px solid {COLORS["accent_secondary"]};
-            }}
-        """)
-        # Create lock icon
-        lock_icon = QPixmap(24, 24)
-        lock_icon.fill(Qt.GlobalColor.transparent)
-        painter = QPainter(lock_icon)
-        painter.setPen(QColor(COLORS["text"]))
-        painter.drawRoundedRect(7, 12, 10, 8, 2, 2)
-        painter.drawRect(9, 8, 6, 4)
-        painter.end()
-        self.lock_btn.setIcon(QIcon(lock_icon))
+        self.lock_btn.setStyleSheet(_LOCK_BTN_STYLE)
+        self.lock_btn.setIcon(lock_icon)
         layout.addWidget(self.lock_btn)
 
 class LayerPanel(QWidget):
@@ -97,6 +157,20 @@ class LayerPanel(QWidget):
         self.canvas = canvas
         self.updating_ui = False  # Flag to prevent recursive signal handling
         self.collapsed = False
+        self._item_by_layer = {}  # List row for each canvas layer, reused across updates
+        self._self_update = False  # Set while this panel's own edits notify the canvas
+        
+        # Slider and spin box changes reach the canvas at most once per frame
+        self._pending_opacity = None  # (layer, slider value)
+        self._opacity_timer = QTimer(self)
+        self._opacity_timer.setSingleShot(True)
+        self._opacity_timer.setInterval(16)
+        self._opacity_timer.timeout.connect(self._apply_pending_opacity)
+        self._pending_scale = None  # (layer, scale_x, scale_y)
+        self._scale_timer = QTimer(self)
+        self._scale_timer.setSingleShot(True)
+        self._scale_timer.setInterval(16)
+        self._scale_timer.timeout.connect(self._apply_pending_scale)
         
         # Connect to canvas layer changes
         self.canvas.layerChanged.connect(self.update_layers)
@@ -119,19 +193,7 @@ class LayerPanel(QWidget):
         
         # Collapse button
         self.collapse_btn = QPushButton("<<")
-        self.collapse_btn.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {COLORS["primary_light"]};
-                color: {COLORS["text"]};
-                border: 1px solid {COLORS["border"]};
-                border-radius: 3px;
-                max-width: 24px;
-                max-height: 18px;
-            }}
-            QPushButton:hover {{
-                background-color: {COLORS["accent"]}40;
-            }}
-        """)
+        self.collapse_btn.setObjectName("dockCollapseBtn")  # Styled by APP_STYLE_SHEET
         self.collapse_btn.clicked.connect(self.toggle_collapse)
         header_layout.addWidget(self.collapse_btn)
         
@@ -160,12 +222,17 @@ class LayerPanel(QWidget):
         
         self.layer_list = QListWidget()
         self.layer_list.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
-        self.layer_list.setStyleSheet(STYLE_SHEETS["layer_panel"])
-        self.layer_list.setIconSize(QSize(32, 32))
+        self.layer_list.setObjectName("layerList")  # Styled by APP_STYLE_SHEET
+        self.layer_list.setIconSize(QSize(_THUMBNAIL_SIZE, _THUMBNAIL_SIZE))
         self.layer_list.itemClicked.connect(self.on_layer_selected)
         self.layer_list.model().rowsMoved.connect(self.on_rows_moved)
         self.layer_list.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.layer_list.setUniformItemSizes(True)
+        # Lay out long layer lists in batches so a refresh never stalls on all rows at once
+        self.layer_list.setViewMode(QListView.ViewMode.ListMode)
+        self.layer_list.setResizeMode(QListView.ResizeMode.Fixed)
+        self.layer_list.setLayoutMode(QListView.LayoutMode.Batched)
+        self.layer_list.setBatchSize(64)
         
         list_layout.addWidget(self.layer_list)
         content_layout.addWidget(list_container, 1)  # 1 = stretch factor
@@ -287,6 +354,17 @@ class LayerPanel(QWidget):
         # Initialize the UI
         self.update_layers()
     
+    @contextmanager
+    def _silent_canvas(self):
+        """Ignore layerChanged while the panel applies a change it already shows"""
+        # A flag rather than canvas.blockSignals, which would also drop the
+        # canvas's queued worker-thread signals and its own state tracking
+        self._self_update = True
+        try:
+            yield
+        finally:
+            self._self_update = False
+    
     def toggle_collapse(self):
         """Toggle between collapsed and expanded states"""
         if not self.collapsed:
@@ -304,47 +382,48 @@ class LayerPanel(QWidget):
         """Helper to create styled buttons"""
         btn = QPushButton(text)
         btn.setIcon(QIcon(icon))
-        btn.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {COLORS["primary_light"]};
-                border: 1px solid {COLORS["border"]};
-                border-radius: 6px;
-                padding: 4px 8px;
-                color: {COLORS["text"]};
-            }}
-            QPushButton:hover {{
-                background-color: {COLORS["primary_dark"]};
-            }}
-        """)
+        btn.setStyleSheet(_BUTTON_STYLE)
         return btn
     
     def _create_property_header(self, text):
         """Helper to create property headers"""
         header = QLabel(text)
-        header.setStyleSheet(f"""
-            font-size: 12px;
-            font-weight: bold;
-            color: {COLORS["text"]};
-            padding-bottom: 4px;
-        """)
+        header.setStyleSheet(_PROPERTY_HEADER_STYLE)
         return header
     
     def update_layers(self):
         """Update the layer list UI from the canvas layers"""
+        # Edits made from this panel update the rows they touch themselves
+        if self._self_update:
+            return
+            
         self.updating_ui = True  # Flag to prevent signals during UI update
         
+        self.layer_list.setUpdatesEnabled(False)
         try:
-            self.layer_list.clear()
+            # Layers are listed in reverse order (top to bottom)
+            layers = list(reversed(self.canvas.layers))
             
-            # Add layers in reverse order (top to bottom)
-            for i, layer in enumerate(reversed(self.canvas.layers)):
-                item = QListWidgetItem()
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
+            # Drop the rows of layers that are gone
+            present = set(layers)
+            for layer in [layer for layer in self._item_by_layer if layer not in present]:
+                item = self._item_by_layer.pop(layer)
+                self.layer_list.takeItem(self.layer_list.row(item))
+                
+            # Keep existing rows, moving them only when their position changed
+            for row, layer in enumerate(layers):
+                item = self._item_by_layer.get(layer)
+                if item is None:
+                    item = QListWidgetItem()
+                    item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
+                    self._item_by_layer[layer] = item
+                    self.layer_list.insertItem(row, item)
+                elif self.layer_list.item(row) is not item:
+                    self.layer_list.takeItem(self.layer_list.row(item))
+                    self.layer_list.insertItem(row, item)
                 
                 # Update item text with appropriate icons
                 self._update_layer_item_text(item, layer)
-                
-                self.layer_list.addItem(item)
             
             # Select and update UI for active layer
             if self.canvas.active_layer:
@@ -352,24 +431,26 @@ class LayerPanel(QWidget):
                 index = len(self.canvas.layers) - 1 - self.canvas.layers.index(self.canvas.active_layer)
                 self.layer_list.setCurrentRow(index)
                 
-                # Update controls with signal blocking
-                self.visible_cb.blockSignals(True)
-                self.visible_cb.setChecked(self.canvas.active_layer.is_visible)
-                self.visible_cb.blockSignals(False)
-                
-                # Update lock checkbox
-                self.lock_cb.blockSignals(True)
-                self.lock_cb.setChecked(self.canvas.active_layer.is_locked)
-                self.lock_cb.blockSignals(False)
-                
-                # Update scale controls
-                self.scale_x_spin.setValue(self.canvas.active_layer.scale_x)
-                self.scale_y_spin.setValue(self.canvas.active_layer.scale_y)
+                # Update controls with signal blocking; the blockers are released
+                # even if an update raises
+                with ExitStack() as blockers:
+                    for control in (self.visible_cb, self.lock_cb, self.scale_x_spin, self.scale_y_spin):
+                        blockers.enter_context(QSignalBlocker(control))
+                        
+                    self.visible_cb.setChecked(self.canvas.active_layer.is_visible)
+                    
+                    # Update lock checkbox
+                    self.lock_cb.setChecked(self.canvas.active_layer.is_locked)
+                    
+                    # Update scale controls
+                    self.scale_x_spin.setValue(self.canvas.active_layer.scale_x)
+                    self.scale_y_spin.setValue(self.canvas.active_layer.scale_y)
                 
                 # Disable scale controls if layer is locked
                 self.scale_x_spin.setEnabled(not self.canvas.active_layer.is_locked)
                 self.scale_y_spin.setEnabled(not self.canvas.active_layer.is_locked)
         finally:
+            self.layer_list.setUpdatesEnabled(True)
             self.updating_ui = False  # Reset flag when done
             
     def on_layer_selected(self, item):
@@ -399,19 +480,49 @@ class LayerPanel(QWidget):
     def on_opacity_changed(self, value):
         """Handle opacity slider changes"""
         if self.canvas.active_layer and not self.canvas.active_layer.is_locked:
-            self.canvas.active_layer.set_opacity(value / 100.0)
+            self._pending_opacity = (self.canvas.active_layer, value)
+            self._opacity_timer.start()
+            
+    def _apply_pending_opacity(self):
+        """Apply the last opacity slider value of this frame"""
+        layer, value = self._pending_opacity
+        self._pending_opacity = None
+        if not layer.is_locked:
+            with self._silent_canvas():
+                layer.set_opacity(value / 100.0)
             
     def on_scale_x_changed(self, value):
         """Handle X scale spin box changes"""
         if self.canvas.active_layer and not self.canvas.active_layer.is_locked:
-            # Keep the Y scale the same
-            self.canvas.scale_layer(self.canvas.active_layer, value, self.canvas.active_layer.scale_y)
+            # Keep the Y scale the same, or the one still waiting to be applied
+            layer, _, scale_y = self._scale_base()
+            self._pending_scale = (layer, value, scale_y)
+            self._scale_timer.start()
             
     def on_scale_y_changed(self, value):
         """Handle Y scale spin box changes"""
         if self.canvas.active_layer and not self.canvas.active_layer.is_locked:
-            # Keep the X scale the same
-            self.canvas.scale_layer(self.canvas.active_layer, self.canvas.active_layer.scale_x, value)
+            # Keep the X scale the same, or the one still waiting to be applied
+            layer, scale_x, _ = self._scale_base()
+            self._pending_scale = (layer, scale_x, value)
+            self._scale_timer.start()
+            
+    def _scale_base(self):
+        """Return the active layer's (layer, scale_x, scale_y), including a change not yet applied"""
+        layer = self.canvas.active_layer
+        if self._pending_scale is not None and self._pending_scale[0] is layer:
+            return self._pending_scale
+        return layer, layer.scale_x, layer.scale_y
+            
+    def _apply_pending_scale(self):
+        """Apply the last scale spin box values of this frame"""
+        layer, scale_x, scale_y = self._pending_scale
+        self._pending_scale = None
+        # Spin boxes refreshed from the layer report its own scale back; skip those
+        if layer.is_locked or (scale_x, scale_y) == (layer.scale_x, layer.scale_y):
+            return
+        with self._silent_canvas():
+            self.canvas.scale_layer(layer, scale_x, scale_y)
             
     def on_visibility_changed(self, state):
         """Handle visibility checkbox changes"""
@@ -434,7 +545,8 @@ class LayerPanel(QWidget):
             self.opacity_slider.setValue(50)  # 50%
         
         # Use the canvas's method to toggle visibility (includes history)
-        self.canvas.toggle_layer_visibility(self.canvas.active_layer, is_visible)
+        with self._silent_canvas():
+            self.canvas.toggle_layer_visibility(self.canvas.active_layer, is_visible)
         
         # Update UI item text
         self._update_layer_item_text(self.layer_list.currentItem(), self.canvas.active_layer)
@@ -456,22 +568,22 @@ class LayerPanel(QWidget):
             
         # Update item text
         item.setText(f"{prefix}{name}")
+        
+        # Show a thumbnail, replacing the icon only when the image changed
+        image = layer.original_image
+        if image and not image.isNull() and item.data(Qt.ItemDataRole.UserRole) != image.cacheKey():
+            item.setIcon(QIcon(_get_thumbnail(image)))
+            item.setData(Qt.ItemDataRole.UserRole, image.cacheKey())
     
     def on_lock_changed(self, state):
         """Handle lock checkbox changes"""
         if self.canvas.active_layer:
             is_locked = state == Qt.CheckState.Checked
-            self.canvas.active_layer.set_locked(is_locked)
+            with self._silent_canvas():
+                self.canvas.active_layer.set_locked(is_locked)
             
             # Update UI to reflect locked status
-            if is_locked:
-                item = self.layer_list.currentItem()
-                if item:
-                    item.setText(f"🔒 {self.canvas.active_layer.name}")
-            else:
-                item = self.layer_list.currentItem()
-                if item:
-                    item.setText(self.canvas.active_layer.name)
+            self._update_layer_item_text(self.layer_list.currentItem(), self.canvas.active_layer)
                     
             # Disable/enable scale controls
             self.scale_x_spin.setEnabled(not is_locked)
@@ -1,14 +1,15 @@
 from PyQt6.QtWidgets import (QToolBar, QToolButton, QLabel, QSlider, 
                             QVBoxLayout, QWidget, QHBoxLayout, QComboBox, QDoubleSpinBox, QPushButton,
                             QDockWidget, QFrame, QSizePolicy, QButtonGroup)
-from PyQt6.QtGui import QIcon, QPixmap, QColor, QAction, QBrush, QPainter
-from PyQt6.QtCore import Qt, pyqtSignal, QSize
+from PyQt6.QtGui import QColor, QAction, QBrush
+from PyQt6.QtCore import Qt, pyqtSignal, QSize, QSignalBlocker
+from functools import partial
 
 from gpu_tools import (BrightnessContrastTool, SharpenBlurTool,
                      ColorBalanceTool, NoiseReductionTool)
 from color_picker_tool import ColorPickerTool
 from selection_tool import SelectionTool  # Import the new tool
-from style_utils import COLORS, apply_glass_effect
+from style_utils import COLORS, STYLE_SHEETS, apply_glass_effect, symbol_icon
 
 class AdjustmentPanel(QWidget):
     """Widget to display adjustment controls for the active tool"""
@@ -20,148 +21,173 @@ class AdjustmentPanel(QWidget):
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(5, 5, 5, 5)
         self.layout.setSpacing(5)
-        self.setStyleSheet("""
-            QLabel {
-                color: #e0e0e0;
-                font-size: 11px;
-            }
-            QDoubleSpinBox, QComboBox {
-                background-color: #444444;
-                color: #f0f0f0;
-                border: 1px solid #555555;
-                border-radius: 3px;
-                padding: 3px;
-            }
-            QPushButton {
-                background-color: #444444;
-                color: #f0f0f0;
-                border: 1px solid #555555;
-                border-radius: 3px;
-                padding: 5px;
-            }
-            QPushButton:hover {
-                background-color: #555555;
-            }
-        """)
+        # One sheet styles the panel and its title; it has to stay on the panel
+        # itself to win over the glass container's sheet around it
+        self.setStyleSheet(STYLE_SHEETS["adjustment_panel"])
         # Title label
         self.title_label = QLabel("Adjustments")
-        self.title_label.setStyleSheet("font-weight: bold; font-size: 12px;")
+        self.title_label.setObjectName("adjustmentTitle")  # Styled by the panel sheet
         self.layout.addWidget(self.title_label)
-        # No controls by default
-        self.clear()
         
-    def clear(self):
-        """Clear all adjustment controls"""
-        # Remove all widgets except title
-        for i in reversed(range(1, self.layout.count())):
-            item = self.layout.itemAt(i)
-            if item is None:
-                continue
-                
-            # Remove widgets
-            if item.widget():
-                item.widget().deleteLater()
-            # Remove layouts recursively
-            elif item.layout():
-                self.clear_layout(item.layout())
-                
-        # Add empty label
-        self.layout.addWidget(QLabel("Select a tool to see controls"))
-        self.layout.addStretch(1)
+        # Control rows are built once per control name and reused across tools;
+        # rows the current tool does not use are just hidden
+        self._rows = {}  # (kind, name) -> row widget
+        self._spin_boxes = {}
+        self._defaults = {}
+        self._combos = {}
+        # Controls requested while the panel was hidden, applied once it shows
+        self._pending_controls = None
         
-    def clear_layout(self, layout):
-        """Clear all items from a layout"""
-        if layout is None:
-            return
-            
-        while layout.count():
-            item = layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-            elif item.layout():
-                self.clear_layout(item.layout())
+        self.placeholder = QLabel("Select a tool to see controls")
+        self.layout.addWidget(self.placeholder)
         
-    def set_controls(self, controls_data):
-        """Set the adjustment controls based on the tool"""
+        # Add apply button
+        self.apply_button = QPushButton("Apply Changes")
+        self.apply_button.clicked.connect(lambda: self.valueChanged.emit("apply", True))
+        self.layout.addWidget(self.apply_button)
+        
+        # Add stretch at the end
+        self.layout.addStretch(1)
+        
+        # No controls by default
         self.clear()
-        if not controls_data:
-            return
-        # Update title
-        self.title_label.setText(controls_data.get("title", "Adjustments"))
-        # Add all parameter inputs (replacing sliders)
-        params = controls_data.get("params", [])
-        for param_data in params:
-            name = param_data.get("name", "")
-            min_val = param_data.get("min", -10.0)
-            max_val = param_data.get("max", 10.0)
-            default_val = param_data.get("default", 0.0)
-            step = param_data.get("step", 0.1)
+        
+    def request_controls(self, controls_data):
+        """Set the controls now if the panel is visible, otherwise when it is next shown"""
+        if self.isVisible():
+            self._pending_controls = None
+            self.set_controls(controls_data)
+        else:
+            self._pending_controls = controls_data
             
-            # Create input layout
-            param_layout = QHBoxLayout()
+    def showEvent(self, event):
+        """Build controls that were requested while the panel was hidden"""
+        if self._pending_controls is not None:
+            controls, self._pending_controls = self._pending_controls, None
+            self.set_controls(controls)
+        super().showEvent(event)
+        
+    def clear(self):
+        """Hide all adjustment controls"""
+        for row in self._rows.values():
+            row.hide()
+        self.apply_button.hide()
+        self.placeholder.show()
+        
+    def _spin_row(self, name):
+        """Return the pooled spin box row for a parameter, building it on first use"""
+        row = self._rows.get(("spin", name))
+        if row is None:
+            row = QWidget()
+            param_layout = QHBoxLayout(row)
+            param_layout.setContentsMargins(0, 0, 0, 0)
             param_layout.addWidget(QLabel(f"{name}:"))
             
             # Use QDoubleSpinBox instead of slider
             spin_box = QDoubleSpinBox()
-            spin_box.setRange(min_val, max_val)
-            spin_box.setValue(default_val)
-            spin_box.setSingleStep(step)
             spin_box.setDecimals(2)  # Show 2 decimal places
             spin_box.setMinimumWidth(80)
             
-            # Add reset button
+            # Add reset button; the default comes from the tool shown last
             reset_btn = QPushButton("Reset")
             reset_btn.setFixedWidth(50)
-            reset_btn.clicked.connect(lambda checked=False, sb=spin_box, dv=default_val: sb.setValue(dv))
+            reset_btn.clicked.connect(partial(self._reset_param, name))
             
             # Connect spin box to emit value changes
-            spin_box.valueChanged.connect(lambda value, n=name: self.valueChanged.emit(n, value))
+            spin_box.valueChanged.connect(partial(self._on_param_changed, name))
             
             param_layout.addWidget(spin_box)
             param_layout.addWidget(reset_btn)
-            self.layout.addLayout(param_layout)
-            
-        # Add combo boxes
-        combos = controls_data.get("combos", [])
-        for combo_data in combos:
-            name = combo_data.get("name", "")
-            options = combo_data.get("options", [])
-            
-            # Create combo layout
-            combo_layout = QHBoxLayout()
+            self._rows[("spin", name)] = row
+            self._spin_boxes[name] = spin_box
+        return row
+        
+    def _combo_row(self, name):
+        """Return the pooled combo box row for a parameter, building it on first use"""
+        row = self._rows.get(("combo", name))
+        if row is None:
+            row = QWidget()
+            combo_layout = QHBoxLayout(row)
+            combo_layout.setContentsMargins(0, 0, 0, 0)
             combo_layout.addWidget(QLabel(f"{name}:"))
             
-            # Create combo box
-            combo = QComboBox()
-            for option in options:
-                combo.addItem(option)
-                
             # Connect combo to emit signal
-            combo.currentTextChanged.connect(
-                lambda text, n=name: self.valueChanged.emit(n, text)
-            )
+            combo = QComboBox()
+            combo.currentTextChanged.connect(partial(self._on_param_changed, name))
             
             combo_layout.addWidget(combo)
-            self.layout.addLayout(combo_layout)
-            
-        # Add apply button
-        apply_button = QPushButton("Apply Changes")
-        apply_button.clicked.connect(lambda: self.valueChanged.emit("apply", True))
-        self.layout.addWidget(apply_button)
+            self._rows[("combo", name)] = row
+            self._combos[name] = combo
+        return row
         
-        # Add stretch at the end
-        self.layout.addStretch(1)
+    def _on_param_changed(self, name, value):
+        """Forward a control's new value under its parameter name"""
+        self.valueChanged.emit(name, value)
+        
+    def _reset_param(self, name, checked=False):
+        """Restore a spin box to the default of the tool shown last"""
+        self._spin_boxes[name].setValue(self._defaults[name])
+        
+    def _place_row(self, row, index):
+        """Show a row at a layout position"""
+        self.layout.removeWidget(row)
+        self.layout.insertWidget(index, row)
+        row.show()
+        
+    def set_controls(self, controls_data):
+        """Set the adjustment controls based on the tool"""
+        self.clear()
+        if not controls_data:
+            return
+        # Update title
+        self.title_label.setText(controls_data.get("title", "Adjustments"))
+        self.placeholder.hide()
+        index = 1  # Rows go right after the title
+        
+        # Add all parameter inputs (replacing sliders)
+        params = controls_data.get("params", [])
+        for param_data in params:
+            name = param_data.get("name", "")
+            row = self._spin_row(name)
+            spin_box = self._spin_boxes[name]
+            self._defaults[name] = param_data.get("default", 0.0)
+            
+            # Configure silently, as a freshly built spin box would not have emitted
+            with QSignalBlocker(spin_box):
+                spin_box.setRange(param_data.get("min", -10.0), param_data.get("max", 10.0))
+                spin_box.setValue(self._defaults[name])
+                spin_box.setSingleStep(param_data.get("step", 0.1))
+            self._place_row(row, index)
+            index += 1
+            
+        # Add combo boxes
+        combos = controls_data.get("combos", [])
+        for combo_data in combos:
+            name = combo_data.get("name", "")
+            row = self._combo_row(name)
+            combo = self._combos[name]
+            with QSignalBlocker(combo):
+                combo.clear()
+                combo.addItems(combo_data.get("options", []))
+            self._place_row(row, index)
+            index += 1
+            
+        self.apply_button.show()
 
 class LeftToolbar(QToolBar):
     """Left toolbar for GPU-accelerated image editing tools"""
     
     statusChanged = pyqtSignal(str)
+    activeToolChanged = pyqtSignal(object)  # New active tool, or None
     
     def __init__(self, canvas):
         super().__init__("Image Effects")
         self.canvas = canvas
         self.active_tool = None
         self.tools = []
+        self._tool_classes = []
+        self._button_index = {}  # Tool button -> index into self.tools
+        self._status_show = None  # Status bar showMessage, resolved on first use
         self.adjustment_dock = None
         
         # Create a button group so only one tool is active at a time
@@ -210,19 +236,25 @@ class LeftToolbar(QToolBar):
     def add_tools(self):
         """Add available image editing tools"""
         # Add GPU-based tools
-        self.add_tool(BrightnessContrastTool(self.canvas), self.create_icon("⟐", COLORS["accent"]))
-        self.add_tool(SharpenBlurTool(self.canvas), self.create_icon("✦", COLORS["accent"]))
-        self.add_tool(ColorBalanceTool(self.canvas), self.create_icon("◑", COLORS["accent"]))
-        self.add_tool(NoiseReductionTool(self.canvas), self.create_icon("❄", COLORS["accent"]))
+        self.add_tool(BrightnessContrastTool, self.create_icon("⟐", COLORS["accent"]),
+                      "Adjust image brightness and contrast")
+        self.add_tool(SharpenBlurTool, self.create_icon("✦", COLORS["accent"]),
+                      "Sharpen or blur the image")
+        self.add_tool(ColorBalanceTool, self.create_icon("◑", COLORS["accent"]),
+                      "Adjust image color balance")
+        self.add_tool(NoiseReductionTool, self.create_icon("❄", COLORS["accent"]),
+                      "Reduce image noise")
         
         # Add selection tool with "◫" (boxed rectangle) icon
-        self.add_tool(SelectionTool(self.canvas), self.create_icon("◫", COLORS["accent_secondary"]))
+        self.add_tool(SelectionTool, self.create_icon("◫", COLORS["accent_secondary"]),
+                      "Selection Tool (S)")
         
         # Add color picker tool 
-        self.add_tool(ColorPickerTool(self.canvas), self.create_icon("⦿", COLORS["accent_secondary"]))
+        self.add_tool(ColorPickerTool, self.create_icon("⦿", COLORS["accent_secondary"]),
+                      "Color Picker (P)")
         
-    def add_tool(self, tool, icon=None):
-        """Add a tool to the toolbar"""
+    def add_tool(self, tool_class, icon=None, tooltip=None):
+        """Add a button for a tool; the tool itself is created when first clicked"""
         button = QToolButton()
         button.setCheckable(True)
         
@@ -234,43 +266,32 @@ class LeftToolbar(QToolBar):
             button.setIcon(self.create_icon("T", COLORS["text"]))
             
         # Set tooltip
-        if hasattr(tool, 'get_tooltip'):
-            button.setToolTip(tool.get_tooltip())
-        elif hasattr(tool, 'get_name'):
-            button.setToolTip(tool.get_name())
-        else:
-            button.setToolTip(tool.__class__.__name__)
+        button.setToolTip(tooltip or tool_class.__name__)
             
         # Add button to group and toolbar
         self.tool_group.addButton(button)
         self.addWidget(button)
         
-        # Store tool reference
-        self.tools.append(tool)
-        tool.statusChanged = self.statusChanged
+        # Store the tool class; the slot stays empty until the tool is first used
+        self._tool_classes.append(tool_class)
+        self.tools.append(None)
+        self._button_index[button] = len(self.tools) - 1
         
-        # Connect signal from tool if it exists
-        if hasattr(tool, 'statusChanged'):
-            tool.statusChanged.connect(self.on_status_changed)
+    def _tool_at(self, index):
+        """Return the tool for a button index, creating it on first use"""
+        tool = self.tools[index]
+        if tool is None:
+            tool = self._tool_classes[index](self.canvas)
+            self.tools[index] = tool
+            
+            # Connect signal from tool if it exists
+            if hasattr(tool, 'statusChanged'):
+                tool.statusChanged.connect(self.on_status_changed)
+        return tool
         
     def create_icon(self, symbol, color):
         """Create a simple icon with text symbol"""
-        pixmap = QPixmap(32, 32)
-        pixmap.fill(Qt.GlobalColor.transparent)
-        
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setPen(QColor(color))
-        painter.setBrush(Qt.BrushStyle.NoBrush)
-        
-        # Draw symbol centered in icon
-        font = painter.font()
-        font.setPointSize(18)
-        painter.setFont(font)
-        painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, symbol)
-        painter.end()
-        
-        return QIcon(pixmap)
+        return symbol_icon(symbol, str(color))
     
     def toggle_collapse(self):
         """Toggle collapsed state of the toolbar"""
@@ -326,14 +347,15 @@ class LeftToolbar(QToolBar):
         
     def on_tool_clicked(self, button):
         """Handle tool button clicks"""
-        tool_index = self.tool_group.buttons().index(button)
+        tool_index = self._button_index[button]
         
         # Check if the same tool is being clicked again (toggle off behavior)
-        if self.active_tool and self.active_tool == self.tools[tool_index] and button.isChecked():
+        if self.active_tool and self.active_tool is self.tools[tool_index] and button.isChecked():
             # Uncheck the button to deactivate the tool
             button.setChecked(False)
             self.active_tool.deactivate()
             self.active_tool = None
+            self.activeToolChanged.emit(None)
             
             # Hide adjustment panel
             if self.adjustment_dock:
@@ -348,8 +370,9 @@ class LeftToolbar(QToolBar):
             
         # Activate new tool
         if button.isChecked():
-            self.active_tool = self.tools[tool_index]
+            self.active_tool = self._tool_at(tool_index)
             self.active_tool.activate()
+            self.activeToolChanged.emit(self.active_tool)
             
             # Show adjustment panel for this tool
             self.show_adjustment_panel(self.active_tool)
@@ -359,6 +382,7 @@ class LeftToolbar(QToolBar):
                 self.on_status_changed(f"Tool: {self.active_tool.get_name()}")
         else:
             self.active_tool = None
+            self.activeToolChanged.emit(None)
             
             # Hide adjustment panel
             if self.adjustment_dock:
@@ -378,8 +402,8 @@ class LeftToolbar(QToolBar):
         # Create/get the adjustment dock
         dock = self.create_adjustment_panel()
         
-        # Set the controls in the panel
-        self.adjustment_panel.set_controls(controls)
+        # Set the controls in the panel; a hidden panel builds them when it shows
+        self.adjustment_panel.request_controls(controls)
         
         # Show the dock
         dock.show()
@@ -392,5 +416,12 @@ class LeftToolbar(QToolBar):
             
     def on_status_changed(self, status):
         """Handle status change from tools"""
-        if hasattr(self.canvas, 'main_window') and hasattr(self.canvas.main_window, 'statusBar'):
-            self.canvas.main_window.statusBar.showMessage(status)
+        # The window is attached to the canvas after the toolbar is built, so
+        # resolve its status bar on the first message and keep the bound method
+        show = self._status_show
+        if show is None:
+            status_bar = getattr(getattr(self.canvas, 'main_window', None), 'statusBar', None)
+            if status_bar is None:
+                return
+            show = self._status_show = status_bar.showMessage
+        show(status)
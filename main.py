@@ -1,10 +1,10 @@
 import sys
-import os
 import traceback
 from PyQt6.QtWidgets import QApplication, QMessageBox
-from PyQt6.QtGui import QIcon, QFont
+from PyQt6.QtGui import QFont, QSurfaceFormat
 from PyQt6.QtCore import Qt
-from app import ImageReferenceApp, resource_path
+from app import ImageReferenceApp
+from resources import app_icon
 from debug_util import debug_log
 
 def exception_hook(exc_type, exc_value, exc_traceback):
@@ -22,9 +22,21 @@ def exception_hook(exc_type, exc_value, exc_traceback):
     error_dialog.exec()
 
 def main():
-    # Enable high DPI support
-    os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "1"
-    os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
+    # High DPI scaling is always on in Qt 6; pass fractional scale factors
+    # through unrounded so the first layout already uses the final scale
+    QApplication.setHighDpiScaleFactorRoundingPolicy(Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
+    
+    # Merge queued mouse moves and other high frequency events on every platform
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_CompressHighFrequencyEvents, True)
+    
+    # Share GL resources between contexts and vsync GL surfaces; both must be set
+    # before the application exists. The canvas asks for multisampling itself
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts, True)
+    gl_format = QSurfaceFormat()
+    gl_format.setRenderableType(QSurfaceFormat.RenderableType.OpenGL)
+    gl_format.setSwapInterval(1)
+    gl_format.setSamples(0)
+    QSurfaceFormat.setDefaultFormat(gl_format)
     
     # Create application
     app = QApplication(sys.argv)
@@ -34,9 +46,9 @@ def main():
     app.setOrganizationName("Chun")
     
     # Set app icon for taskbar
-    icon_path = resource_path("icon.png")
-    if os.path.exists(icon_path):
-        app.setWindowIcon(QIcon(icon_path))
+    app.setWindowIcon(app_icon())
+    if app_icon().isNull():
+        debug_log("Application icon not found", "WARNING")
     
     # Set default font
     app.setFont(QFont("Segoe UI", 9))
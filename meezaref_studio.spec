@@ -1,21 +1,35 @@
 # -*- mode: python ; coding: utf-8 -*-
+import sys
 
 block_cipher = None
 
+# UPX gains almost nothing on these but makes every launch unpack them into
+# memory, so leave the Qt core, Python and MSVC runtime DLLs uncompressed
+upx_exclude = [
+    'Qt6Core.dll', 'Qt6Gui.dll', 'Qt6Widgets.dll',
+    'python3.dll', f'python{sys.version_info.major}{sys.version_info.minor}.dll',
+    'vcruntime140.dll', 'vcruntime140_1.dll',
+]
+
 a = Analysis(
     ['main.py'],
     pathex=['c:\\Users\\Administrator\\Desktop\\testing'],
     binaries=[],
     datas=[
         ('icon.png', '.'),          # Include the in-app icon
+        ('icons', 'icons'),         # Toolbar SVG icons
         # Add any other data files your app needs
     ],
     hiddenimports=[
         'PyQt6.QtSvg',  # Required for SVG icons
+        'PyQt6.QtOpenGLWidgets',  # OpenGL canvas viewport
         'PyQt6.sip',    # Required PyQt internals
         'cv2',          # OpenCV
         'numpy',        # NumPy functions
         'siphash24',
+        'msgpack',      # Canvas file format
+        'rtree',        # Layer spatial index
+        'numba',        # Region color analysis
     ],
     hookspath=[],
     hooksconfig={},
@@ -36,7 +50,7 @@ a = Analysis(
 qt_excludes = [
     'QtBluetooth', 'QtDBus', 'QtDesigner', 'QtHelp',
     'QtLocation', 'QtMultimedia', 'QtMultimediaWidgets',
-    'QtNetwork', 'QtNfc', 'QtOpenGL', 'QtPositioning',
+    'QtNetwork', 'QtNfc', 'QtPositioning',
     'QtQml', 'QtQuick', 'QtQuickWidgets', 'QtSensors',
     'QtSerialPort', 'QtSql', 'QtTest', 'QtWebChannel',
     'QtWebEngine', 'QtWebEngineCore', 'QtWebEngineWidgets',
@@ -81,6 +95,6 @@ coll = COLLECT(
     strip=False,
     upx=True,
     upx_dir='C:\\upx-4.2.4-win64',
-    upx_exclude=['vcruntime140.dll'],  # Don't compress certain system DLLs
+    upx_exclude=upx_exclude,  # Don't compress core runtime DLLs
     name='MeezaRefStudio',
 )
@@ -0,0 +1,22 @@
+from PyQt6.QtGui import QIcon
+import functools
+import os
+import sys
+
+# PyInstaller creates a temp folder and stores path in _MEIPASS
+_BASE_PATH = getattr(sys, '_MEIPASS', None) or os.path.abspath(".")
+
+# Application icon, decoded once on first use (needs a QApplication)
+_APP_ICON = None
+
+@functools.lru_cache(maxsize=None)
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    return os.path.join(_BASE_PATH, relative_path)
+
+def app_icon():
+    """Return the shared application icon"""
+    global _APP_ICON
+    if _APP_ICON is None:
+        _APP_ICON = QIcon(resource_path("icon.png"))
+    return _APP_ICON
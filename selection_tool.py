@@ -1,11 +1,78 @@
-from PyQt6.QtCore import Qt, QPoint, QRect, QRectF, QPointF, pyqtSignal
-from PyQt6.QtGui import QPen, QColor, QCursor, QPixmap, QPainter, QBrush, QTransform, QPainterPath
+from PyQt6.QtCore import Qt, QPoint, QRect, QRectF, QPointF, QTimer, pyqtSignal
+from PyQt6.QtGui import QPen, QColor, QCursor, QImage, QPixmap, QPainter, QBrush, QTransform, QPainterPath
 from PyQt6.QtWidgets import QApplication, QComboBox, QLabel, QVBoxLayout, QWidget
 
 import numpy as np
 
+try:
+    from numba import njit, prange
+    numba_available = True
+except ImportError:
+    numba_available = False
+
 from tools import Tool
-from layer import Layer
+from layer import Layer, bgra_view
+from history import Action
+
+def _ellipse_coverage(width, height):
+    """Per-pixel coverage of an ellipse filling width x height, with a one pixel antialiased edge"""
+    rx, ry = width / 2.0, height / 2.0
+    # Normalized coordinates of the pixel centers, as open grids that broadcast
+    nx = ((np.arange(width, dtype=np.float32) + 0.5) - rx) / rx
+    ny = (((np.arange(height, dtype=np.float32) + 0.5) - ry) / ry)[:, None]
+    # Implicit ellipse value over its gradient length approximates the distance in pixels
+    level = nx * nx + ny * ny - 1.0
+    gradient = 2.0 * np.sqrt((nx / rx) ** 2 + (ny / ry) ** 2)
+    distance = level / np.maximum(gradient, 1e-6)
+    return np.clip(0.5 - distance, 0.0, 1.0)
+
+if numba_available:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _mask_ellipse(source, pixels):
+        """Write source scaled by the same coverage as _ellipse_coverage into pixels, one row per thread"""
+        height, width = pixels.shape[0], pixels.shape[1]
+        rx, ry = width / 2.0, height / 2.0
+        for y in prange(height):
+            ny = (y + 0.5 - ry) / ry
+            for x in range(width):
+                nx = (x + 0.5 - rx) / rx
+                level = nx * nx + ny * ny - 1.0
+                gradient = 2.0 * np.sqrt((nx / rx) ** 2 + (ny / ry) ** 2)
+                coverage = min(1.0, max(0.0, 0.5 - level / max(gradient, 1e-6)))
+                for c in range(4):
+                    pixels[y, x, c] = np.uint8(np.rint(source[y, x, c] * coverage))
+
+_selection_cursor = None
+
+def _get_selection_cursor():
+    """Return the selection cursor shared by all tool instances, drawing it the first time"""
+    global _selection_cursor
+    if _selection_cursor is None:
+        _selection_cursor = _build_selection_cursor()
+    return _selection_cursor
+
+def _build_selection_cursor():
+    """Create a custom selection cursor"""
+    cursor_pixmap = QPixmap(32, 32)
+    cursor_pixmap.fill(Qt.GlobalColor.transparent)
+    
+    painter = QPainter(cursor_pixmap)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    
+    # Draw crosshair
+    painter.setPen(QPen(QColor(0, 0, 0), 2))
+    painter.drawLine(14, 16, 18, 16)  # Horizontal line
+    painter.drawLine(16, 14, 16, 18)  # Vertical line
+    
+    # Draw selection icon
+    painter.setPen(QPen(QColor(0, 0, 0), 1))
+    painter.drawRect(6, 6, 20, 20)
+    painter.setPen(QPen(QColor(255, 255, 255), 1))
+    painter.drawRect(7, 7, 18, 18)
+    
+    painter.end()
+    
+    return QCursor(cursor_pixmap, 16, 16)  # Center hotspot
 
 class SelectionTool(Tool):
     """Tool for selecting an area to duplicate as a new layer"""
@@ -18,34 +85,28 @@ class SelectionTool(Tool):
         self.selection_shape = "Rectangle"  # Default shape
         self.selection_shapes = ["Rectangle", "Ellipse"]
         
-        # Set up cursor
-        self._create_selection_cursor()
-
-    def _create_selection_cursor(self):
-        """Create a custom selection cursor"""
-        cursor_pixmap = QPixmap(32, 32)
-        cursor_pixmap.fill(Qt.GlobalColor.transparent)
+        # Selection rect cached against the point objects it was built from
+        self._cached_points = (None, None)
+        self._cached_rect = None
         
-        painter = QPainter(cursor_pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Draw crosshair
-        painter.setPen(QPen(QColor(0, 0, 0), 2))
-        painter.drawLine(14, 16, 18, 16)  # Horizontal line
-        painter.drawLine(16, 14, 16, 18)  # Vertical line
-        
-        # Draw selection icon
-        painter.setPen(QPen(QColor(0, 0, 0), 1))
-        painter.drawRect(6, 6, 20, 20)
-        painter.setPen(QPen(QColor(255, 255, 255), 1))
-        painter.drawRect(7, 7, 18, 18)
+        # Overlay pens, one view pixel wide at any zoom, and the last size label
+        self._fill_brush = QBrush(QColor(100, 150, 255, 40))
+        self._outline_pen = QPen(QColor(100, 150, 255, 180), 1, Qt.PenStyle.DashLine)
+        self._outline_pen.setCosmetic(True)
+        self._label_pen = QPen(self._outline_pen)
+        self._label_pen.setStyle(Qt.PenStyle.SolidLine)
+        self._size_label = (None, "")
         
-        painter.end()
-        
-        self.cursor = QCursor(cursor_pixmap, 16, 16)  # Center hotspot
+        # Drag updates are coalesced so the overlay moves at most once per display frame
+        self._overlay_timer = QTimer(self)
+        self._overlay_timer.setSingleShot(True)
+        self._overlay_timer.setInterval(8)
+        self._overlay_timer.timeout.connect(self._update_overlay)
 
     def activate(self):
         """Activate the selection tool"""
+        # Selection cursor is drawn once on first use and shared
+        self.cursor = _get_selection_cursor()
         super().activate()
         # Store original cursor
         self.original_cursor = self.canvas.cursor()
@@ -65,6 +126,8 @@ class SelectionTool(Tool):
         self.start_point = None
         self.current_point = None
         self.selection_active = False
+        self._overlay_timer.stop()
+        self.canvas.overlay_item.clear()
         super().deactivate()
 
     def mouse_press(self, event):
@@ -93,7 +156,8 @@ class SelectionTool(Tool):
                 self.statusChanged.emit("Selection completed. Click and drag for new selection")
             
         event.accept()
-        self.canvas.viewport().update()
+        self._overlay_timer.stop()
+        self._update_overlay()
         
     def mouse_move(self, event):
         """Update selection preview during mouse move"""
@@ -104,8 +168,9 @@ class SelectionTool(Tool):
         view_pos = event.position().toPoint()
         self.current_point = self.canvas.mapToScene(view_pos)
         
-        # Update display
-        self.canvas.viewport().update()
+        # Update display on the next frame tick
+        if not self._overlay_timer.isActive():
+            self._overlay_timer.start()
         event.accept()
         
     def mouse_release(self, event):
@@ -114,15 +179,20 @@ class SelectionTool(Tool):
     
     def get_selection_rect(self):
         """Get QRectF from selection points"""
-        if not self.start_point or not self.current_point:
+        start, current = self.start_point, self.current_point
+        if not start or not current:
             return None
             
-        x = min(self.start_point.x(), self.current_point.x())
-        y = min(self.start_point.y(), self.current_point.y())
-        width = abs(self.current_point.x() - self.start_point.x())
-        height = abs(self.current_point.y() - self.start_point.y())
-        
-        return QRectF(x, y, width, height)
+        # Points are replaced rather than mutated, so identity means unchanged
+        cached_start, cached_current = self._cached_points
+        if start is cached_start and current is cached_current:
+            return self._cached_rect
+            
+        sx, sy = start.x(), start.y()
+        cx, cy = current.x(), current.y()
+        self._cached_rect = QRectF(min(sx, cx), min(sy, cy), abs(cx - sx), abs(cy - sy))
+        self._cached_points = (start, current)
+        return self._cached_rect
     
     def create_layer_from_selection(self):
         """Create a new layer from the selected area"""
@@ -135,19 +205,9 @@ class SelectionTool(Tool):
             self.statusChanged.emit("Selection too small")
             return False
             
-        # Get item-local coordinates
+        # Map into image pixels with the layer's cached inverse transform, which includes its scale
         active_layer = self.canvas.active_layer
-        item_rect = active_layer.mapFromScene(selection_rect).boundingRect()
-        
-        # Account for layer scaling by dividing by scale factors
-        if hasattr(active_layer, 'scale_x') and hasattr(active_layer, 'scale_y') and active_layer.scale_x > 0 and active_layer.scale_y > 0:
-            adjusted_rect = QRectF(
-                item_rect.x() / active_layer.scale_x,
-                item_rect.y() / active_layer.scale_y,
-                item_rect.width() / active_layer.scale_x,
-                item_rect.height() / active_layer.scale_y
-            )
-            item_rect = adjusted_rect
+        item_rect = active_layer.image_transform().mapRect(selection_rect)
         
         # Convert QRect to QRectF for proper intersection
         image_rect = QRectF(active_layer.original_image.rect())
@@ -165,38 +225,26 @@ class SelectionTool(Tool):
         width = min(active_layer.original_image.width() - x, int(round(intersected_rect.width())))
         height = min(active_layer.original_image.height() - y, int(round(intersected_rect.height())))
         
-        # Use copy method to create a new image from selection
-        selected_image = active_layer.original_image.copy(x, y, width, height)
-        
-        # Apply elliptical mask if using ellipse shape
         if self.selection_shape == "Ellipse":
-            # Create a transparent image of the same size
-            mask = QPixmap(width, height)
-            mask.fill(Qt.GlobalColor.transparent)
-            
-            # Create elliptical mask
-            mask_painter = QPainter(mask)
-            mask_painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
-            mask_painter.setPen(Qt.PenStyle.NoPen)
-            mask_painter.setBrush(QColor(255, 255, 255, 255))
-            mask_painter.drawEllipse(0, 0, width, height)
-            mask_painter.end()
-            
-            # Apply mask to image
-            result = QPixmap.fromImage(selected_image)
-            masked_result = QPixmap(width, height)
-            masked_result.fill(Qt.GlobalColor.transparent)
-            
-            masked_painter = QPainter(masked_result)
-            masked_painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
-            masked_painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
-            masked_painter.drawPixmap(0, 0, mask)
-            masked_painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
-            masked_painter.drawPixmap(0, 0, result)
-            masked_painter.end()
-            
-            # Convert back to QImage
-            selected_image = masked_result.toImage()
+            # Mask straight from a view of the layer into the new image, so the
+            # region is copied and masked in one pass. Premultiplied pixels fade
+            # out by scaling every channel by the coverage
+            source = active_layer.original_image
+            if source.format() != QImage.Format.Format_ARGB32_Premultiplied:
+                source = source.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+            source, source_pixels = bgra_view(source)
+            source_pixels = source_pixels[y:y + height, x:x + width]
+            selected_image, pixels = bgra_view(
+                QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied), writable=True)
+            pixels = pixels[:, :width]
+            if numba_available:
+                _mask_ellipse(source_pixels, pixels)
+            else:
+                coverage = _ellipse_coverage(width, height)[..., None]
+                pixels[:] = np.rint(source_pixels * coverage).astype(np.uint8)
+        else:
+            # Use copy method to create a new image from selection
+            selected_image = active_layer.original_image.copy(x, y, width, height)
         
         # Create a new layer with selected image
         new_layer = Layer()
@@ -213,7 +261,7 @@ class SelectionTool(Tool):
         
         # Add to history
         if hasattr(self.canvas, 'history'):
-            self.canvas.history.add_command("add_layer", new_layer)
+            self.canvas.history.add_command(Action.ADD_LAYER, new_layer)
             
         self.canvas.layerChanged.emit()
         self.statusChanged.emit(f"Created new layer from selection")
@@ -236,48 +284,56 @@ class SelectionTool(Tool):
         if name == "shape":
             self.selection_shape = value
     
-    def paintEvent(self, painter, rect):
-        """Draw the selection overlay"""
-        if self.selection_active and self.start_point and self.current_point:
-            selection_rect = self.get_selection_rect()
-            if selection_rect:
-                # Convert scene rectangle to view coordinates
-                view_rect = self.canvas.mapFromScene(selection_rect).boundingRect()
-                
-                # Draw selection based on selected shape
-                painter.save()
-                
-                # Semi-transparent fill
-                painter.setBrush(QBrush(QColor(100, 150, 255, 40)))
-                
-                # Dotted outline
-                pen = QPen(QColor(100, 150, 255, 180), 1, Qt.PenStyle.DashLine)
-                painter.setPen(pen)
-                
-                if self.selection_shape == "Rectangle":
-                    painter.drawRect(view_rect)
-                elif self.selection_shape == "Ellipse":
-                    painter.drawEllipse(view_rect)
-                
-                # Draw size info
-                pen.setStyle(Qt.PenStyle.SolidLine)
-                painter.setPen(pen)
-                width = int(selection_rect.width())
-                height = int(selection_rect.height())
-                size_text = f"{width} × {height}"
-                
-                # Convert text position to view coordinates
-                text_pos = QPointF(selection_rect.x() + 5, selection_rect.y() + selection_rect.height() - 20)
-                view_text_pos = self.canvas.mapFromScene(text_pos)
-                
-                text_rect = QRectF(
-                    view_text_pos.x(),
-                    view_text_pos.y(),
-                    100, 20
-                )
-                painter.drawText(text_rect, size_text)
-                
-                painter.restore()
+    def _update_overlay(self):
+        """Show the current selection through the canvas overlay item"""
+        selection_rect = self.get_selection_rect() if self.selection_active else None
+        if not selection_rect:
+            self.canvas.overlay_item.clear()
+            return
+            
+        # Leave room for the size label, which is drawn at a fixed size in view pixels
+        zoom = self.canvas.transform().m11()
+        label_rect = QRectF(selection_rect.x() + 5, selection_rect.bottom() - 20, 100 / zoom, 20 / zoom)
+        margin = 2 / zoom
+        self.canvas.overlay_item.set_geometry(
+            selection_rect.united(label_rect).adjusted(-margin, -margin, margin, margin),
+            self.paint_overlay)
+    
+    def paint_overlay(self, painter):
+        """Draw the selection overlay in scene coordinates"""
+        selection_rect = self.get_selection_rect()
+        if not selection_rect:
+            return
+            
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        
+        # Semi-transparent fill and dotted outline
+        painter.setBrush(self._fill_brush)
+        painter.setPen(self._outline_pen)
+        
+        if self.selection_shape == "Rectangle":
+            painter.drawRect(selection_rect)
+        elif self.selection_shape == "Ellipse":
+            painter.drawEllipse(selection_rect)
+        
+        # Draw size info; the text only changes when the size does
+        painter.setPen(self._label_pen)
+        size = (int(selection_rect.width()), int(selection_rect.height()))
+        if size != self._size_label[0]:
+            self._size_label = (size, f"{size[0]} × {size[1]}")
+        size_text = self._size_label[1]
+        
+        # Convert text position to view coordinates and draw it untransformed
+        text_pos = QPointF(selection_rect.x() + 5, selection_rect.y() + selection_rect.height() - 20)
+        view_text_pos = painter.worldTransform().map(text_pos)
+        painter.resetTransform()
+        
+        text_rect = QRectF(
+            view_text_pos.x(),
+            view_text_pos.y(),
+            100, 20
+        )
+        painter.drawText(text_rect, size_text)
                 
     def get_tooltip(self):
         """Return tooltip for toolbar button"""
@@ -1,9 +1,14 @@
-from PyQt6.QtWidgets import QGraphicsOpacityEffect, QToolButton, QGraphicsDropShadowEffect
-from PyQt6.QtGui import QPainter, QColor, QBrush, QPalette
-from PyQt6.QtCore import QPropertyAnimation, QEasingCurve, QPoint, QSize, Qt, QTimer, pyqtProperty, QObject, QRect
+from PyQt6.QtWidgets import (QGraphicsOpacityEffect, QToolButton,
+                             QStyle, QStyleOptionToolButton)
+from PyQt6.QtGui import QPainter, QColor, QBrush, QPalette, QIcon, QImage, QPixmap
+from PyQt6.QtCore import QPropertyAnimation, QVariantAnimation, QEasingCurve, QPoint, QSize, Qt, QTimer, QObject, QRect, QRectF, QElapsedTimer, QEvent
+from collections import deque
+from functools import lru_cache
+from statistics import median
+from types import MappingProxyType
 
-# Modern color scheme
-COLORS = {
+# Modern color scheme; read-only, since every sheet below is formatted from it at import
+COLORS = MappingProxyType({
     "primary": "#1e1e1e",
     "primary_light": "#2d2d2d",
     "primary_dark": "#1a1a1a",  # Add missing primary_dark color
@@ -16,150 +21,234 @@ COLORS = {
     "canvas_bg": "#1e1e1e",  # Add missing color definition
     "success": "#4ec9b0",
     "warning": "#ce9178",
-    "error": "#f44747"
-}
+    "error": "#f44747",
+    "glass_shadow": "#60000000"  # Qt reads 8-digit hex as #AARRGGBB
+})
+
+def _rgba(color, opacity):
+    """Format a hex color as a QSS rgba() value with the given opacity"""
+    color = QColor(color)
+    return f"rgba({color.red()}, {color.green()}, {color.blue()}, {int(opacity * 255)})"
+
+# Glass look for the main window chrome, drawn by the style sheet alone
+_GLASS_BACKGROUND = _rgba(COLORS["primary"], 0.95)
+_GLASS_BORDER = "1px solid rgba(255, 255, 255, 0.1)"
+
+# Application-wide style sheet, applied once on the QApplication. Widgets opt in
+# through their object name instead of carrying their own per-widget sheet.
+APP_STYLE_SHEET = f"""
+    QMainWindow#MainRoot {{
+        background-color: {COLORS["primary"]};
+        border: 1px solid {COLORS["border"]};
+    }}
+
+    QFrame#canvasFrame {{
+        background-color: {COLORS["primary"]};
+        border: 1px solid {COLORS["border"]};
+        border-radius: 10px;
+    }}
+
+    QStatusBar#glassBar {{
+        background-color: {_GLASS_BACKGROUND};
+        color: {COLORS["text_dark"]};
+        border: {_GLASS_BORDER};
+        border-radius: 8px;
+        padding: 4px;
+    }}
+
+    QDockWidget#layersDock {{
+        background-color: {_GLASS_BACKGROUND};
+        border: {_GLASS_BORDER};
+        border-radius: 8px;
+        color: {COLORS["text"]};
+    }}
+
+    QDockWidget#layersDock::title {{
+        background-color: {COLORS["primary_light"]};
+        padding: 5px;
+        border-bottom: 1px solid {COLORS["border"]};
+    }}
+
+    QDockWidget#layersDock::close-button, QDockWidget#layersDock::float-button {{
+        border: none;
+        background: {COLORS["primary_light"]};
+        padding: 0px;
+    }}
+
+    QDockWidget#layersDock::close-button:hover, QDockWidget#layersDock::float-button:hover {{
+        background: {COLORS["accent"]}40;
+    }}
+
+    QToolBar#leftBar {{
+        background-color: {_GLASS_BACKGROUND};
+        border: {_GLASS_BORDER};
+        border-radius: 8px;
+        spacing: 5px;
+        padding: 5px;
+    }}
+
+    QToolBar#leftBar QToolButton {{
+        background-color: {COLORS["primary_light"]};
+        border: 1px solid {COLORS["border"]};
+        border-radius: 4px;
+        padding: 4px;
+    }}
+
+    QToolBar#leftBar QToolButton:hover {{
+        background-color: {COLORS["accent"]}40;
+        border-color: {COLORS["accent"]};
+    }}
+
+    QToolBar#leftBar QToolButton:checked {{
+        background-color: {COLORS["accent"]};
+        border-color: {COLORS["accent"]};
+    }}
+
+    QPushButton#dockCollapseBtn {{
+        background-color: {COLORS["primary_light"]};
+        color: {COLORS["text"]};
+        border: 1px solid {COLORS["border"]};
+        border-radius: 3px;
+        max-width: 24px;
+        max-height: 18px;
+    }}
+
+    QPushButton#dockCollapseBtn:hover {{
+        background-color: {COLORS["accent"]}40;
+    }}
+
+    QGraphicsView#canvasView {{
+        background-color: {COLORS["canvas_bg"]};
+        border: none;
+        border-radius: 8px;
+    }}
+
+    QListWidget#layerList {{
+        background-color: {COLORS["primary"]};
+        color: {COLORS["text"]};
+        border: 1px solid {COLORS["border"]};
+        border-radius: 6px;
+        outline: none;
+    }}
+    QListWidget#layerList::item {{
+        background-color: {COLORS["primary_light"]};
+        color: {COLORS["text"]};
+        border: 1px solid transparent;
+        border-radius: 6px;
+        padding: 4px 8px;
+        margin: 2px;
+    }}
+    QListWidget#layerList::item:selected {{
+        background-color: {COLORS["accent"]}40;
+        border: 1px solid {COLORS["accent"]};
+    }}
+    QListWidget#layerList::item:hover:!selected {{
+        background-color: {COLORS["primary_light"]}90;
+        border: 1px solid {COLORS["border"]};
+    }}
+
+    QListWidget#layerList QDoubleSpinBox, QListWidget#layerList QSpinBox, QListWidget#layerList QCheckBox {{
+        background-color: {COLORS["primary_light"]};
+        color: {COLORS["text"]};
+        border: 1px solid {COLORS["border"]};
+        border-radius: 4px;
+        padding: 2px 4px;
+    }}
+
+    QListWidget#layerList QPushButton {{
+        background-color: {COLORS["primary_light"]};
+        color: {COLORS["text"]};
+        border: 1px solid {COLORS["border"]};
+        border-radius: 6px;
+        padding: 6px 12px;
+    }}
+    QListWidget#layerList QPushButton:hover {{
+        background-color: {COLORS["accent"]}40;
+        border: 1px solid {COLORS["accent"]};
+    }}
+
+    QListWidget#layerList QLabel {{
+        color: {COLORS["text"]};
+    }}
+"""
 
-# Define style sheets for various components
+# Per-widget sheets, only for widgets inside containers whose own selectorless
+# sheet would otherwise override the application sheet
 STYLE_SHEETS = {
-    "main_window": f"""
-        QMainWindow {{
-            background-color: {COLORS["primary"]};
-            border: 1px solid {COLORS["border"]};
-        }}
-    """,
-    
-    "dock_widget": f"""
-        QDockWidget {{
-            background-color: {COLORS["primary"]};
-            border: 1px solid {COLORS["border"]};
-            color: {COLORS["text"]};
-        }}
-        
-        QDockWidget::title {{
-            background-color: {COLORS["primary_light"]};
-            padding: 5px;
-            border-bottom: 1px solid {COLORS["border"]};
-        }}
-        
-        QDockWidget::close-button, QDockWidget::float-button {{
-            border: none;
-            background: {COLORS["primary_light"]};
-            padding: 0px;
-        }}
-        
-        QDockWidget::close-button:hover, QDockWidget::float-button:hover {{
-            background: {COLORS["accent"]}40;
-        }}
-    """,
-    
-    "toolbar": f"""
-        QToolBar {{
-            background-color: {COLORS["primary"]};
-            border: none;
-            spacing: 5px;
+    "adjustment_panel": """
+        QLabel {
+            color: #e0e0e0;
+            font-size: 11px;
+        }
+        QLabel#adjustmentTitle {
+            font-weight: bold;
+            font-size: 12px;
+        }
+        QDoubleSpinBox, QComboBox {
+            background-color: #444444;
+            color: #f0f0f0;
+            border: 1px solid #555555;
+            border-radius: 3px;
+            padding: 3px;
+        }
+        QPushButton {
+            background-color: #444444;
+            color: #f0f0f0;
+            border: 1px solid #555555;
+            border-radius: 3px;
             padding: 5px;
-        }}
-        
-        QToolButton {{
-            background-color: {COLORS["primary_light"]};
-            border: 1px solid {COLORS["border"]};
-            border-radius: 4px;
-            padding: 4px;
-        }}
-        
-        QToolButton:hover {{
-            background-color: {COLORS["accent"]}40;
-            border-color: {COLORS["accent"]};
-        }}
-        
-        QToolButton:checked {{
-            background-color: {COLORS["accent"]};
-            border-color: {COLORS["accent"]};
-        }}
-    """,
+        }
+        QPushButton:hover {
+            background-color: #555555;
+        }
+    """
+}
+
+# Animation classes
+class AnimationBudget(QObject):
+    """Measures real repaint intervals of watched widgets to size animations"""
     
-    "canvas": f"""
-        QGraphicsView {{
-            background-color: {COLORS["canvas_bg"]};
-            border: none;
-            border-radius: 8px;
-        }}
-    """,
+    FRAME_MS = 16          # Frame time the default durations are tuned for
+    IDLE_MS = 100          # Longer gaps are idle time, not slow frames
+    MAX_STRETCH = 2.0      # Never stretch an animation beyond twice its length
     
-    "layer_panel": f"""
-        QListWidget {{
-            background-color: {COLORS["primary"]};
-            color: {COLORS["text"]};
-            border: 1px solid {COLORS["border"]};
-            border-radius: 6px;
-            outline: none;
-        }}
-        QListWidget::item {{
-            background-color: {COLORS["primary_light"]};
-            color: {COLORS["text"]};
-            border: 1px solid transparent;
-            border-radius: 6px;
-            padding: 4px 8px;
-            margin: 2px;
-        }}
-        QListWidget::item:selected {{
-            background-color: {COLORS["accent"]}40;
-            border: 1px solid {COLORS["accent"]};
-        }}
-        QListWidget::item:hover:!selected {{
-            background-color: {COLORS["primary_light"]}90;
-            border: 1px solid {COLORS["border"]};
-        }}
+    def __init__(self, samples=32):
+        super().__init__()
+        self._clock = QElapsedTimer()
+        self._clock.start()
+        self._last_paint = None
+        self._frame_times = deque(maxlen=samples)  # Ring buffer of recent intervals
         
-        QDoubleSpinBox, QSpinBox, QCheckBox {{
-            background-color: {COLORS["primary_light"]};
-            color: {COLORS["text"]};
-            border: 1px solid {COLORS["border"]};
-            border-radius: 4px;
-            padding: 2px 4px;
-        }}
+    def watch(self, widget):
+        """Sample the paint events of a widget"""
+        widget.installEventFilter(self)
         
-        QPushButton {{
-            background-color: {COLORS["primary_light"]};
-            color: {COLORS["text"]};
-            border: 1px solid {COLORS["border"]};
-            border-radius: 6px;
-            padding: 6px 12px;
-        }}
-        QPushButton:hover {{
-            background-color: {COLORS["accent"]}40;
-            border: 1px solid {COLORS["accent"]};
-        }}
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            now = self._clock.elapsed()
+            if self._last_paint is not None and now - self._last_paint < self.IDLE_MS:
+                self._frame_times.append(now - self._last_paint)
+            self._last_paint = now
+        return False
         
-        QLabel {{
-            color: {COLORS["text"]};
-        }}
+    def frame_time(self):
+        """Rolling median repaint interval in ms, or FRAME_MS before any samples"""
+        return median(self._frame_times) if self._frame_times else self.FRAME_MS
         
-        QSlider {{
-            height: 20px;
-        }}
-        QSlider::groove:horizontal {{
-            border: 1px solid {COLORS["border"]};
-            height: 6px;
-            background-color: {COLORS["primary_light"]};
-            border-radius: 3px;
-        }}
-        QSlider::handle:horizontal {{
-            background-color: {COLORS["accent"]};
-            border: none;
-            width: 12px;
-            height: 12px;
-            margin: -3px 0;
-            border-radius: 6px;
-        }}
-        QSlider::handle:horizontal:hover {{
-            background-color: {COLORS["accent_secondary"]};
-            transform: scale(1.1);
-        }}
-    """
-}
+    def recommended_duration(self, duration=250):
+        """Stretch a duration when frames run slow, so it keeps its frame count"""
+        stretch = min(max(self.frame_time() / self.FRAME_MS, 1.0), self.MAX_STRETCH)
+        return int(duration * stretch)
+
+_animation_budget = None
+
+def animation_budget():
+    """Shared AnimationBudget, created on first use"""
+    global _animation_budget
+    if _animation_budget is None:
+        _animation_budget = AnimationBudget()
+    return _animation_budget
 
-# Animation classes
 class GlowEffect(QGraphicsOpacityEffect):
     def __init__(self, parent):
         super().__init__(parent)
@@ -171,8 +260,24 @@ class GlowEffect(QGraphicsOpacityEffect):
         self.setOpacity(0.7)
     
     def start(self):
+        self.animation.setDuration(animation_budget().recommended_duration(300))
         self.animation.start()
 
+# Hover target sheets, formatted once at import instead of on every hover
+_HOVER_QSS = f"""
+    background-color: {COLORS["accent"]}40;
+    border: 1px solid {COLORS["accent"]};
+    border-radius: 6px;
+    padding: 6px;
+"""
+
+_UNHOVER_QSS = f"""
+    background-color: {COLORS["primary_light"]};
+    border: 1px solid {COLORS["text"]}40;
+    border-radius: 6px;
+    padding: 6px;
+"""
+
 class ButtonAnimation:
     def __init__(self, button):
         self.button = button
@@ -182,142 +287,176 @@ class ButtonAnimation:
         self.pressed_animation.setDuration(100)
         
     def on_hover(self, hovered):
-        if hovered:
-            self.hover_animation.setStartValue(self.button.styleSheet())
-            self.hover_animation.setEndValue(f"""
-                background-color: {COLORS["accent"]}40;
-                border: 1px solid {COLORS["accent"]};
-                border-radius: 6px;
-                padding: 6px;
-            """)
-            self.hover_animation.start()
-        else:
-            self.hover_animation.setStartValue(self.button.styleSheet())
-            self.hover_animation.setEndValue(f"""
-                background-color: {COLORS["primary_light"]};
-                border: 1px solid {COLORS["text"]}40;
-                border-radius: 6px;
-                padding: 6px;
-            """)
-            self.hover_animation.start()
+        self.hover_animation.setStartValue(self.button.styleSheet())
+        self.hover_animation.setEndValue(_HOVER_QSS if hovered else _UNHOVER_QSS)
+        self.hover_animation.start()
 
 class FadeAnimation(QObject):
     def __init__(self, target_widget):
         super().__init__()
         self.target = target_widget
-        self.opacity = 0.0
-        self.target.setStyleSheet(f"opacity: {self.opacity};")
-
-    def get_opacity(self):
-        return self.opacity
-
-    def set_opacity(self, opacity):
-        self.opacity = opacity
-        self.target.setStyleSheet(f"opacity: {self.opacity};")
-        self.target.update()
-
-    opacity_prop = pyqtProperty(float, get_opacity, set_opacity)
+        # Style sheets have no opacity property; an opacity effect actually fades
+        self._effect = QGraphicsOpacityEffect(target_widget)
+        self._effect.setOpacity(0.0)
+        self.target.setGraphicsEffect(self._effect)
+        # Drive the effect straight from the animated value, bypassing the property system
+        self.animation = QVariantAnimation(self)
+        self.animation.setEasingCurve(QEasingCurve.Type.OutCubic)
+        self.animation.valueChanged.connect(self._effect.setOpacity)
 
-    def fade_in(self, start=0.0, end=1.0, duration=250):
-        self.animation = QPropertyAnimation(self, b"opacity_prop")
+    def _fade(self, start, end, duration):
+        self.animation.stop()
         self.animation.setStartValue(start)
         self.animation.setEndValue(end)
-        self.animation.setDuration(duration)
-        self.animation.setEasingCurve(QEasingCurve.Type.OutCubic)
+        self.animation.setDuration(animation_budget().recommended_duration(duration))
         self.animation.start()
 
+    def fade_in(self, start=0.0, end=1.0, duration=250):
+        self._fade(start, end, duration)
+
     def fade_out(self, start=1.0, end=0.0, duration=250):
-        self.animation = QPropertyAnimation(self, b"opacity_prop")
-        self.animation.setStartValue(start)
-        self.animation.setEndValue(end)
-        self.animation.setDuration(duration)
-        self.animation.setEasingCurve(QEasingCurve.Type.OutCubic)
-        self.animation.start()
+        self._fade(start, end, duration)
+
+@lru_cache(maxsize=64)
+def symbol_icon(symbol, color):
+    """Draw a text symbol as a 32x32 icon; icons are shared per (symbol, color)"""
+    pixmap = QPixmap(32, 32)
+    pixmap.fill(Qt.GlobalColor.transparent)
+    
+    painter = QPainter(pixmap)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setPen(QColor(color))
+    painter.setBrush(Qt.BrushStyle.NoBrush)
+    
+    # Draw symbol centered in icon
+    font = painter.font()
+    font.setPointSize(18)
+    painter.setFont(font)
+    painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, symbol)
+    painter.end()
+    
+    return QIcon(pixmap)
 
 # Helper function to apply glass effect stylesheet to any widget
 def apply_glass_effect(widget, bg_color=QColor(40, 40, 48), opacity=0.9):
     """Apply a modern glass effect to a widget"""
-    # Set background opacity
-    color = QColor(bg_color)
-    color.setAlphaF(opacity)
-    
-    # Set stylesheet for glass-like appearance
+    # Translucent background and faint border, drawn by the style sheet alone; no
+    # drop shadow effect, which re-rendered the whole subtree offscreen per repaint
     widget.setStyleSheet(widget.styleSheet() + f"""
-        background-color: rgba({color.red()}, {color.green()}, {color.blue()}, {int(opacity * 255)});
-        border: 1px solid rgba(255, 255, 255, 0.1);
+        background-color: {_rgba(bg_color, opacity)};
+        border: {_GLASS_BORDER};
         border-radius: 8px;
     """)
-    
-    # Add drop shadow for depth
-    shadow = QGraphicsDropShadowEffect()
-    shadow.setBlurRadius(20)
-    shadow.setColor(QColor(0, 0, 0, 70))
-    shadow.setOffset(0, 2)
-    widget.setGraphicsEffect(shadow)
 
 # Add AnimatedToolButton to the exports
+def _accent_with_alpha(alpha):
+    """Accent color with an alpha byte; Qt would read "#RRGGBBAA" strings as #AARRGGBB"""
+    color = QColor(COLORS["accent"])
+    color.setAlpha(alpha)
+    return color
+
+@lru_cache(maxsize=8)
+def _button_shadow(width, height):
+    """Render a soft shadow under a button's rounded background once per button size"""
+    image = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setPen(Qt.PenStyle.NoPen)
+    
+    # Stack faint rounded rects, offset by (1, 1), growing outwards so the edge fades
+    shadow = QColor(COLORS["glass_shadow"])
+    alpha = shadow.alpha()
+    rect = QRectF(2, 2, width - 2, height - 2)
+    for spread in (2, 1, 0):
+        shadow.setAlpha(alpha // (spread + 2))
+        painter.setBrush(shadow)
+        painter.drawRoundedRect(rect.adjusted(-spread, -spread, spread, spread), 6 + spread, 6 + spread)
+    painter.end()
+    return QPixmap.fromImage(image)
+
 class AnimatedToolButton(QToolButton):
+    # Button colors, parsed once for every button
+    _BASE = QColor(COLORS["primary_light"])
+    _HOVER = _accent_with_alpha(0x60)
+    _PRESS = _accent_with_alpha(0xA0)
+    _CHECKED = _accent_with_alpha(0x80)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self._hovered = False
         self._pressed = False
-        self._base_color = QColor(COLORS["primary_light"])
-        self._hover_color = QColor(COLORS["accent"] + "60")  # 60% opacity
-        self._press_color = QColor(COLORS["accent"] + "A0")  # 60% opacity
+        self._base_color = self._BASE
+        self._hover_color = self._HOVER
+        self._press_color = self._PRESS
         self._current_color = self._base_color
         
-        # Add shadow effect
-        self.shadow = QGraphicsDropShadowEffect()
-        self.shadow.setBlurRadius(8)
-        self.shadow.setColor(QColor(COLORS["glass_shadow"]))
-        self.shadow.setOffset(1, 1)
-        self.setGraphicsEffect(self.shadow)
+        # Paint state kept ready for paintEvent: the fill follows hover, press and
+        # checked changes, the rect and shadow follow resizes
+        self._fill = self._current_color
+        self._round_rect = QRectF()
+        self._shadow = None
+        self.toggled.connect(self._refresh_fill)
         
         # Size and styling
         self.setMinimumSize(36, 36)
         
+    def _refresh_fill(self, *args):
+        """Pick the background fill, scheduling a repaint only when it changes"""
+        # update() already merges requests into one paint per event loop pass
+        fill = self._CHECKED if self.isChecked() else self._current_color
+        if fill is not self._fill:
+            self._fill = fill
+            self.update()
+        
+    def _set_color(self, color):
+        """Switch the unchecked background color"""
+        self._current_color = color
+        self._refresh_fill()
+        
+    def resizeEvent(self, event):
+        self._round_rect = QRectF(self.rect().adjusted(1, 1, -1, -1))
+        self._shadow = _button_shadow(self.width(), self.height())
+        super().resizeEvent(event)
+        
     def enterEvent(self, event):
         self._hovered = True
-        self._current_color = self._hover_color
-        self.update()
+        self._set_color(self._hover_color)
         super().enterEvent(event)
         
     def leaveEvent(self, event):
         self._hovered = False
-        self._current_color = self._base_color
-        self.update()
+        self._set_color(self._base_color)
         super().leaveEvent(event)
         
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self._pressed = True
-            self._current_color = self._press_color
-            self.update()
+            self._set_color(self._press_color)
         super().mousePressEvent(event)
         
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self._pressed = False
-            self._current_color = self._hover_color if self._hovered else self._base_color
-            self.update()
+            self._set_color(self._hover_color if self._hovered else self._base_color)
         super().mouseReleaseEvent(event)
         
     def paintEvent(self, event):
-        # Add custom painting before the standard paint
+        # Background and label share one painter; state changes call update(), never repaint()
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         
+        # Pre-rendered drop shadow, shared by every button of this size
+        if self._shadow is not None:
+            painter.drawPixmap(0, 0, self._shadow)
+        
         # Draw our custom background
-        if self.isChecked():
-            painter.setBrush(QColor(COLORS["accent"] + "80"))
-        else:
-            painter.setBrush(self._current_color)
-            
         painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawRoundedRect(self.rect().adjusted(1, 1, -1, -1), 6, 6)
+        painter.setBrush(self._fill)
+        painter.drawRoundedRect(self._round_rect, 6, 6)
         
-        # Let the standard painting happen
+        # Draw the icon and text over it with the style, in place of the base class paint
+        option = QStyleOptionToolButton()
+        self.initStyleOption(option)
+        self.style().drawControl(QStyle.ControlElement.CE_ToolButtonLabel, option, painter, self)
         painter.end()
-        
-        # Call standard painting
-        super().paintEvent(event)
@@ -1,76 +1,19 @@
 from PyQt6.QtWidgets import (QToolBar, QLabel, QComboBox, QPushButton, QSlider, 
-                           QButtonGroup, QToolButton, QGraphicsView, QGraphicsDropShadowEffect)
-from PyQt6.QtGui import QIcon, QAction, QPixmap, QPainter, QColor
-from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QSize, pyqtProperty, pyqtSignal
+                           QButtonGroup, QToolButton, QGraphicsView)
+from PyQt6.QtGui import QIcon, QAction
+from PyQt6.QtCore import QPropertyAnimation, QEasingCurve, QSize, pyqtProperty, pyqtSignal
 
+from functools import lru_cache
+import os
+
+from resources import resource_path
 from color_picker_tool import ColorPickerTool
-from style_utils import COLORS, STYLE_SHEETS, GlowEffect, ButtonAnimation
+from style_utils import COLORS, STYLE_SHEETS, GlowEffect, ButtonAnimation, symbol_icon, animation_budget
 
-class AnimatedToolButton(QToolButton):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self._hovered = False
-        self._pressed = False
-        self._base_color = QColor(COLORS["primary_light"])
-        self._hover_color = QColor(COLORS["accent"] + "60")  # 60% opacity
-        self._press_color = QColor(COLORS["accent"] + "A0")  # 60% opacity
-        self._current_color = self._base_color
-        
-        # Add shadow effect
-        self.shadow = QGraphicsDropShadowEffect()
-        self.shadow.setBlurRadius(8)
-        self.shadow.setColor(QColor(COLORS["glass_shadow"]))
-        self.shadow.setOffset(1, 1)
-        self.setGraphicsEffect(self.shadow)
-        
-        # Size and styling
-        self.setMinimumSize(36, 36)
-        
-    def enterEvent(self, event):
-        self._hovered = True
-        self._current_color = self._hover_color
-        self.update()
-        super().enterEvent(event)
-        
-    def leaveEvent(self, event):
-        self._hovered = False
-        self._current_color = self._base_color
-        self.update()
-        super().leaveEvent(event)
-        
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            self._pressed = True
-            self._current_color = self._press_color
-            self.update()
-        super().mousePressEvent(event)
-        
-    def mouseReleaseEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            self._pressed = False
-            self._current_color = self._hover_color if self._hovered else self._base_color
-            self.update()
-        super().mouseReleaseEvent(event)
-        
-    def paintEvent(self, event):
-        # Add custom painting before the standard paint
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Draw our custom background
-        if self.isChecked():
-            painter.setBrush(QColor(COLORS["accent"] + "80"))
-        else:
-            painter.setBrush(self._current_color)
-            
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawRoundedRect(self.rect().adjusted(1, 1, -1, -1), 6, 6)
-        
-        # Let the standard painting happen
-        painter.end()
-        
-        # Call standard painting
-        super().paintEvent(event)
+@lru_cache(maxsize=None)
+def svg_icon(name):
+    """Load an icon from icons/<name>.svg once; Qt rasterizes it per device pixel ratio"""
+    return QIcon(resource_path(os.path.join("icons", f"{name}.svg")))
 
 class ToolBar(QToolBar):
     """Main toolbar with common application tools"""
@@ -82,31 +25,41 @@ class ToolBar(QToolBar):
         self.canvas = canvas
         self.active_tool = None
         self.tools = []
+        self._button_tools = {}  # Tool button -> tool
+        self._status_show = None  # Status bar showMessage, resolved on first use
         
         # Create a button group for tools that are mutually exclusive
         self.tool_group = QButtonGroup(self)
         self.tool_group.setExclusive(True)
         self.tool_group.buttonClicked.connect(self.on_tool_clicked)
         
-        # Add standard actions
-        self.add_standard_actions()
+        # Add everything with updates off so the toolbar lays out and paints once
+        self.setUpdatesEnabled(False)
+        try:
+            # Add standard actions
+            self.add_standard_actions()
+            
+            # Add tools
+            self.add_tools()
+        finally:
+            self.setUpdatesEnabled(True)
         
-        # Add tools
-        self.add_tools()
+        # Toolbar repaints feed the frame times that size the tool animations
+        animation_budget().watch(self)
         
     def add_standard_actions(self):
         """Add standard file/edit actions"""
         # Undo action
         undo_action = QAction("Undo", self)
         undo_action.setShortcut("Ctrl+Z")
-        undo_action.setIcon(self.create_icon("↶", COLORS["text"]))
+        undo_action.setIcon(svg_icon("undo"))
         undo_action.triggered.connect(self.canvas.undo)
         self.addAction(undo_action)
         
         # Redo action
         redo_action = QAction("Redo", self)
         redo_action.setShortcut("Ctrl+Y")
-        redo_action.setIcon(self.create_icon("↷", COLORS["text"]))
+        redo_action.setIcon(svg_icon("redo"))
         redo_action.triggered.connect(self.canvas.redo)
         self.addAction(redo_action)
         
@@ -116,7 +69,7 @@ class ToolBar(QToolBar):
         # Import image action
         import_action = QAction("Import Image", self)
         import_action.setShortcut("Ctrl+I")
-        import_action.setIcon(self.create_icon("⊕", COLORS["text"]))
+        import_action.setIcon(svg_icon("import"))
         import_action.triggered.connect(self.import_image)
         self.addAction(import_action)
         
@@ -126,7 +79,7 @@ class ToolBar(QToolBar):
     def add_tools(self):
         """Add standard editing tools"""
         # Add color picker
-        self.add_tool(ColorPickerTool(self.canvas), self.create_icon("⦿", COLORS["accent_secondary"]))
+        self.add_tool(ColorPickerTool(self.canvas), svg_icon("picker"))
         
     def add_tool(self, tool, icon=None):
         """Add a tool to the toolbar"""
@@ -140,13 +93,8 @@ class ToolBar(QToolBar):
             # Create generic tool icon
             button.setIcon(self.create_icon("T", COLORS["text"]))
             
-        # Set tooltip
-        if hasattr(tool, 'get_tooltip'):
-            button.setToolTip(tool.get_tooltip())
-        elif hasattr(tool, 'get_name'):
-            button.setToolTip(tool.get_name())
-        else:
-            button.setToolTip(tool.__class__.__name__)
+        # Set tooltip; the Tool base falls back to the tool's name
+        button.setToolTip(tool.get_tooltip())
             
         # Add button to group and toolbar
         self.tool_group.addButton(button)
@@ -154,42 +102,24 @@ class ToolBar(QToolBar):
         
         # Store tool reference
         self.tools.append(tool)
-        tool.statusChanged = self.statusChanged
+        self._button_tools[button] = tool
         
-        # Connect signal from tool if it exists
-        if hasattr(tool, 'statusChanged'):
-            tool.statusChanged.connect(self.on_status_changed)
+        # Forward the tool's own status messages
+        tool.statusChanged.connect(self.on_status_changed)
         
     def create_icon(self, symbol, color):
         """Create a simple icon with text symbol"""
-        pixmap = QPixmap(32, 32)
-        pixmap.fill(Qt.GlobalColor.transparent)
-        
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setPen(QColor(color))
-        painter.setBrush(Qt.BrushStyle.NoBrush)
-        
-        # Draw symbol centered in icon
-        font = painter.font()
-        font.setPointSize(18)
-        painter.setFont(font)
-        painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, symbol)
-        painter.end()
-        
-        return QIcon(pixmap)
+        return symbol_icon(symbol, str(color))
         
     def on_tool_clicked(self, button):
         """Handle tool button clicks"""
-        tool_index = self.tool_group.buttons().index(button)
-        
         # Deactivate current tool
         if self.active_tool:
             self.active_tool.deactivate()
             
         # Activate new tool
         if button.isChecked():
-            self.active_tool = self.tools[tool_index]
+            self.active_tool = self._button_tools[button]
             self.active_tool.activate()
             
             # Set status message
@@ -200,8 +130,15 @@ class ToolBar(QToolBar):
             
     def on_status_changed(self, status):
         """Handle status change from tools"""
-        if hasattr(self.canvas, 'main_window') and hasattr(self.canvas.main_window, 'statusBar'):
-            self.canvas.main_window.statusBar.showMessage(status)
+        # The window is attached to the canvas after the toolbar is built, so
+        # resolve its status bar on the first message and keep the bound method
+        show = self._status_show
+        if show is None:
+            status_bar = getattr(getattr(self.canvas, 'main_window', None), 'statusBar', None)
+            if status_bar is None:
+                return
+            show = self._status_show = status_bar.showMessage
+        show(status)
             
     def import_image(self):
         """Import an image"""
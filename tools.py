@@ -1,5 +1,42 @@
-from PyQt6.QtCore import QObject, pyqtSignal, Qt, QPoint, QEvent
-from PyQt6.QtGui import QCursor, QPixmap
+from PyQt6.QtCore import QObject, pyqtSignal, Qt, QPoint, QEvent, QRectF
+from PyQt6.QtGui import QCursor, QPixmap, QPainterPath
+from PyQt6.QtWidgets import QGraphicsItem
+
+class ToolOverlayItem(QGraphicsItem):
+    """Scene item that draws the active tool's overlay above every layer
+    
+    Tools hand it the scene rect they draw in plus a paint callback, so Qt
+    only repaints that rect when the overlay changes.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._rect = QRectF()
+        self._paint_overlay = None
+        
+    def set_geometry(self, rect, paint_overlay):
+        """Show paint_overlay(painter), drawing in scene coordinates within rect"""
+        self.prepareGeometryChange()
+        self._rect = QRectF(rect)
+        self._paint_overlay = paint_overlay
+        self.update()
+        
+    def clear(self):
+        """Hide the overlay"""
+        self.set_geometry(QRectF(), None)
+        
+    def boundingRect(self):
+        return self._rect
+        
+    def shape(self):
+        # Never intercept clicks meant for the layers underneath
+        return QPainterPath()
+        
+    def paint(self, painter, option, widget=None):
+        if self._paint_overlay:
+            painter.save()
+            self._paint_overlay(painter)
+            painter.restore()
 
 class Tool(QObject):
     """Base class for all drawing and editing tools"""